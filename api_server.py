@@ -1,129 +1,622 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import functools
+import hashlib
 import json
+import re
 import secrets
-import threading
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from http import HTTPStatus
 from pathlib import Path
-from urllib.parse import urlparse
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
 
 from mini_chain.blockchain import Blockchain
+from mini_chain.coin_selection import DEFAULT_STRATEGY
+from mini_chain.metrics import HTTP_REQUESTS, HTTP_SECONDS, REGISTRY
+from mini_chain.transaction import Transaction
 
+ADDRESS_UTXOS_RE = re.compile(r"^/api/address/([^/]+)/utxos$")
+ADDRESS_HISTORY_RE = re.compile(r"^/api/address/([^/]+)/history$")
+BLOCK_HASH_RE = re.compile(r"^/api/blocks/([0-9a-f]{64})$")
+BLOCK_HEIGHT_RE = re.compile(r"^/api/blocks/(\d{1,10})$")
+TX_RE = re.compile(r"^/api/tx/([0-9a-f]{64})$")
+TX_PROOF_RE = re.compile(r"^/api/tx/([0-9a-f]{64})/proof$")
+# Etiqueta de ruta para las métricas: las rutas con parámetros se agrupan por plantilla
+STATIC_ROUTES = frozenset(
+    {
+        "/",
+        "/api/state",
+        "/api/summary",
+        "/api/blocks",
+        "/api/mempool",
+        "/api/metrics",
+        "/api/wallet",
+        "/api/tx",
+        "/api/tx/batch",
+        "/api/attack/fake-tx",
+        "/api/attack/tamper",
+        "/api/mine",
+    }
+)
+ROUTE_TEMPLATES = (
+    (ADDRESS_UTXOS_RE, "/api/address/{address}/utxos"),
+    (ADDRESS_HISTORY_RE, "/api/address/{address}/history"),
+    (BLOCK_HASH_RE, "/api/blocks/{hash}"),
+    (BLOCK_HEIGHT_RE, "/api/blocks/{height}"),
+    (TX_RE, "/api/tx/{txid}"),
+    (TX_PROOF_RE, "/api/tx/{txid}/proof"),
+)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+MAX_PAGE_LIMIT = 500
+MAX_BLOCKS_LIMIT = 100
 
-class APIServer(BaseHTTPRequestHandler):
-    blockchain: Blockchain = None
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+# POST /api/tx/batch: miles de transacciones firmadas por petición
+MAX_BATCH_BODY_BYTES = 16 * 1024 * 1024
+MAX_BATCH_TXS = 10_000
+# Espera máxima por la línea de petición y las cabeceras (conexión inactiva)
+KEEPALIVE_TIMEOUT = 15.0
+# El cuerpo no tiene límite total (un lote de 16 MiB puede tardar): basta con que avance
+BODY_TIMEOUT = 30.0
+BODY_CHUNK = 64 * 1024
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 32
 
-    def _json(self, payload: dict, code: int = 200) -> None:
+SSE_MAX_PENDING = 256 * 1024
+SSE_HEARTBEAT = 15.0
+
+
+class Overloaded(Exception):
+    pass
+
+
+def route_label(path: str) -> str:
+    if path in STATIC_ROUTES:
+        return path
+    for regex, template in ROUTE_TEMPLATES:
+        if regex.match(path):
+            return template
+    return "other"
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, list]
+    headers: Dict[str, str]
+    body: bytes = b""
+    keep_alive: bool = True
+
+    def json(self) -> dict:
+        return json.loads(self.body.decode() or "{}")
+
+
+@dataclass
+class Response:
+    status: int
+    body: bytes = b""
+    content_type: str = "application/json"
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class BoundedExecutor:
+    # Pool fijo de hilos para rutas costosas (PoW, firma, derivación de claves).
+    # Si ya hay workers + max_queue tareas en curso, la petición se rechaza con 503
+    # en lugar de encolarse sin límite. Solo se usa desde el hilo del event loop.
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.capacity = workers + max_queue
+        self.inflight = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    async def run(self, fn, *args, **kwargs):
+        if self.inflight >= self.capacity:
+            raise Overloaded()
+        self.inflight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.inflight -= 1
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class EventStream:
+    # Suscriptores de /api/events: cada uno es solo un StreamWriter en el event loop,
+    # sin hilo propio. Un cliente lento cuyo búfer de salida supere max_pending se
+    # desconecta; cada `heartbeat` segundos se envía un comentario para mantener la conexión.
+    def __init__(self, max_pending: int = SSE_MAX_PENDING, heartbeat: float = SSE_HEARTBEAT):
+        self.max_pending = max_pending
+        self.heartbeat = heartbeat
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def start(self) -> None:
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._ping())
+
+    async def _ping(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self._send(b": ping\n\n")
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\nretry: 3000\n\n"
+        )
+        self._clients.add(writer)
+        try:
+            # El cliente no envía nada más: la lectura solo detecta el cierre
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+
+    def publish(self, event: str, data: dict) -> None:
+        self._send(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+
+    def _send(self, message: bytes) -> None:
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() + len(message) > self.max_pending:
+                self._clients.discard(writer)
+                writer.transport.abort()
+            else:
+                writer.write(message)
+
+    def close(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        for writer in list(self._clients):
+            writer.transport.abort()
+        self._clients.clear()
+
+
+class APIServer:
+    # Front end HTTP/1.1 sobre asyncio: conexiones keep-alive con límites de tamaño,
+    # rutas ligeras resueltas en el event loop y rutas de CPU en un BoundedExecutor.
+    def __init__(
+        self,
+        blockchain: Blockchain,
+        workers: int = DEFAULT_WORKERS,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        sse_max_pending: int = SSE_MAX_PENDING,
+        sse_heartbeat: float = SSE_HEARTBEAT,
+    ):
+        self.blockchain = blockchain
+        self.executor = BoundedExecutor(workers, max_queue)
+        self.events = EventStream(sse_max_pending, sse_heartbeat)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._unsubscribe = None
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        loop = asyncio.get_running_loop()
+        self.events.start()
+        # Los eventos se publican desde hilos de la cadena: se reenvían al event loop
+        self._unsubscribe = self.blockchain.events.subscribe(
+            lambda event, data: loop.call_soon_threadsafe(self.events.publish, event, data)
+        )
+        self._server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_HEADER_BYTES, backlog=128)
+        return self._server
+
+    async def close(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+        self.events.close()
+        if self._server is not None:
+            self._server.close()
+        # Las conexiones keep-alive inactivas no terminan solas
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self.executor.shutdown()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+        except asyncio.IncompleteReadError as exc:
+            if not exc.partial.strip():
+                return None
+            raise RequestError(400, "petición incompleta") from None
+        except asyncio.LimitOverrunError:
+            raise RequestError(431, "cabeceras demasiado grandes") from None
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise RequestError(400, "línea de petición inválida") from None
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise RequestError(400, "cabecera inválida")
+            headers[name.strip().lower()] = value.strip()
+
+        if "transfer-encoding" in headers:
+            raise RequestError(501, "Transfer-Encoding no soportado; usa Content-Length")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise RequestError(400, "Content-Length inválido") from None
+        if length < 0:
+            raise RequestError(400, "Content-Length inválido")
+        url = urlparse(target)
+        max_body = MAX_BATCH_BODY_BYTES if url.path == "/api/tx/batch" else MAX_BODY_BYTES
+        if length > max_body:
+            raise RequestError(413, f"cuerpo mayor que {max_body} bytes")
+        body = await self._read_body(reader, length)
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return Request(method, url.path, parse_qs(url.query), headers, body, keep_alive)
+
+    async def _read_body(self, reader: asyncio.StreamReader, length: int) -> bytes:
+        chunks: List[bytes] = []
+        remaining = length
+        while remaining:
+            chunk = await asyncio.wait_for(reader.read(min(remaining, BODY_CHUNK)), BODY_TIMEOUT)
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"".join(chunks), length)
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except RequestError as exc:
+                    await self._write(writer, self._json({"error": str(exc)}, exc.status), keep_alive=False)
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+                if request.method == "GET" and request.path == "/api/events":
+                    await self.events.serve(reader, writer)
+                    break
+                started = time.perf_counter()
+                response = await self.dispatch(request)
+                self._observe(request, response, time.perf_counter() - started)
+                await self._write(writer, response, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def _observe(self, request: Request, response: Response, elapsed: float) -> None:
+        if not REGISTRY.enabled:
+            return
+        method = request.method if request.method in ("GET", "POST") else "other"
+        route = route_label(request.path)
+        HTTP_SECONDS.labels(method, route).observe(elapsed)
+        HTTP_REQUESTS.labels(method, route, response.status).inc()
+
+    async def _write(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool) -> None:
+        head = [f"HTTP/1.1 {response.status} {HTTPStatus(response.status).phrase}"]
+        if response.status != 304:
+            head.append(f"Content-Type: {response.content_type}")
+            head.append(f"Content-Length: {len(response.body)}")
+        head.extend(f"{name}: {value}" for name, value in response.headers.items())
+        head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        if keep_alive:
+            head.append(f"Keep-Alive: timeout={int(KEEPALIVE_TIMEOUT)}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        if response.status != 304:
+            writer.write(response.body)
+        await writer.drain()
+
+    def _json(self, payload: dict, code: int = 200, request: Optional[Request] = None) -> Response:
         data = json.dumps(payload).encode()
-        self.send_response(code)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(data)))
-        self.end_headers()
-        self.wfile.write(data)
-
-    def _body_json(self) -> dict:
-        length = int(self.headers.get("Content-Length", "0"))
-        raw = self.rfile.read(length) if length else b"{}"
-        return json.loads(raw.decode())
-
-    def do_GET(self) -> None:
-        path = urlparse(self.path).path
+        if request is None:
+            return Response(code, data)
+        # ETag sobre el cuerpo: un sondeo sin cambios responde 304 sin reenviar datos
+        etag = '"%s"' % hashlib.sha256(data).hexdigest()[:32]
+        if etag in (t.strip() for t in request.headers.get("if-none-match", "").split(",")):
+            return Response(304, headers={"ETag": etag})
+        return Response(code, data, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    def _query_int(self, query: dict, name: str, default: int) -> int:
+        values = query.get(name)
+        return int(values[0]) if values else default
+
+    async def dispatch(self, request: Request) -> Response:
+        try:
+            if request.method == "GET":
+                return await self._get(request)
+            if request.method == "POST":
+                return await self._post(request)
+            return self._json({"error": "método no permitido"}, 405)
+        except Overloaded:
+            return Response(503, json.dumps({"error": "servidor ocupado, reintenta"}).encode(), headers={"Retry-After": "1"})
+        except Exception as exc:
+            return self._json({"error": str(exc)}, 500)
+
+    def _state(self) -> dict:
+        bc = self.blockchain
+        snap = bc.snapshot()
+        return {
+            "height": snap.height,
+            "tip": snap.tip,
+            "mempool": len(snap.mempool),
+            "chain_valid": bc.chain_valid(),
+            "chain": [b.to_dict() for b in snap.blocks()],
+            "wallets": [{"name": w.name, "address": w.btc_address, "internal_address": w.address} for w in list(bc.wallets.values())],
+        }
+
+    async def _get(self, request: Request) -> Response:
+        path, query = request.path, request.query
         if path == "/":
             html = (Path(__file__).parent / "static" / "index.html").read_bytes()
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html; charset=utf-8")
-            self.send_header("Content-Length", str(len(html)))
-            self.end_headers()
-            self.wfile.write(html)
-            return
+            return Response(200, html, "text/html; charset=utf-8")
 
         if path == "/api/state":
+            # Serializa la cadena completa: fuera del event loop
+            return self._json(await self.executor.run(self._state))
+
+        if path == "/api/summary":
             bc = self.blockchain
-            self._json(
-                {
-                    "height": len(bc.chain) - 1,
-                    "tip": bc.chain[-1].hash(),
-                    "mempool": len(bc.mempool),
-                    "chain_valid": bc.validate_chain(),
-                    "chain": bc.chain_data(),
-                    "wallets": [{"name": w.name, "address": w.btc_address, "internal_address": w.address} for w in bc.wallets.values()],
-                }
+            snap = bc.snapshot()
+            valid = bc.cached_chain_valid()
+            if valid is None:
+                # Recorrer la cadena (tras reabrir el almacén o alterar un bloque) va al executor
+                valid = await self.executor.run(bc.chain_valid)
+            return self._json(
+                {"height": snap.height, "tip": snap.tip, "mempool": len(snap.mempool), "chain_valid": valid},
+                request=request,
             )
-            return
 
-        self._json({"error": "not found"}, 404)
+        if path == "/api/blocks":
+            snap = self.blockchain.snapshot()
+            try:
+                limit = min(MAX_BLOCKS_LIMIT, max(1, self._query_int(query, "limit", 10)))
+                start = max(0, self._query_int(query, "from", snap.height - limit + 1))
+            except ValueError:
+                return self._json({"error": "from/limit deben ser enteros"}, 400)
+            blocks = snap.blocks(start, start + limit)
+            return self._json(
+                {"height": snap.height, "tip": snap.tip, "from": start, "blocks": [b.to_dict() for b in blocks]},
+                request=request,
+            )
 
-    def do_POST(self) -> None:
-        path = urlparse(self.path).path
-        bc = self.blockchain
+        match = BLOCK_HASH_RE.match(path)
+        if match:
+            block = self.blockchain.get_block(match.group(1))
+            if block is None:
+                return self._json({"error": "bloque no encontrado"}, 404)
+            return self._json(block.to_dict(), request=request)
 
-        if path == "/api/wallet":
-            body = self._body_json()
-            entropy = body.get("entropy") or secrets.token_hex(16)
-            wallet = bc.register_wallet(name=f"wallet-{len(bc.wallets)+1}", seed=entropy)
-            self._json(
+        match = BLOCK_HEIGHT_RE.match(path)
+        if match:
+            blocks = self.blockchain.snapshot().blocks(int(match.group(1)), int(match.group(1)) + 1)
+            if not blocks:
+                return self._json({"error": "bloque no encontrado"}, 404)
+            return self._json(blocks[0].to_dict(), request=request)
+
+        match = TX_RE.match(path)
+        if match:
+            info = self.blockchain.transaction_info(match.group(1))
+            if info is None:
+                return self._json({"error": "transacción no encontrada"}, 404)
+            return self._json(info, request=request)
+
+        match = TX_PROOF_RE.match(path)
+        if match:
+            proof = self.blockchain.transaction_proof(match.group(1))
+            if proof is None:
+                return self._json({"error": "transacción no confirmada"}, 404)
+            return self._json(proof, request=request)
+
+        if path == "/api/mempool":
+            try:
+                limit = min(MAX_PAGE_LIMIT, max(1, self._query_int(query, "limit", 50)))
+            except ValueError:
+                return self._json({"error": "limit debe ser entero"}, 400)
+            return self._json(self.blockchain.mempool_info(limit), request=request)
+
+        if path == "/api/metrics":
+            if query.get("format") == ["json"]:
+                return self._json(self.blockchain.wallet_cache_stats())
+            self.blockchain.collect_metrics()
+            return Response(200, REGISTRY.render().encode(), PROMETHEUS_CONTENT_TYPE)
+
+        match = ADDRESS_HISTORY_RE.match(path)
+        if match:
+            try:
+                offset = max(0, self._query_int(query, "offset", 0))
+                limit = min(MAX_PAGE_LIMIT, max(1, self._query_int(query, "limit", 50)))
+            except ValueError:
+                return self._json({"error": "offset/limit deben ser enteros"}, 400)
+            address = match.group(1)
+            page, total = self.blockchain.address_history(address, offset, limit)
+            return self._json({"address": address, "total": total, "offset": offset, "limit": limit, "transactions": page}, request=request)
+
+        match = ADDRESS_UTXOS_RE.match(path)
+        if match:
+            try:
+                offset = max(0, self._query_int(query, "offset", 0))
+                limit = min(MAX_PAGE_LIMIT, max(1, self._query_int(query, "limit", 50)))
+            except ValueError:
+                return self._json({"error": "offset/limit deben ser enteros"}, 400)
+            address = match.group(1)
+            page, total = self.blockchain.address_utxos(address, offset, limit)
+            return self._json(
                 {
-                    "entropy": entropy,
-                    "private_key_wif": wallet.private_key_wif,
-                    "public_key": wallet.btc_public_key_hex,
-                    "public_key_format": "compressed-hex (33 bytes)",
-                    "address": wallet.btc_address,
-                    "internal_signing_address": wallet.address,
-                    "warning": "Si compartes private key WIF o seed, otra persona controla la wallet.",
+                    "address": address,
+                    "balance": self.blockchain.balance_of(address),
+                    "total": total,
+                    "offset": offset,
+                    "limit": limit,
+                    "utxos": [asdict(u) for u in page],
                 }
             )
-            return
 
-        if path == "/api/tx":
+        return self._json({"error": "not found"}, 404)
+
+    def _create_wallet(self, entropy: str) -> dict:
+        bc = self.blockchain
+        wallet = bc.register_wallet(name=f"wallet-{len(bc.wallets)+1}", seed=entropy)
+        return {
+            "entropy": entropy,
+            "private_key_wif": wallet.private_key_wif,
+            "public_key": wallet.btc_public_key_hex,
+            "public_key_format": "compressed-hex (33 bytes)",
+            "address": wallet.btc_address,
+            "internal_signing_address": wallet.address,
+            "warning": "Si compartes private key WIF o seed, otra persona controla la wallet.",
+        }
+
+    def _submit_transaction(self, body: dict) -> dict:
+        bc = self.blockchain
+        tx = bc.create_transaction(
+            from_address=body["from_address"],
+            to_address=body["to_address"],
+            amount=float(body["amount"]),
+            private_material=body["private_key"],
+            coin_selection=body.get("coin_selection", DEFAULT_STRATEGY),
+            fee=float(body.get("fee", 0)),
+        )
+        ok = bc.add_transaction(tx)
+        return {"accepted": ok, "txid": tx.txid()}
+
+    def _submit_batch(self, request: Request) -> Tuple[dict, int]:
+        # Cada elemento: transacción firmada en hex (formato binario) o como objeto JSON
+        try:
+            items = request.json().get("transactions")
+        except (ValueError, AttributeError):
+            return {"error": "cuerpo JSON inválido"}, 400
+        if not isinstance(items, list):
+            return {"error": "transactions debe ser una lista"}, 400
+        if len(items) > MAX_BATCH_TXS:
+            return {"error": f"máximo {MAX_BATCH_TXS} transacciones por lote"}, 413
+        txs, results = [], []
+        for item in items:
             try:
-                body = self._body_json()
-                tx = bc.create_transaction(
-                    from_address=body["from_address"],
-                    to_address=body["to_address"],
-                    amount=float(body["amount"]),
-                    private_material=body["private_key"],
-                )
-                ok = bc.add_transaction(tx)
-                self._json({"accepted": ok, "txid": tx.txid()})
-            except Exception as exc:
-                self._json({"error": str(exc)}, 400)
-            return
+                tx = Transaction.from_bytes(bytes.fromhex(item)) if isinstance(item, str) else Transaction.from_dict(item)
+                # Un objeto JSON puede traer campos que no se pueden codificar (p. ej. vout -1 o
+                # un txid que no es hex): se detecta aquí y no al calcular el txid del resultado
+                tx.serialize()
+            except (KeyError, TypeError, ValueError, struct.error):
+                results.append({"txid": None, "accepted": False, "error": "transacción mal formada"})
+                continue
+            txs.append(tx)
+            results.append(None)
+        outcomes = iter(zip(txs, self.blockchain.add_transactions(txs)))
+        for i, result in enumerate(results):
+            if result is None:
+                tx, error = next(outcomes)
+                results[i] = {"txid": tx.txid(), "accepted": error is None}
+                if error is not None:
+                    results[i]["error"] = error
+        accepted = sum(1 for r in results if r["accepted"])
+        return {"accepted": accepted, "rejected": len(results) - accepted, "results": results}, 200
 
-        if path == "/api/attack/fake-tx":
-            body = self._body_json()
+    def _fake_transaction(self, body: dict) -> dict:
+        bc = self.blockchain
+        try:
             tx = bc.build_fake_transaction(
                 from_address=body.get("from_address", ""),
                 to_address=body.get("to_address", "attacker-address"),
                 amount=float(body.get("amount", 9999)),
             )
-            accepted = bc.add_transaction(tx)
-            self._json(
-                {
-                    "accepted": accepted,
-                    "message": "Transacción falsa rechazada: firma/UTXO inválidos" if not accepted else "Advertencia: aceptada",
-                }
-            )
-            return
+        except ValueError as exc:
+            # Un monto que el formato no puede representar (p. ej. 1e20) ni llega a validarse
+            return {"accepted": False, "message": f"Transacción falsa rechazada: {exc}"}
+        accepted = bc.add_transaction(tx)
+        return {
+            "accepted": accepted,
+            "message": "Transacción falsa rechazada: firma/UTXO inválidos" if not accepted else "Advertencia: aceptada",
+        }
+
+    def _tamper(self, index: int) -> dict:
+        bc = self.blockchain
+        tampered = bc.tamper_block(index)
+        return {
+            "tampered": tampered,
+            "chain_valid_after_tamper": bc.chain_valid(),
+            "message": "Al alterar un bloque, la cadena deja de ser válida" if tampered else "No se pudo alterar",
+        }
+
+    def _mine(self) -> dict:
+        bc = self.blockchain
+        block = bc.mine_block(bc.wallets["miner"].address)
+        return {"index": block.index, "hash": block.hash()}
+
+    async def _post(self, request: Request) -> Response:
+        path = request.path
+        if path == "/api/tx/batch":
+            # El cuerpo puede ocupar megas: también se decodifica en el executor
+            payload, status = await self.executor.run(self._submit_batch, request)
+            return self._json(payload, status)
+
+        try:
+            body = request.json()
+        except ValueError:
+            return self._json({"error": "cuerpo JSON inválido"}, 400)
+
+        if path == "/api/wallet":
+            entropy = body.get("entropy") or secrets.token_hex(16)
+            return self._json(await self.executor.run(self._create_wallet, entropy))
+
+        if path == "/api/tx":
+            try:
+                return self._json(await self.executor.run(self._submit_transaction, body))
+            except Overloaded:
+                raise
+            except Exception as exc:
+                return self._json({"error": str(exc)}, 400)
+
+        if path == "/api/attack/fake-tx":
+            return self._json(await self.executor.run(self._fake_transaction, body))
 
         if path == "/api/attack/tamper":
-            body = self._body_json()
-            idx = int(body.get("index", 1))
-            tampered = bc.tamper_block(idx)
-            self._json(
-                {
-                    "tampered": tampered,
-                    "chain_valid_after_tamper": bc.validate_chain(),
-                    "message": "Al alterar un bloque, la cadena deja de ser válida" if tampered else "No se pudo alterar",
-                }
-            )
-            return
+            try:
+                index = int(body.get("index", 1))
+            except (TypeError, ValueError, OverflowError):
+                return self._json({"error": "index debe ser entero"}, 400)
+            return self._json(await self.executor.run(self._tamper, index))
 
         if path == "/api/mine":
-            block = bc.mine_block(bc.wallets["miner"].address)
-            self._json({"index": block.index, "hash": block.hash()})
-            return
+            return self._json(await self.executor.run(self._mine))
 
-        self._json({"error": "not found"}, 404)
+        return self._json({"error": "not found"}, 404)
+
+
+async def serve(api: APIServer, host: str, port: int) -> None:
+    server = await api.start(host, port)
+    try:
+        await server.serve_forever()
+    finally:
+        await api.close()
 
 
 def main() -> None:
@@ -133,19 +626,37 @@ def main() -> None:
     parser.add_argument("--port", type=int, default=8000)
     parser.add_argument("--difficulty", type=int, default=3)
     parser.add_argument("--block-interval", type=int, default=240)
+    parser.add_argument("--mining-workers", type=int, default=1, help="procesos de minado (0 = todos los núcleos)")
+    parser.add_argument("--data-dir", default=None, help="directorio del almacén de bloques en disco (por defecto, solo memoria)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="hilos para rutas costosas (minado, firma, wallets)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="peticiones costosas en espera antes de responder 503")
+    parser.add_argument("--verify-workers", type=int, default=0, help="procesos para verificar firmas y validar la cadena (0 = todos los núcleos)")
+    parser.add_argument("--reindex", action="store_true", help="al arrancar, valida la cadena completa en lugar de usar el snapshot UTXO")
+    parser.add_argument("--no-metrics", action="store_true", help="desactiva la instrumentación de /api/metrics")
     args = parser.parse_args()
+    REGISTRY.enabled = not args.no_metrics
 
-    blockchain = Blockchain(difficulty=args.difficulty, block_interval=args.block_interval)
+    blockchain = Blockchain(
+        difficulty=args.difficulty,
+        block_interval=args.block_interval,
+        mining_workers=args.mining_workers,
+        data_dir=args.data_dir,
+        verify_workers=args.verify_workers,
+        reindex=args.reindex,
+    )
+    if blockchain.reindex_report is not None:
+        print(f"reindex: {blockchain.reindex_report.as_dict()}")
     blockchain.register_wallet("miner", f"{args.node_id}-miner-seed")
     blockchain.start_auto_mining(blockchain.wallets["miner"].address)
 
-    APIServer.blockchain = blockchain
-    server = ThreadingHTTPServer((args.host, args.port), APIServer)
+    api = APIServer(blockchain, workers=args.workers, max_queue=args.max_queue)
     print(f"API + Frontend: http://{args.host}:{args.port}")
-
-    t = threading.Thread(target=server.serve_forever, daemon=True)
-    t.start()
-    t.join()
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        blockchain.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mini_chain.crypto_utils import is_probable_prime, private_key_from_seed, sha256, sign_message, sign_message_crt
+from mini_chain.wallet import Wallet
+
+
+def naive_prime(seed: bytes, salt: bytes) -> int:
+    # Referencia sin criba: Miller-Rabin sobre cada impar
+    x = int.from_bytes(sha256(seed + salt), "big") | 1
+    x |= 1 << 255
+    while not is_probable_prime(x):
+        x += 2
+    return x
+
+
+def rate(count: int, fn) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Firmas/s (pow directo vs CRT) y wallets/s derivadas de seed")
+    parser.add_argument("--signs", type=int, default=2000)
+    parser.add_argument("--wallets", type=int, default=50)
+    args = parser.parse_args()
+
+    n, _, d, p, q, dp, dq, qinv = private_key_from_seed("bench-seed")
+    print(f"firma pow(h, d, n)   {rate(args.signs, lambda i: sign_message(n, d, b'msg-%d' % i)):>10,.0f} firmas/s")
+    print(f"firma CRT            {rate(args.signs, lambda i: sign_message_crt(p, q, dp, dq, qinv, b'msg-%d' % i)):>10,.0f} firmas/s")
+    # Seeds distintas en cada pasada: la caché LRU de keypair_from_seed no interviene
+    print(f"primos sin criba     {rate(args.wallets, lambda i: naive_prime(b'naive-%d' % i, b'p')):>10,.1f} primos/s")
+    print(f"wallets (con criba)  {rate(args.wallets, lambda i: Wallet.from_seed('bench', f'wallet-{i}')):>10,.1f} wallets/s")
+
+
+if __name__ == "__main__":
+    main()
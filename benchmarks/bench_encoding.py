@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mini_chain.block import LEGACY_BLOCK_VERSION, Block
+from mini_chain.transaction import LEGACY_TX_VERSION, Transaction, TxInput, TxOutput
+from mini_chain.wallet import Wallet
+
+
+def sample_block(wallet: Wallet, txs: int) -> Block:
+    transactions = []
+    for i in range(txs):
+        tx = Transaction(
+            inputs=[TxInput(txid=f"{i:064x}", vout=0, signature="", public_key=wallet.public_key_hex)],
+            outputs=[TxOutput(amount=1.25, address=wallet.address), TxOutput(amount=0.75, address=wallet.address)],
+        )
+        transactions.append(tx.with_signature(wallet.sign(tx.signable_payload())))
+    return Block(index=1, previous_hash="00" * 32, transactions=transactions, difficulty=3)
+
+
+def fresh(block: Block, legacy: bool = False) -> Block:
+    # Copias sin caché, para medir la serialización completa y no la memoizada
+    tx_version = LEGACY_TX_VERSION if legacy else block.transactions[0].version
+    txs = [replace(tx, version=tx_version) for tx in block.transactions]
+    return replace(block, transactions=txs, version=LEGACY_BLOCK_VERSION if legacy else block.version)
+
+
+def timed(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tamaño y tiempo de (de)serialización JSON vs binaria")
+    parser.add_argument("--txs", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    block = sample_block(Wallet.from_seed("bench", "bench-encoding-seed"), args.txs)
+    legacy = fresh(block, legacy=True)
+
+    json_bytes = json.dumps(legacy.to_dict()).encode()
+    binary_bytes = block.encode()
+
+    json_encode = timed(lambda: json.dumps(fresh(block, legacy=True).to_dict()).encode(), args.rounds)
+    json_decode = timed(lambda: Block.from_dict(json.loads(json_bytes)), args.rounds)
+    json_hash = timed(lambda: fresh(block, legacy=True).hash(), args.rounds)
+    bin_encode = timed(lambda: fresh(block).encode(), args.rounds)
+    bin_decode = timed(lambda: Block.from_bytes(binary_bytes), args.rounds)
+    bin_hash = timed(lambda: fresh(block).hash(), args.rounds)
+
+    print(f"block with {args.txs} txs")
+    print(f"{'format':<8}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}{'hash ms':>12}")
+    print(f"{'json':<8}{len(json_bytes):>12}{json_encode:>12.2f}{json_decode:>12.2f}{json_hash:>12.2f}")
+    print(f"{'binary':<8}{len(binary_bytes):>12}{bin_encode:>12.2f}{bin_decode:>12.2f}{bin_hash:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mini_chain.block import Block
+from mini_chain.mining import ParallelMiner
+from mini_chain.transaction import Transaction, TxOutput
+
+
+def sample_block(difficulty: int, salt: int) -> Block:
+    txs = [Transaction(inputs=[], outputs=[TxOutput(amount=50.0, address=f"bench-{salt}-{i}")], is_coinbase=True) for i in range(4)]
+    return Block(index=salt, previous_hash="00" * 32, transactions=txs, difficulty=difficulty)
+
+
+def bench(workers: int, difficulty: int, blocks: int) -> float:
+    miner = ParallelMiner(workers)
+    try:
+        # Calentamiento: arranca el pool antes de medir
+        sample_block(1, -1).mine(miner)
+        attempts = 0
+        start = time.perf_counter()
+        for i in range(blocks):
+            sample_block(difficulty, i).mine(miner)
+            attempts += miner.last_attempts
+        return attempts / (time.perf_counter() - start)
+    finally:
+        miner.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hashes/s del minado según número de workers")
+    parser.add_argument("--difficulty", type=int, default=5)
+    parser.add_argument("--blocks", type=int, default=3)
+    parser.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, os.cpu_count() or 1})))
+    args = parser.parse_args()
+
+    print(f"difficulty={args.difficulty} blocks={args.blocks} cpu_count={os.cpu_count()}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        rate = bench(workers, args.difficulty, args.blocks)
+        print(f"workers={workers:<3} {rate:>14,.0f} H/s")
+
+
+if __name__ == "__main__":
+    main()
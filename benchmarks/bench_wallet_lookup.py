@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mini_chain.blockchain import Blockchain
+from mini_chain.wallet import Wallet
+
+
+def synthetic_wallet(i: int) -> Wallet:
+    # Wallet sintética: evita derivar primos RSA para poblar decenas de miles de entradas
+    return Wallet(
+        name=f"bench-{i}",
+        seed=f"bench-seed-{i}",
+        private_key_wif=f"bench-wif-{i}",
+        public_key_hex="",
+        address=f"bench-internal-{i}",
+        btc_public_key_hex="",
+        btc_address=f"bench-btc-{i}",
+        _priv=(0, 0, 0),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Coste de resolver address/WIF según número de wallets")
+    parser.add_argument("--sizes", default="100,1000,10000,50000")
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    bc = Blockchain(difficulty=1, block_interval=999)
+    registered = 0
+    for size in (int(n) for n in args.sizes.split(",")):
+        while registered < size:
+            bc.add_wallet(synthetic_wallet(registered))
+            registered += 1
+        # Peor caso del recorrido lineal: la última wallet registrada
+        last = synthetic_wallet(size - 1)
+
+        start = time.perf_counter()
+        for _ in range(args.lookups):
+            bc._resolve_internal_address(last.btc_address)
+        resolve_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+        start = time.perf_counter()
+        for _ in range(args.lookups):
+            bc._wallet_for_signing(last.btc_address, last.private_key_wif)
+        wif_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+        print(f"wallets={size:<7} resolve={resolve_us:8.2f} us  wif_signer={wif_us:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import List, Tuple
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _request(reader, writer, raw: bytes) -> Tuple[int, bool]:
+    # Devuelve (status, la conexión sigue abierta)
+    writer.write(raw)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+    length = int(headers.get("content-length", "0"))
+    if length:
+        await reader.readexactly(length)
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(host: str, port: int, raw: bytes, deadline: float, latencies: List[float], statuses: Counter) -> None:
+    # Una conexión keep-alive que repite la petición hasta el deadline
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        start = time.perf_counter()
+        try:
+            status, alive = await _request(reader, writer, raw)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            statuses["error"] += 1
+            writer.close()
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[status] += 1
+        if not alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run(args) -> None:
+    body = args.body.encode()
+    raw = (
+        f"{args.method} {args.path} HTTP/1.1\r\nHost: {args.host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(client(args.host, args.port, raw, deadline, latencies, statuses) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.method} {args.path} concurrency={args.concurrency} duration={elapsed:.1f}s")
+    print(f"requests={len(latencies)} rate={len(latencies) / elapsed:,.0f} req/s")
+    print("status=" + " ".join(f"{code}:{count}" for code, count in sorted(statuses.items(), key=str)))
+    print(
+        f"latency p50={percentile(latencies, 50) * 1000:.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.2f}ms max={max(latencies, default=0) * 1000:.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga HTTP keep-alive contra api_server.py: latencia p50/p99")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--path", default="/api/summary")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--body", default="")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
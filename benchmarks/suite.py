@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_server import APIServer
+from benchmarks.load_test import percentile
+from benchmarks.synthetic import extend_chain, synthetic_chain
+from mini_chain.block import Block
+from mini_chain.transaction import Transaction, TxOutput
+from mini_chain.wallet import Wallet
+
+Results = Dict[str, dict]
+
+# Tamaños por defecto y con --quick (comprobación rápida de que todo corre)
+FULL = {"difficulty": 4, "mine_blocks": 16, "heights": (100, 500, 1000), "txs": 300, "requests": 100, "api_height": 200, "wallets": 20}
+QUICK = {"difficulty": 2, "mine_blocks": 4, "heights": (20, 50), "txs": 40, "requests": 10, "api_height": 30, "wallets": 4}
+
+
+def metric(value: float, unit: str, better: str = "higher") -> dict:
+    # 4 cifras significativas: suficiente para comparar y legible en el JSON
+    return {"value": float(f"{value:.4g}"), "unit": unit, "better": better}
+
+
+def mean_seconds(fn: Callable[[], object], repeat: int, rounds: int = 5) -> float:
+    # Media por llamada de la mejor de `rounds` tandas (como timeit): filtra las
+    # interrupciones de otros procesos, que solo pueden hacer la medida más lenta
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def bench_mining(difficulty: int, blocks: int) -> Results:
+    # Mediana de los hashes/s de cada bloque: más estable que el total frente a pausas puntuales
+    rates = []
+    for i in range(blocks):
+        txs = [Transaction(inputs=[], outputs=[TxOutput(amount=50.0, address=f"suite-{i}-{j}")], is_coinbase=True) for j in range(4)]
+        block = Block(index=i, previous_hash="00" * 32, transactions=txs, difficulty=difficulty)
+        start = time.perf_counter()
+        block.mine()
+        rates.append((block.nonce + 1) / (time.perf_counter() - start))
+    return {"mine.hashes_per_s": metric(percentile(rates, 50), "H/s")}
+
+
+def bench_chain_queries(heights: List[int]) -> Results:
+    # Una sola cadena que crece hasta cada altura pedida y se mide en cada punto
+    results: Results = {}
+    bc, wallets, rng = synthetic_chain(0)
+    try:
+        for height in sorted(heights):
+            extend_chain(bc, wallets, height - (len(bc.chain) - 1), 4, rng)
+            results[f"utxos.ms@{height}"] = metric(mean_seconds(bc.utxos, 200) * 1e3, "ms", "lower")
+            address = wallets[0].address
+            results[f"balance_of.us@{height}"] = metric(mean_seconds(lambda: bc.balance_of(address), 2000) * 1e6, "µs", "lower")
+
+        blocks = len(bc.chain)
+        results["validate_chain.blocks_per_s"] = metric(blocks / mean_seconds(bc.validate_chain, 5), "blocks/s")
+        report = bc.validate_full()
+        results["validate_full.blocks_per_s"] = metric(report.as_dict()["blocks_per_s"], "blocks/s")
+    finally:
+        bc.close()
+    return results
+
+
+def bench_transactions(count: int, wallets: int = 8) -> Results:
+    # Cada wallet recibe antes las coinbases que necesita: una tx pendiente bloquea sus
+    # outpoints hasta el siguiente bloque, así que cada envío usa una coinbase distinta
+    bc, members, _ = synthetic_chain(0, wallets=wallets)
+    try:
+        for _ in range(count // wallets + 1):
+            for wallet in members:
+                bc.mine_block(wallet.address)
+        start = time.perf_counter()
+        accepted = 0
+        for i in range(count):
+            sender, receiver = members[i % wallets], members[(i + 1) % wallets]
+            accepted += bc.add_transaction(bc.create_transaction(sender.address, receiver.address, 1.0, sender.seed))
+        elapsed = time.perf_counter() - start
+        if accepted != count:
+            raise RuntimeError(f"Solo se aceptaron {accepted} de {count} transacciones")
+        return {"create_add_tx.tx_per_s": metric(count / elapsed, "tx/s")}
+    finally:
+        bc.close()
+
+
+def bench_api_state(height: int, requests: int) -> Results:
+    bc, _, _ = synthetic_chain(height)
+    api = APIServer(bc, workers=1)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        server = asyncio.run_coroutine_threadsafe(api.start("127.0.0.1", 0), loop).result()
+        conn = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=30)
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            conn.request("GET", "/api/state")
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            if response.status != 200:
+                raise RuntimeError(f"/api/state respondió {response.status}")
+        conn.close()
+        return {
+            f"api_state.p50_ms@{height}": metric(percentile(latencies, 50) * 1e3, "ms", "lower"),
+            # p90 y no p99: con cien peticiones el p99 es prácticamente el máximo y no es estable
+            f"api_state.p90_ms@{height}": metric(percentile(latencies, 90) * 1e3, "ms", "lower"),
+        }
+    finally:
+        asyncio.run_coroutine_threadsafe(api.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        bc.close()
+
+
+def bench_wallets(count: int) -> Results:
+    # Seeds nuevas en cada ejecución: ni la caché LRU de claves ni el índice de seeds intervienen
+    seeds = iter(f"suite-{time.time_ns()}-{i}" for i in range(count))
+    elapsed = mean_seconds(lambda: Wallet.from_seed("suite", next(seeds)), count, rounds=1)
+    return {"wallet_derivation.ms": metric(elapsed * 1e3, "ms", "lower")}
+
+
+def run(sizes: dict) -> Results:
+    results: Results = {}
+    steps = [
+        ("minado", lambda: bench_mining(sizes["difficulty"], sizes["mine_blocks"])),
+        ("utxos/balance_of/validación", lambda: bench_chain_queries(list(sizes["heights"]))),
+        ("create_transaction + add_transaction", lambda: bench_transactions(sizes["txs"])),
+        ("/api/state", lambda: bench_api_state(sizes["api_height"], sizes["requests"])),
+        ("derivación de wallets", lambda: bench_wallets(sizes["wallets"])),
+    ]
+    for label, step in steps:
+        start = time.perf_counter()
+        results.update(step())
+        print(f"  {label:<40} {time.perf_counter() - start:6.1f} s", file=sys.stderr)
+    return results
+
+
+def compare(results: Results, baseline: Results, tolerance: float) -> List[str]:
+    # Imprime la comparación y devuelve las métricas que empeoran más que `tolerance`
+    regressions = []
+    print(f"{'métrica':<36} {'base':>12} {'actual':>12} {'cambio':>8}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            print(f"{name:<36} {'-':>12} {current['value']:>12,.4g}")
+            continue
+        change = current["value"] / base["value"] - 1
+        worse = -change if current["better"] == "higher" else change
+        flag = "  REGRESIÓN" if worse > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<36} {base['value']:>12,.4g} {current['value']:>12,.4g} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks de los caminos críticos de mini_chain con salida JSON")
+    parser.add_argument("--quick", action="store_true", help="tamaños pequeños, para comprobar que todo corre")
+    parser.add_argument("--output", help="fichero JSON de resultados (p. ej. para guardarlo como baseline)")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="empeoramiento relativo tolerado antes de fallar")
+    args = parser.parse_args()
+
+    sizes = QUICK if args.quick else FULL
+    print(f"python {platform.python_version()} cpu_count={os.cpu_count()} quick={args.quick}", file=sys.stderr)
+    results = run(sizes)
+    document = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": {k: list(v) if isinstance(v, tuple) else v for k, v in sizes.items()},
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2, ensure_ascii=False) + "\n")
+
+    if args.baseline is None:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    baseline = json.loads(Path(args.baseline).read_text())
+    if baseline["meta"].get("sizes") != document["meta"]["sizes"]:
+        print("aviso: el baseline se midió con otros tamaños", file=sys.stderr)
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} métricas empeoran más de un {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
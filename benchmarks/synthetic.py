@@ -0,0 +1,46 @@
+import random
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mini_chain.blockchain import Blockchain
+from mini_chain.wallet import Wallet
+
+# Generadores de wallets y cadenas sintéticas para los benchmarks. Con la misma `seed` se
+# obtienen las mismas wallets y la misma secuencia de transferencias (los hashes cambian
+# con los timestamps, pero no el tamaño ni la forma de la cadena).
+
+
+def synthetic_wallets(bc: Blockchain, count: int, prefix: str = "bench") -> List[Wallet]:
+    return [bc.register_wallet(f"{prefix}-{i}", f"{prefix}-seed-{i}") for i in range(count)]
+
+
+def extend_chain(bc: Blockchain, wallets: List[Wallet], blocks: int, txs_per_block: int, rng: random.Random) -> int:
+    # Mina `blocks` bloques con hasta `txs_per_block` transferencias entre wallets al azar.
+    # Devuelve las transacciones confirmadas (las de wallets sin saldo libre se omiten).
+    confirmed = 0
+    for _ in range(blocks):
+        for _ in range(txs_per_block):
+            sender, receiver = rng.sample(wallets, 2)
+            try:
+                tx = bc.create_transaction(sender.address, receiver.address, round(rng.uniform(0.1, 5.0), 2), sender.seed)
+            except ValueError:
+                continue
+            confirmed += bc.add_transaction(tx)
+        bc.mine_block(wallets[len(bc.chain) % len(wallets)].address)
+    return confirmed
+
+
+def synthetic_chain(
+    height: int, wallets: int = 8, txs_per_block: int = 4, seed: int = 0, **kwargs
+) -> Tuple[Blockchain, List[Wallet], random.Random]:
+    # Cadena de dificultad 1 (el coste de construirla es el de firmar, no el de minar)
+    kwargs.setdefault("difficulty", 1)
+    kwargs.setdefault("block_interval", 10**6)
+    bc = Blockchain(**kwargs)
+    rng = random.Random(seed)
+    members = synthetic_wallets(bc, wallets)
+    extend_chain(bc, members, height, txs_per_block, rng)
+    return bc, members, rng
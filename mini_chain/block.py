@@ -1,40 +1,241 @@
 import json
 import time
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional, Tuple
 
 from .crypto_utils import double_sha256
+from .encoding import F64, U8, U32, U64, DecodeError, Reader, encode_bytes, encode_hash, encode_varint
+from .merkle import MerkleTree
+from .metrics import MINING_HASHES, MINING_HASHRATE, MINING_SECONDS
+from .mining import ParallelMiner, search_nonce, split_header
 from .transaction import Transaction
 
+# Versión 1: header JSON con el nonce en medio (formato heredado, verificable).
+# Versión 2: header binario con el nonce (uint64) al final, a offset fijo.
+# Versión 3: como la 2, pero con la raíz de Merkle de los txids en lugar de la lista
+# completa: header de tamaño fijo e independiente del número de transacciones.
+LEGACY_BLOCK_VERSION = 1
+TXIDS_BLOCK_VERSION = 2
+BLOCK_VERSION = 3
+SUPPORTED_BLOCK_VERSIONS = (LEGACY_BLOCK_VERSION, TXIDS_BLOCK_VERSION, BLOCK_VERSION)
 
-@dataclass
+
+@dataclass(frozen=True)
 class Block:
+    # Inmutable salvo por vías explícitas que invalidan la caché de hash: mine() (fija el
+    # nonce) y replace_transaction() (usada por tamper_block).
     index: int
     previous_hash: str
-    transactions: List[Transaction]
+    transactions: Tuple[Transaction, ...]
     difficulty: int
     nonce: int = 0
     timestamp: float = field(default_factory=time.time)
+    version: int = BLOCK_VERSION
+    _txids: Optional[List[str]] = field(default=None, init=False, repr=False, compare=False)
+    _merkle: Optional[MerkleTree] = field(default=None, init=False, repr=False, compare=False)
+    # Raíz recibida en una cabecera sin transacciones (sincronización headers-first)
+    _merkle_root: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    _hash: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
-    def header(self) -> bytes:
-        txids = [tx.txid() for tx in self.transactions]
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "transactions", tuple(self.transactions))
+
+    def _invalidate(self) -> None:
+        object.__setattr__(self, "_hash", None)
+
+    def txids(self) -> List[str]:
+        if self._txids is None:
+            object.__setattr__(self, "_txids", [tx.txid() for tx in self.transactions])
+        return self._txids
+
+    def merkle_tree(self) -> MerkleTree:
+        if self._merkle is None:
+            object.__setattr__(self, "_merkle", MerkleTree.from_txids(self.txids()))
+        return self._merkle
+
+    def merkle_root(self) -> str:
+        if self._merkle_root is not None:
+            return self._merkle_root.hex()
+        return self.merkle_tree().root().hex()
+
+    def _serialize_header(self, nonce: int) -> bytes:
         body = {
             "index": self.index,
             "previous_hash": self.previous_hash,
-            "txids": txids,
+            "txids": self.txids(),
             "difficulty": self.difficulty,
-            "nonce": self.nonce,
+            "nonce": nonce,
             "timestamp": self.timestamp,
         }
         return json.dumps(body, sort_keys=True).encode("utf-8")
 
+    def _binary_header_prefix(self) -> bytes:
+        parts = [
+            U8.pack(self.version),
+            U32.pack(self.index),
+            encode_hash(self.previous_hash),
+            U8.pack(self.difficulty),
+            F64.pack(self.timestamp),
+        ]
+        if self.version == TXIDS_BLOCK_VERSION:
+            parts.append(encode_varint(len(self.txids())))
+            parts.extend(bytes.fromhex(txid) for txid in self.txids())
+        else:
+            parts.append(encode_hash(self.merkle_root()))
+        return b"".join(parts)
+
+    @property
+    def nonce_width(self) -> int:
+        # 0 = nonce en decimal ASCII (JSON heredado); 8 = uint64 big-endian
+        return 0 if self.version == LEGACY_BLOCK_VERSION else U64.size
+
+    def header(self) -> bytes:
+        if self.version == LEGACY_BLOCK_VERSION:
+            return self._serialize_header(self.nonce)
+        return self._binary_header_prefix() + U64.pack(self.nonce)
+
+    def header_template(self) -> Tuple[bytes, bytes]:
+        if self.version == LEGACY_BLOCK_VERSION:
+            return split_header(self._serialize_header(0))
+        return self._binary_header_prefix(), b""
+
     def hash(self) -> str:
-        return double_sha256(self.header()).hex()
+        if self._hash is None:
+            object.__setattr__(self, "_hash", double_sha256(self.header()).hex())
+        return self._hash
+
+    def mine(self, miner: Optional[ParallelMiner] = None) -> None:
+        prefix, suffix = self.header_template()
+        started = time.perf_counter()
+        if miner is not None:
+            nonce = miner.search(prefix, suffix, self.difficulty, start=self.nonce, nonce_width=self.nonce_width)
+            attempts = miner.last_attempts
+        else:
+            nonce = search_nonce(prefix, suffix, self.difficulty, start=self.nonce, nonce_width=self.nonce_width)
+            attempts = nonce - self.nonce + 1
+        elapsed = time.perf_counter() - started
+        MINING_HASHES.inc(attempts)
+        MINING_SECONDS.inc(elapsed)
+        MINING_HASHRATE.set(attempts / max(elapsed, 1e-9))
+        object.__setattr__(self, "nonce", nonce)
+        self._invalidate()
 
-    def mine(self) -> None:
-        target = "0" * self.difficulty
-        while not self.hash().startswith(target):
-            self.nonce += 1
+    def replace_transaction(self, position: int, tx: Transaction) -> None:
+        txs = list(self.transactions)
+        txs[position] = tx
+        object.__setattr__(self, "transactions", tuple(txs))
+        if self._txids is not None:
+            self._txids[position] = tx.txid()
+        if self._merkle is not None:
+            self._merkle.update(position, bytes.fromhex(tx.txid()))
+        self._invalidate()
+
+    @classmethod
+    def from_dict(cls, data: dict, block_hash: Optional[str] = None) -> "Block":
+        # block_hash permite reutilizar un hash ya conocido (p. ej. del índice en disco) sin recalcularlo
+        block = cls(
+            index=data["index"],
+            previous_hash=data["previous_hash"],
+            transactions=[Transaction.from_dict(tx) for tx in data["transactions"]],
+            difficulty=data["difficulty"],
+            nonce=data["nonce"],
+            timestamp=data["timestamp"],
+            version=data.get("version", LEGACY_BLOCK_VERSION),
+        )
+        if block_hash is not None:
+            object.__setattr__(block, "_hash", block_hash)
+        return block
+
+    def encode(self) -> bytes:
+        # Registro completo (almacenamiento/transmisión). Las transacciones van con su
+        # serialización de consenso, así que también admite bloques heredados.
+        parts = [
+            U8.pack(self.version),
+            U32.pack(self.index),
+            encode_hash(self.previous_hash),
+            U8.pack(self.difficulty),
+            F64.pack(self.timestamp),
+            U64.pack(self.nonce),
+            encode_varint(len(self.transactions)),
+        ]
+        parts.extend(encode_bytes(tx.serialize()) for tx in self.transactions)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, block_hash: Optional[str] = None) -> "Block":
+        reader = Reader(data)
+        version = reader.unpack(U8)
+        if version not in SUPPORTED_BLOCK_VERSIONS:
+            raise DecodeError(f"Versión de bloque no soportada: {version}")
+        index = reader.unpack(U32)
+        previous_hash = reader.hash()
+        difficulty = reader.unpack(U8)
+        timestamp = reader.unpack(F64)
+        nonce = reader.unpack(U64)
+        transactions = [Transaction.from_bytes(reader.bytes()) for _ in range(reader.varint())]
+        reader.expect_end()
+        block = cls(
+            index=index,
+            previous_hash=previous_hash,
+            transactions=transactions,
+            difficulty=difficulty,
+            nonce=nonce,
+            timestamp=timestamp,
+            version=version,
+        )
+        if block_hash is not None:
+            object.__setattr__(block, "_hash", block_hash)
+        return block
+
+    def encode_header(self) -> bytes:
+        # Cabecera para la sincronización headers-first: campos del header más la raíz de
+        # Merkle (o los txids en versiones anteriores), suficiente para recalcular el hash
+        # sin descargar las transacciones.
+        parts = [
+            U8.pack(self.version),
+            U32.pack(self.index),
+            encode_hash(self.previous_hash),
+            U8.pack(self.difficulty),
+            F64.pack(self.timestamp),
+            U64.pack(self.nonce),
+        ]
+        if self.version == BLOCK_VERSION:
+            parts.append(encode_hash(self.merkle_root()))
+        else:
+            parts.append(encode_varint(len(self.txids())))
+            parts.extend(bytes.fromhex(txid) for txid in self.txids())
+        return b"".join(parts)
+
+    @classmethod
+    def decode_header(cls, reader: Reader) -> "Block":
+        # Bloque "solo cabecera": sin transacciones, con la raíz (o los txids) fijados en la caché
+        version = reader.unpack(U8)
+        if version not in SUPPORTED_BLOCK_VERSIONS:
+            raise DecodeError(f"Versión de bloque no soportada: {version}")
+        index = reader.unpack(U32)
+        previous_hash = reader.hash()
+        difficulty = reader.unpack(U8)
+        timestamp = reader.unpack(F64)
+        nonce = reader.unpack(U64)
+        block = cls(index=index, previous_hash=previous_hash, transactions=(), difficulty=difficulty, nonce=nonce, timestamp=timestamp, version=version)
+        if version == BLOCK_VERSION:
+            object.__setattr__(block, "_merkle_root", bytes.fromhex(reader.hash()))
+        else:
+            object.__setattr__(block, "_txids", [reader.hash() for _ in range(reader.varint())])
+        return block
+
+    def summary(self) -> dict:
+        # Cabecera sin transacciones (eventos y listados ligeros)
+        return {
+            "index": self.index,
+            "hash": self.hash(),
+            "previous_hash": self.previous_hash,
+            "merkle_root": self.merkle_root(),
+            "difficulty": self.difficulty,
+            "nonce": self.nonce,
+            "timestamp": self.timestamp,
+            "tx_count": len(self.transactions),
+        }
 
     def to_dict(self) -> dict:
         return {
@@ -44,5 +245,7 @@ class Block:
             "difficulty": self.difficulty,
             "nonce": self.nonce,
             "timestamp": self.timestamp,
+            "version": self.version,
+            "merkle_root": self.merkle_root(),
             "hash": self.hash(),
         }
@@ -2,204 +2,805 @@ import json
 import threading
 import time
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
-
-from .block import Block
-from .crypto_utils import address_from_public_key
-from .transaction import Transaction, TxInput, TxOutput
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .block import BLOCK_VERSION, LEGACY_BLOCK_VERSION, Block
+from .coin_selection import COST_OF_CHANGE, DEFAULT_STRATEGY, select_coins
+from .crypto_utils import keypair_from_seed, seed_to_private_bytes
+from .events import EventBus
+from .mempool import MEMPOOL_MAX_BYTES, Mempool
+from .metrics import CACHE_ENTRIES, CACHE_HITS, CACHE_MISSES, CHAIN_HEIGHT, MEMPOOL_BYTES, MEMPOOL_TRANSACTIONS, UTXOS_SECONDS
+from .mining import ParallelMiner
+from .storage import UTXO_SNAPSHOT_INTERVAL, BlockStore, StoredChain
+from .transaction import LEGACY_TX_VERSION, TX_VERSION, VERIFIED_SIGNATURES, Transaction, TxInput, TxOutput
+from .tx_index import TxIndex
+from .utxo import UTXO, BlockUndo, Outpoint, UTXOSet
+from .validation import (
+    COINBASE_REWARD,
+    ValidationReport,
+    block_fees,
+    tx_fee,
+    valid_amount,
+    valid_block_shape,
+    valid_coinbase_total,
+    valid_proof,
+    validate_blocks,
+)
+from .verification import ParallelVerifier
 from .wallet import Wallet
 
 
-COINBASE_REWARD = 50.0
+# Génesis determinista: todos los nodos comparten el mismo bloque 0 y pueden intercambiar bloques
+GENESIS_TIMESTAMP = 1_700_000_000.0
+# Bloques de ramas laterales que se conservan; al superarlo se descartan los más antiguos
+MAX_SIDE_BLOCKS = 1024
+
+
+def block_work(block: Block) -> int:
+    # Intentos esperados para encontrar el bloque: 16 por cada cero hexadecimal exigido
+    return 16 ** block.difficulty
+
+
+@dataclass(frozen=True)
+class ChainSnapshot:
+    # Vista consistente y barata: la cadena en memoria solo crece por append (una
+    # reorganización la sustituye por una lista nueva), así que basta con fijar la
+    # altura en lugar de copiar la lista. En disco una reorganización trunca y reescribe
+    # los segmentos: se fija el epoch y cada lectura descarta lo que cambió desde entonces.
+    height: int
+    tip: str
+    mempool: Tuple[Transaction, ...]
+    chain: Sequence[Block]
+    epoch: Optional[int] = None
+
+    def blocks(self, start: int = 0, stop: Optional[int] = None) -> List[Block]:
+        end = self.height + 1 if stop is None else min(stop, self.height + 1)
+        blocks = list(self.chain[start : min(end, len(self.chain))])
+        if self.epoch is not None:
+            # Se comprueba después de leer: si hubo una reorganización durante la lectura
+            # solo se devuelve la parte común con la rama de la vista
+            common = self.chain.common_height(self.epoch)
+            if common is not None:
+                del blocks[max(0, common + 1 - start) :]
+        return blocks
 
 
 @dataclass
-class UTXO:
-    txid: str
-    vout: int
-    amount: float
-    address: str
+class Reorg:
+    fork_height: int
+    disconnected: List[Block]
+    connected: List[Block]
 
 
 class Blockchain:
-    def __init__(self, difficulty: int = 3, block_interval: int = 240):
+    def __init__(
+        self,
+        difficulty: int = 3,
+        block_interval: int = 240,
+        mining_workers: int = 1,
+        data_dir: Optional[str] = None,
+        legacy_json: bool = False,
+        mempool_max_bytes: int = MEMPOOL_MAX_BYTES,
+        verify_workers: int = 1,
+        reindex: bool = False,
+    ):
         self.difficulty = difficulty
         self.block_interval = block_interval
-        self.chain: List[Block] = []
-        self.mempool: List[Transaction] = []
+        # Modo de compatibilidad: bloques/transacciones nuevos con hash sobre JSON (versión 1)
+        self.block_version = LEGACY_BLOCK_VERSION if legacy_json else BLOCK_VERSION
+        self.tx_version = LEGACY_TX_VERSION if legacy_json else TX_VERSION
+        self.miner = ParallelMiner(mining_workers) if mining_workers != 1 else None
+        self.verifier = ParallelVerifier(verify_workers) if verify_workers != 1 else None
+        self.store = BlockStore(data_dir) if data_dir else None
+        self.chain: Sequence[Block] = StoredChain(self.store) if self.store is not None else []
+        self.mempool = Mempool(mempool_max_bytes)
         self.wallets: Dict[str, Wallet] = {}
+        self._wallets_by_seed_hash: Dict[bytes, Wallet] = {}
+        self._wallets_by_wif: Dict[str, Wallet] = {}
+        self._internal_by_btc: Dict[str, str] = {}
+        self._seed_index_hits = 0
+        self._seed_index_misses = 0
+        self.utxo_set = UTXOSet()
+        self.events = EventBus()
+        self._height_by_hash: Dict[str, int] = {}
+        # txid -> (altura, posición) y address -> historia, solo de la cadena principal
+        self.tx_index = TxIndex(self.store.blocks_dir / "txindex.dat" if self.store is not None else None)
+        # Árbol de bloques: la cadena principal más las ramas laterales conocidas
+        # (hash -> bloque y trabajo acumulado). Gana la rama con más trabajo.
+        # Trabajo acumulado de la cadena principal por altura (el del tip es el último).
+        self._work: List[int] = []
+        self._side: Dict[str, Tuple[Block, int]] = {}
+        self._invalid: Set[str] = set()
+        # Datos de undo de la cadena en memoria (con almacenamiento van a undo.dat)
+        self._undo: Dict[str, BlockUndo] = {}
+        # Validez de la cadena cacheada: solo una alteración la invalida (los bloques propios la extienden)
+        self._chain_valid: Optional[bool] = None
+        self._validity_epoch = 0
         self._lock = threading.Lock()
         self._running = False
+        self._closed = False
         self._thread = None
-        self._create_genesis_block()
+        # Resultado de la validación completa al arrancar con reindex=True
+        self.reindex_report: Optional[ValidationReport] = None
+        if len(self.chain) == 0:
+            self._create_genesis_block()
+            self._chain_valid = True
+        elif reindex:
+            self._reindex()
+        else:
+            self._load_from_store()
 
     def _create_genesis_block(self) -> None:
-        genesis_tx = Transaction(inputs=[], outputs=[TxOutput(amount=0, address="genesis")], is_coinbase=True)
-        genesis = Block(index=0, previous_hash="0" * 64, transactions=[genesis_tx], difficulty=1)
+        genesis_tx = Transaction(
+            inputs=[], outputs=[TxOutput(amount=0, address="genesis")], timestamp=GENESIS_TIMESTAMP, is_coinbase=True, version=self.tx_version
+        )
+        genesis = Block(
+            index=0, previous_hash="0" * 64, transactions=[genesis_tx], difficulty=1, timestamp=GENESIS_TIMESTAMP, version=self.block_version
+        )
         genesis.mine()
-        self.chain.append(genesis)
+        self._append_block(genesis)
+
+    def _load_from_store(self) -> None:
+        # Arranque rápido: wallets + snapshot UTXO y solo se re-aplican los bloques posteriores al snapshot
+        for wallet in self.store.load_wallets():
+            self._index_wallet(wallet)
+        self._height_by_hash = self.store.hash_index()
+        start = 0
+        snapshot = self.store.load_utxo_snapshot()
+        if snapshot is not None:
+            height, tip, utxos, work = snapshot
+            if work is not None and len(work) == height + 1 and height <= self.store.height and self.store.hash_at(height) == tip:
+                self.utxo_set.restore(utxos)
+                self._work = work
+                start = height + 1
+        for block in self.chain[start:]:
+            self.utxo_set.apply_block(block)
+            self._work.append(self._tip_work + block_work(block))
+        self._sync_tx_index()
+
+    def _sync_tx_index(self) -> None:
+        # Descarta lo indexado que ya no coincide con la cadena en disco (reorganización a
+        # medias o almacén truncado) e indexa los bloques que falten: un almacén anterior
+        # al índice se indexa una sola vez
+        height = min(len(self.tx_index), len(self.chain)) - 1
+        while height >= 0 and self.tx_index.hash_at(height) != self.store.hash_at(height):
+            height -= 1
+        self.tx_index.truncate(height)
+        for block in self.chain[height + 1 :]:
+            self.tx_index.add_block(block)
+
+    def _reindex(self) -> None:
+        # Arranque con validación completa desde génesis (hashes, firmas y gastos) en lugar del
+        # snapshot UTXO. Si un bloque no valida, se descartan él y los siguientes: el nodo los
+        # volverá a pedir a sus peers.
+        for wallet in self.store.load_wallets():
+            self._index_wallet(wallet)
+
+        def count_work(block: Block) -> None:
+            self._work.append(self._tip_work + block_work(block))
+            self.tx_index.add_block(block)
+
+        self.tx_index.truncate(-1)
+        payloads = (self.store.read_payload(height) for height in range(len(self.store)))
+        report = validate_blocks(payloads, self.difficulty, self.utxo_set, self._validation_workers(), on_block=count_work)
+        if not report.valid:
+            if report.blocks == 0:
+                raise ValueError("El bloque génesis del almacén no es válido")
+            self.chain.truncate(report.blocks - 1)
+        self._height_by_hash = self.store.hash_index()
+        self._save_snapshots()
+        self.reindex_report = report
+
+    def _validation_workers(self) -> int:
+        return self.verifier.workers if self.verifier is not None else 1
+
+    def _save_snapshots(self) -> None:
+        # Requiere self._lock. Snapshots del índice de transacciones y del UTXO set; el de
+        # UTXOs no se guarda con bloques alterados en memoria (no coincidiría con el disco)
+        self.tx_index.save_snapshot()
+        if self.chain.has_pinned:
+            return
+        height = len(self.chain) - 1
+        self.store.save_utxo_snapshot(height, self.store.hash_at(height), self.utxo_set.values(), self._work)
+
+    def _append_block(self, block: Block) -> None:
+        undo = self.utxo_set.apply_block(block)
+        if self.store is not None:
+            self.chain.append(block, undo.encode())
+        else:
+            self.chain.append(block)
+            self._undo[block.hash()] = undo
+        self._height_by_hash[block.hash()] = block.index
+        self.tx_index.add_block(block)
+        self._work.append(self._tip_work + block_work(block))
+        if self.store is not None and block.index % UTXO_SNAPSHOT_INTERVAL == 0:
+            self._save_snapshots()
+
+    @property
+    def _tip_work(self) -> int:
+        return self._work[-1] if self._work else 0
+
+    def _rebuild_utxos(self) -> None:
+        self.utxo_set.rebuild(self.chain)
 
     def register_wallet(self, name: str, seed: str) -> Wallet:
-        wallet = Wallet.from_seed(name, seed)
-        self.wallets[name] = wallet
+        return self.add_wallet(Wallet.from_seed(name, seed))
+
+    def add_wallet(self, wallet: Wallet) -> Wallet:
+        with self._lock:
+            if self.store is not None and self.wallets.get(wallet.name) != wallet:
+                self.store.save_wallet(wallet)
+            self._index_wallet(wallet)
         return wallet
 
+    def _index_wallet(self, wallet: Wallet) -> None:
+        self.wallets[wallet.name] = wallet
+        self._wallets_by_seed_hash[seed_to_private_bytes(wallet.seed)] = wallet
+        self._wallets_by_wif[wallet.private_key_wif] = wallet
+        self._internal_by_btc[wallet.btc_address] = wallet.address
+
     def wallet_from_entropy(self, entropy: str) -> Wallet:
         return Wallet.from_seed(name="entropy-wallet", seed=entropy)
 
     def utxos(self) -> List[UTXO]:
-        spent = set()
-        unspent: List[UTXO] = []
-        for block in self.chain:
-            for tx in block.transactions:
-                tid = tx.txid()
-                for txin in tx.inputs:
-                    spent.add((txin.txid, txin.vout))
-                for idx, out in enumerate(tx.outputs):
-                    if (tid, idx) not in spent:
-                        unspent.append(UTXO(txid=tid, vout=idx, amount=out.amount, address=out.address))
-        return [u for u in unspent if (u.txid, u.vout) not in spent]
+        with UTXOS_SECONDS.time(), self._lock:
+            return self.utxo_set.values()
 
     def balance_of(self, address: str) -> float:
         internal = self._resolve_internal_address(address)
-        return round(sum(u.amount for u in self.utxos() if u.address == internal), 8)
-
-    def _find_spendable(self, address: str, amount: float) -> Tuple[List[UTXO], float]:
-        total = 0.0
-        selected: List[UTXO] = []
-        for u in self.utxos():
-            if u.address != address:
-                continue
-            selected.append(u)
-            total += u.amount
-            if total >= amount:
-                break
-        return selected, total
+        with self._lock:
+            return self.utxo_set.balance(internal)
+
+    def address_utxos(self, address: str, offset: int = 0, limit: int = 50) -> Tuple[List[UTXO], int]:
+        internal = self._resolve_internal_address(address)
+        with self._lock:
+            return self.utxo_set.page_for_address(internal, offset, limit), self.utxo_set.count_for_address(internal)
+
+    def _find_spendable(self, address: str, amount: float, strategy: str = DEFAULT_STRATEGY) -> Tuple[List[UTXO], float]:
+        # Los outpoints que ya gasta una transacción pendiente no se vuelven a elegir
+        with self._lock:
+            candidates = [u for u in self.utxo_set.for_address(address) if self.mempool.spender((u.txid, u.vout)) is None]
+        return select_coins(candidates, amount, strategy)
 
     def _resolve_internal_address(self, address: str) -> str:
-        for wallet in self.wallets.values():
-            if address in (wallet.address, wallet.btc_address):
-                return wallet.address
-        return address
+        # Un address interno se resuelve a sí mismo; uno BTC, vía índice
+        return self._internal_by_btc.get(address, address)
 
     def _wallet_for_signing(self, from_address: str, private_material: str) -> Wallet:
-        # 1) Intentar tratar el input como seed/entropía
         normalized_from = self._resolve_internal_address(from_address)
+
+        # 1) Seed de una wallet registrada: índice hash(seed) -> wallet, sin re-derivar claves
+        with self._lock:
+            known = self._wallets_by_seed_hash.get(seed_to_private_bytes(private_material))
+            if known is not None and known.address == normalized_from:
+                self._seed_index_hits += 1
+                return known
+            self._seed_index_misses += 1
+
+        # 2) Intentar tratar el input como private key WIF de una wallet conocida
+        wallet = self._wallets_by_wif.get(private_material)
+        if wallet is not None and wallet.address == normalized_from:
+            return wallet
+
+        # 3) Intentar tratar el input como seed/entropía (derivación con caché LRU)
         from_seed_wallet = self.wallet_from_entropy(private_material)
         if from_seed_wallet.address == normalized_from:
             return from_seed_wallet
 
-        # 2) Intentar tratar el input como private key WIF de una wallet conocida
-        for wallet in self.wallets.values():
-            if wallet.address == normalized_from and wallet.private_key_wif == private_material:
-                return wallet
-
         raise ValueError("Private key (seed/WIF) no corresponde al address emisor")
 
-    def create_transaction(self, from_address: str, to_address: str, amount: float, private_material: str) -> Transaction:
+    def wallet_cache_stats(self) -> dict:
+        info = keypair_from_seed.cache_info()
+        with self._lock:
+            return {
+                "keypair_cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize},
+                "seed_index": {"hits": self._seed_index_hits, "misses": self._seed_index_misses, "size": len(self._wallets_by_seed_hash)},
+                "signature_cache": {"hits": VERIFIED_SIGNATURES.hits, "misses": VERIFIED_SIGNATURES.misses, "size": len(VERIFIED_SIGNATURES)},
+            }
+
+    def collect_metrics(self) -> None:
+        # Gauges y contadores que reflejan estado ya llevado en otro sitio: se fijan al exportar
+        stats = self.wallet_cache_stats()
+        with self._lock:
+            CHAIN_HEIGHT.set(len(self.chain) - 1)
+            MEMPOOL_TRANSACTIONS.set(len(self.mempool))
+            MEMPOOL_BYTES.set(self.mempool.total_bytes)
+        for cache, values in stats.items():
+            CACHE_HITS.labels(cache).set(values["hits"])
+            CACHE_MISSES.labels(cache).set(values["misses"])
+            CACHE_ENTRIES.labels(cache).set(values["size"])
+
+    def create_transaction(
+        self,
+        from_address: str,
+        to_address: str,
+        amount: float,
+        private_material: str,
+        coin_selection: str = DEFAULT_STRATEGY,
+        fee: float = 0.0,
+    ) -> Transaction:
         if amount <= 0:
             raise ValueError("El monto debe ser > 0")
+        if fee < 0:
+            raise ValueError("La comisión no puede ser negativa")
 
         signer_wallet = self._wallet_for_signing(from_address, private_material)
 
         internal_from = self._resolve_internal_address(from_address)
         internal_to = self._resolve_internal_address(to_address)
 
-        selected, total = self._find_spendable(internal_from, amount)
-        if total < amount:
+        selected, total = self._find_spendable(internal_from, amount + fee, coin_selection)
+        if total < amount + fee:
             raise ValueError("Fondos insuficientes")
 
         inputs = [TxInput(txid=u.txid, vout=u.vout, signature="", public_key=signer_wallet.public_key_hex) for u in selected]
         outputs = [TxOutput(amount=amount, address=internal_to)]
 
-        change = round(total - amount, 8)
-        if change > 0:
+        # Un cambio que no cubre su propio coste se deja como comisión (la selección
+        # branch-and-bound lo busca a propósito para no crear el output)
+        change = round(total - amount - fee, 8)
+        if change > COST_OF_CHANGE:
             outputs.append(TxOutput(amount=change, address=internal_from))
 
-        tx = Transaction(inputs=inputs, outputs=outputs)
-        msg = tx.signable_payload()
-        sig = signer_wallet.sign(msg)
-        for txin in tx.inputs:
-            txin.signature = sig
-        return tx
+        tx = Transaction(inputs=inputs, outputs=outputs, version=self.tx_version)
+        sig = signer_wallet.sign(tx.signable_payload())
+        return tx.with_signature(sig)
 
     def build_fake_transaction(self, from_address: str, to_address: str, amount: float) -> Transaction:
         fake_input = TxInput(txid="ff" * 32, vout=0, signature="00", public_key=json.dumps({"n": "123", "e": 65537}))
-        fake_output = TxOutput(amount=amount, address=to_address)
-        tx = Transaction(inputs=[fake_input], outputs=[fake_output])
+        outputs = [TxOutput(amount=amount, address=to_address)]
         if from_address:
-            tx.outputs.append(TxOutput(amount=0, address=from_address))
-        return tx
+            outputs.append(TxOutput(amount=0, address=from_address))
+        return Transaction(inputs=[fake_input], outputs=outputs, version=self.tx_version)
+
+    def _spends_valid_utxos(self, tx: Transaction, spent: Set[Outpoint]) -> bool:
+        return self._tx_fee(tx, spent) is not None
+
+    def _tx_fee(self, tx: Transaction, spent: Set[Outpoint]) -> Optional[float]:
+        # Requiere self._lock
+        return tx_fee(self.utxo_set, tx, spent)
 
     def add_transaction(self, tx: Transaction) -> bool:
-        if not tx.verify_signatures():
-            return False
+        return self.add_transactions([tx])[0] is None
+
+    def add_transactions(self, txs: Sequence[Transaction]) -> List[Optional[str]]:
+        # Por transacción: None si entró al mempool o el motivo del rechazo. La verificación RSA
+        # no necesita el lock (con verify_workers, va a un pool de procesos); el lote pasa después
+        # una sola vez por el UTXO set y el mempool, que detecta los conflictos dentro del lote.
+        signed = self.verifier.verify(txs) if self.verifier is not None else [tx.verify_signatures() for tx in txs]
+        results: List[Optional[str]] = []
+        added: List[str] = []
+        removed: List[str] = []
+        with self._lock:
+            for tx, ok in zip(txs, signed):
+                results.append(self._admit(tx, ok, removed))
+                if results[-1] is None:
+                    added.append(tx.txid())
+            size = len(self.mempool)
+        if added:
+            self.events.publish("mempool", {"added": added, "removed": removed, "size": size})
+        return results
+
+    def _admit(self, tx: Transaction, signed: bool, removed: List[str]) -> Optional[str]:
+        # Requiere self._lock. `removed` recibe las expulsadas para hacer sitio.
+        if tx.is_coinbase:
+            return "una coinbase no puede entrar al mempool"
+        if not signed:
+            return "firma inválida"
+        if tx.txid() in self.mempool:
+            return "ya está en el mempool"
+        if self.mempool.conflicts(tx):
+            return "gasta un outpoint que ya gasta otra transacción pendiente"
+        if not all(valid_amount(o.amount, positive=True) for o in tx.outputs):
+            return "las salidas deben tener montos positivos"
+        fee = self._tx_fee(tx, set())
+        if fee is None:
+            return "UTXO inexistente, ya gastado o de otro address"
+        # Con el mempool lleno puede expulsar a las de menor fee rate, o no alcanzarles
+        evicted = self.mempool.add(tx, fee)
+        if evicted is None:
+            return "fee rate insuficiente con el mempool lleno"
+        removed.extend(evicted)
+        return None
+
+    def get_transaction(self, txid: str) -> Optional[Transaction]:
+        with self._lock:
+            return self.mempool.get(txid)
 
-        utxo_map = {(u.txid, u.vout): u for u in self.utxos()}
-        in_total = 0.0
-        seen_inputs = set()
+    def _confirmed(self, txid: str) -> Optional[Tuple[Block, int, int]]:
+        # Bloque, posición y confirmaciones de una transacción de la cadena principal, vía índice
+        with self._lock:
+            location = self.tx_index.location(txid)
+            chain, tip_height = self.chain, len(self.chain) - 1
+        if location is None or location[0] > tip_height:
+            return None
+        height, position = location
+        block = chain[height]
+        # Un bloque alterado en memoria ya no contiene el txid indexado
+        if position >= len(block.transactions) or block.txids()[position] != txid:
+            return None
+        return block, position, tip_height - height + 1
+
+    def transaction_info(self, txid: str) -> Optional[dict]:
+        confirmed = self._confirmed(txid)
+        if confirmed is not None:
+            block, position, confirmations = confirmed
+            return {
+                "txid": txid,
+                "confirmed": True,
+                "block_hash": block.hash(),
+                "height": block.index,
+                "position": position,
+                "confirmations": confirmations,
+                "transaction": block.transactions[position].to_dict(),
+            }
+        with self._lock:
+            entry = self.mempool.entry(txid)
+        if entry is None:
+            return None
+        return {"txid": txid, "confirmed": False, "fee": entry.fee, "transaction": entry.tx.to_dict()}
+
+    def transaction_proof(self, txid: str) -> Optional[dict]:
+        # Prueba de inclusión de una transacción confirmada: con ella y la cabecera del bloque
+        # un cliente ligero comprueba la inclusión sin descargar el bloque (ver merkle.verify_proof)
+        confirmed = self._confirmed(txid)
+        if confirmed is None:
+            return None
+        block, position, _ = confirmed
+        return {
+            "txid": txid,
+            "block_hash": block.hash(),
+            "height": block.index,
+            "position": position,
+            "merkle_root": block.merkle_root(),
+            "proof": [{"hash": sibling, "left": left} for sibling, left in block.merkle_tree().proof(position)],
+        }
+
+    def address_history(self, address: str, offset: int = 0, limit: int = 50) -> Tuple[List[dict], int]:
+        # Transacciones confirmadas que tocan un address (BTC o interno), de la más reciente a la más antigua
+        internal = self._resolve_internal_address(address)
+        with self._lock:
+            page, total = self.tx_index.history(internal, offset, limit)
+            tip_height = len(self.chain) - 1
+        return [
+            {"txid": txid, "height": height, "position": position, "confirmations": tip_height - height + 1}
+            for txid, (height, position) in page
+        ], total
+
+    def mempool_info(self, limit: int = 50) -> dict:
+        with self._lock:
+            return {
+                "size": len(self.mempool),
+                "bytes": self.mempool.total_bytes,
+                "max_bytes": self.mempool.max_bytes,
+                "transactions": [
+                    {"txid": e.tx.txid(), "fee": e.fee, "size": e.size, "fee_rate": round(e.fee_rate, 3)}
+                    for e in self.mempool.best(limit)
+                ],
+            }
+
+    def valid_proof(self, block: Block) -> bool:
+        return valid_proof(block, self.difficulty)
+
+    def _valid_block_shape(self, block: Block) -> bool:
+        return valid_block_shape(block, self.difficulty)
+
+    def add_block(self, block: Block) -> bool:
+        # Bloque recibido de otro nodo. Entra en el árbol si su padre es conocido: extiende el
+        # tip, queda en una rama lateral o, si su rama acumula más trabajo, provoca una
+        # reorganización. Las firmas se verifican fuera del lock, igual que en add_transaction.
+        if not self._valid_block_shape(block):
+            return False
+        if not all(tx.verify_signatures() for tx in block.transactions[1:]):
+            return False
 
-        for txin in tx.inputs:
-            key = (txin.txid, txin.vout)
-            if key in seen_inputs:
+        block_hash = block.hash()
+        removed: List[str] = []
+        restored: List[str] = []
+        reorg: Optional[Reorg] = None
+        with self._lock:
+            if self._closed:
                 return False
-            seen_inputs.add(key)
-
-            if key not in utxo_map:
+            if block_hash in self._height_by_hash or block_hash in self._side or block.previous_hash in self._invalid:
                 return False
+            if block.previous_hash == self.chain[-1].hash():
+                if block.index != len(self.chain) or not self._connect(block):
+                    self._invalid.add(block_hash)
+                    return False
+                connected = [block]
+            else:
+                parent = self._tree_entry(block.previous_hash)
+                if parent is None or block.index != parent[0] + 1:
+                    return False
+                work = parent[1] + block_work(block)
+                while len(self._side) >= MAX_SIDE_BLOCKS:
+                    # Los descendientes de un bloque descartado ya no podrán reorganizar
+                    del self._side[next(iter(self._side))]
+                self._side[block_hash] = (block, work)
+                if work <= self._tip_work:
+                    # Rama lateral con menos trabajo: se guarda por si la extienden
+                    return True
+                reorg = self._reorganize(block_hash)
+                if reorg is None:
+                    return False
+                connected = reorg.connected
+            # Fuera del mempool: las incluidas y las que gastaban sus mismos outpoints
+            for b in connected:
+                removed.extend(self.mempool.remove_for_block(b.transactions[1:]))
+            if reorg is not None:
+                # Y las que gastaban salidas de los bloques desconectados
+                orphaned = [tx.txid() for tx in self.mempool if any((i.txid, i.vout) not in self.utxo_set for i in tx.inputs)]
+                removed.extend(self.mempool.remove(orphaned))
+                restored = self._restore_to_mempool(reorg, removed)
+            size = len(self.mempool)
+            tip = self.chain[-1]
+        if reorg is not None:
+            self.events.publish(
+                "reorg",
+                {
+                    "fork_height": reorg.fork_height,
+                    "disconnected": [b.hash() for b in reorg.disconnected],
+                    "connected": [b.hash() for b in reorg.connected],
+                },
+            )
+        self.events.publish("block", tip.summary())
+        if removed or restored:
+            self.events.publish("mempool", {"added": restored, "removed": removed, "size": size})
+        return True
 
-            utxo = utxo_map[key]
-            try:
-                pub = json.loads(txin.public_key)
-                addr = address_from_public_key(int(pub["n"]), int(pub["e"]))
-            except Exception:
-                return False
+    def _connect(self, block: Block) -> bool:
+        # Requiere self._lock. El bloque extiende el tip; forma y firmas ya se comprobaron.
+        # Con el UTXO set previo quedan los gastos y el tope de la coinbase (recompensa + comisiones).
+        fees = block_fees(self.utxo_set, block)
+        if fees is None or not valid_coinbase_total(block, fees):
+            return False
+        self._append_block(block)
+        return True
 
-            if addr != utxo.address:
-                return False
-            in_total += utxo.amount
+    def _tree_entry(self, block_hash: str) -> Optional[Tuple[int, int]]:
+        # Requiere self._lock. Altura y trabajo acumulado de un bloque del árbol
+        side = self._side.get(block_hash)
+        if side is not None:
+            return side[0].index, side[1]
+        height = self._height_by_hash.get(block_hash)
+        if height is None:
+            return None
+        return height, self._work[height]
+
+    def _undo_for(self, height: int, block: Block) -> Optional[BlockUndo]:
+        # Requiere self._lock. Con bloques alterados en memoria el undo en disco no sirve
+        if self.store is None:
+            return self._undo.get(block.hash())
+        if self.chain.has_pinned:
+            return None
+        data = self.store.read_undo(height)
+        return None if data is None else BlockUndo.decode(data)
+
+    def _disconnect_to(self, height: int) -> List[Block]:
+        # Requiere self._lock. Retira los bloques por encima de `height` revirtiendo su
+        # efecto en el UTXO set con los datos de undo; pasan a ser una rama lateral.
+        tip_height = len(self.chain) - 1
+        blocks = self.chain[height + 1 :]
+        undos = [self._undo_for(h, b) for h, b in zip(range(height + 1, tip_height + 1), blocks)]
+        for block, undo in zip(reversed(blocks), reversed(undos)):
+            block_hash = block.hash()
+            self._side[block_hash] = (block, self._work.pop())
+            self._height_by_hash.pop(block_hash, None)
+            self._undo.pop(block_hash, None)
+            if undo is not None:
+                self.utxo_set.undo_block(undo)
+        if self.store is not None:
+            self.chain.truncate(height)
+        else:
+            self.chain = self.chain[: height + 1]
+        self.tx_index.truncate(height)
+        if any(undo is None for undo in undos):
+            # Sin undo (almacén antiguo o bloques alterados): se recalcula desde génesis
+            self._rebuild_utxos()
+        return blocks
+
+    def _reorganize(self, new_tip: str) -> Optional[Reorg]:
+        # Requiere self._lock. Cambia la cadena principal a la rama que termina en `new_tip`.
+        # Si un bloque de la rama resulta inválido se descarta y se restaura la cadena anterior.
+        branch: List[Block] = []
+        cursor = new_tip
+        while cursor in self._side:
+            block = self._side[cursor][0]
+            branch.append(block)
+            cursor = block.previous_hash
+        branch.reverse()
+        fork_height = self._height_by_hash.get(cursor)
+        if fork_height is None:
+            # El punto de bifurcación ya no está en la cadena principal (p. ej. un bloque
+            # alterado cambió de hash, o se descartó un antecesor de la rama lateral)
+            self._forget_branch(branch[0].hash())
+            return None
+
+        disconnected = self._disconnect_to(fork_height)
+        for i, block in enumerate(branch):
+            del self._side[block.hash()]
+            if not self._connect(block):
+                self._side[block.hash()] = (block, 0)
+                self._forget_branch(block.hash())
+                self._disconnect_to(fork_height)
+                for old in disconnected:
+                    del self._side[old.hash()]
+                    self._append_block(old)
+                # La parte válida de la rama aún puede tener más trabajo que la cadena restaurada
+                if i and self._side[branch[i - 1].hash()][1] > self._tip_work:
+                    return self._reorganize(branch[i - 1].hash())
+                return None
+        # Los bloques conectados ya pasaron PoW y enlace al entrar al árbol: una cadena
+        # válida lo sigue siendo. Si no lo era, el bloque alterado pudo quedar desconectado.
+        if not self._chain_valid:
+            self._chain_valid = None
+        self._validity_epoch += 1
+        return Reorg(fork_height=fork_height, disconnected=disconnected, connected=branch)
+
+    def _forget_branch(self, block_hash: str) -> None:
+        # Requiere self._lock. Marca el bloque como inválido y descarta sus descendientes
+        self._invalid.add(block_hash)
+        self._side.pop(block_hash, None)
+        pending = True
+        while pending:
+            pending = False
+            for side_hash, (block, _) in list(self._side.items()):
+                if block.previous_hash in self._invalid:
+                    self._invalid.add(side_hash)
+                    del self._side[side_hash]
+                    pending = True
+
+    def _restore_to_mempool(self, reorg: Reorg, removed: List[str]) -> List[str]:
+        # Requiere self._lock. Las transacciones de los bloques desconectados que la rama
+        # nueva no incluye vuelven al mempool si siguen siendo válidas. `removed` recibe
+        # las expulsadas para hacerles sitio.
+        included = {txid for block in reorg.connected for txid in block.txids()}
+        restored = []
+        for block in reorg.disconnected:
+            for tx in block.transactions[1:]:
+                fee = None if tx.txid() in included else self._tx_fee(tx, set())
+                evicted = None if fee is None else self.mempool.add(tx, fee)
+                if evicted is not None:
+                    restored.append(tx.txid())
+                    removed.extend(evicted)
+        return restored
+
+    def _block_template(self, miner_address: str) -> Block:
+        # Requiere self._lock. La coinbase cobra la recompensa y las comisiones de lo seleccionado.
+        selected = self.mempool.select()
+        fees = sum(self.mempool.entry(tx.txid()).fee for tx in selected)
+        coinbase = Transaction(
+            inputs=[],
+            outputs=[TxOutput(amount=round(COINBASE_REWARD + fees, 8), address=miner_address)],
+            is_coinbase=True,
+            version=self.tx_version,
+        )
+        return Block(
+            index=len(self.chain),
+            previous_hash=self.chain[-1].hash(),
+            transactions=[coinbase] + selected,
+            difficulty=self.difficulty,
+            version=self.block_version,
+        )
+
+    def _commit_block(self, block: Block, removed: Optional[List[str]] = None) -> bool:
+        # Requiere self._lock. Descarta la plantilla si el tip cambió o alguna tx dejó de ser válida.
+        # `removed` recibe los txids que salen del mempool.
+        if removed is None:
+            removed = []
+        if self._closed:
+            raise RuntimeError("La blockchain está cerrada")
+        if block.index != len(self.chain) or block.previous_hash != self.chain[-1].hash():
+            return False
 
-        out_total = sum(o.amount for o in tx.outputs)
-        if in_total + 1e-9 < out_total:
+        spent: Set[Outpoint] = set()
+        stale = [tx.txid() for tx in block.transactions[1:] if not self._spends_valid_utxos(tx, spent)]
+        if stale:
+            removed.extend(self.mempool.remove(stale))
             return False
 
-        self.mempool.append(tx)
+        self._append_block(block)
+        removed.extend(self.mempool.remove_for_block(block.transactions[1:]))
         return True
 
     def mine_block(self, miner_address: str) -> Block:
-        coinbase = Transaction(inputs=[], outputs=[TxOutput(amount=COINBASE_REWARD, address=miner_address)], is_coinbase=True)
-        with self._lock:
-            txs = [coinbase] + self.mempool[:]
-            block = Block(
-                index=len(self.chain),
-                previous_hash=self.chain[-1].hash(),
-                transactions=txs,
-                difficulty=self.difficulty,
+        # La plantilla se toma bajo el lock, la PoW corre sin él y el append se confirma de forma atómica
+        while True:
+            with self._lock:
+                block = self._block_template(miner_address)
+            block.mine(self.miner)
+            removed: List[str] = []
+            with self._lock:
+                committed = self._commit_block(block, removed)
+                size = len(self.mempool)
+            if committed:
+                self.events.publish("block", block.summary())
+            if removed:
+                self.events.publish("mempool", {"added": [], "removed": removed, "size": size})
+            if committed:
+                return block
+
+    def snapshot(self) -> ChainSnapshot:
+        with self._lock:
+            height = len(self.chain) - 1
+            return ChainSnapshot(
+                height=height,
+                tip=self.chain[height].hash(),
+                mempool=self.mempool.view(),
+                chain=self.chain,
+                epoch=self.chain.epoch if self.store is not None else None,
             )
-            block.mine()
-            self.chain.append(block)
-            self.mempool.clear()
-            return block
+
+    def get_block(self, block_hash: str) -> Optional[Block]:
+        # También bloques de ramas laterales: los peers pueden necesitarlos para reorganizar
+        with self._lock:
+            height = self._height_by_hash.get(block_hash)
+            if height is not None:
+                return self.chain[height]
+            side = self._side.get(block_hash)
+            return None if side is None else side[0]
+
+    def height_of(self, block_hash: str) -> Optional[int]:
+        with self._lock:
+            return self._height_by_hash.get(block_hash)
+
+    def cached_chain_valid(self) -> Optional[bool]:
+        # Sin recorrer la cadena: None si la validez está por calcular (al reabrir o tras una alteración)
+        with self._lock:
+            return self._chain_valid
+
+    def chain_valid(self) -> bool:
+        with self._lock:
+            cached, epoch = self._chain_valid, self._validity_epoch
+        if cached is not None:
+            return cached
+        valid = self.validate_chain()
+        with self._lock:
+            if epoch == self._validity_epoch:
+                self._chain_valid = valid
+        return valid
 
     def validate_chain(self) -> bool:
-        for idx, block in enumerate(self.chain):
+        prev_hash = None
+        for idx, block in enumerate(self.snapshot().blocks()):
             block_hash = block.hash()
             if not block_hash.startswith("0" * block.difficulty):
                 return False
-            if idx == 0:
-                continue
-            prev = self.chain[idx - 1]
-            if block.previous_hash != prev.hash():
+            if idx > 0 and block.previous_hash != prev_hash:
                 return False
+            prev_hash = block_hash
         return True
 
+    def validate_full(self) -> ValidationReport:
+        # Además de PoW y enlaces, recalcula cada hash, verifica todas las firmas y repite
+        # los gastos sobre un UTXO set nuevo. No toca el estado de la cadena.
+        snap = self.snapshot()
+        if self.store is not None and not self.chain.has_pinned:
+            payloads = (self.store.read_payload(height) for height in range(snap.height + 1))
+        else:
+            payloads = (block.encode() for block in snap.blocks())
+        return validate_blocks(payloads, self.difficulty, UTXOSet(), self._validation_workers())
+
     def tamper_block(self, index: int) -> bool:
-        if index <= 0 or index >= len(self.chain):
-            return False
-        block = self.chain[index]
-        if not block.transactions:
-            return False
-        block.transactions[0].outputs[0].amount += 1
+        with self._lock:
+            if index <= 0 or index >= len(self.chain):
+                return False
+            block = self.chain[index]
+            if not block.transactions:
+                return False
+            tx = block.transactions[0]
+            self._height_by_hash.pop(block.hash(), None)
+            # Su undo ya no corresponde al bloque: una reorganización recalculará el UTXO set
+            self._undo.pop(block.hash(), None)
+            block.replace_transaction(0, tx.with_output_amount(0, tx.outputs[0].amount + 1))
+            self._height_by_hash[block.hash()] = index
+            self._chain_valid = None
+            self._validity_epoch += 1
+            # Con almacenamiento en disco el bloque alterado queda fijado solo en memoria
+            self.chain[index] = block
+            # El txid de la transacción alterada cambia: el índice UTXO se reconstruye
+            self._rebuild_utxos()
+        self.events.publish("tamper", {"index": index})
         return True
 
     def start_auto_mining(self, miner_address: str) -> None:
@@ -209,7 +810,10 @@ class Blockchain:
 
         def _loop() -> None:
             while self._running:
-                self.mine_block(miner_address)
+                try:
+                    self.mine_block(miner_address)
+                except RuntimeError:
+                    break
                 time.sleep(self.block_interval)
 
         self._thread = threading.Thread(target=_loop, daemon=True)
@@ -218,5 +822,20 @@ class Blockchain:
     def stop_auto_mining(self) -> None:
         self._running = False
 
+    def close(self) -> None:
+        self.stop_auto_mining()
+        if self.miner is not None:
+            self.miner.close()
+        if self.verifier is not None:
+            self.verifier.close()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self.store is not None:
+                self._save_snapshots()
+                self.store.close()
+            self.tx_index.close()
+
     def chain_data(self) -> List[dict]:
-        return [b.to_dict() for b in self.chain]
+        return [b.to_dict() for b in self.snapshot().blocks()]
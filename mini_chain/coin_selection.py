@@ -0,0 +1,89 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .encoding import SATOSHI, amount_to_sat
+from .utxo import UTXO
+
+Selection = Tuple[List[UTXO], float]
+
+BNB_MAX_TRIES = 100_000
+# Coste de un output de cambio: sus bytes (~43) más los del input que lo gaste después
+# (~172), a 1 sat/byte. Un exceso menor no compensa el cambio y se deja como comisión.
+CHANGE_COST_BYTES = 215
+COST_OF_CHANGE = CHANGE_COST_BYTES / SATOSHI
+
+
+def _accumulate(utxos: Sequence[UTXO], amount: float) -> Selection:
+    total = 0.0
+    selected: List[UTXO] = []
+    for u in utxos:
+        selected.append(u)
+        total += u.amount
+        if total >= amount:
+            break
+    return selected, total
+
+
+def oldest_first(utxos: Sequence[UTXO], amount: float) -> Selection:
+    # Orden de la cadena (comportamiento original de _find_spendable)
+    return _accumulate(utxos, amount)
+
+
+def largest_first(utxos: Sequence[UTXO], amount: float) -> Selection:
+    return _accumulate(sorted(utxos, key=lambda u: u.amount, reverse=True), amount)
+
+
+def smallest_first(utxos: Sequence[UTXO], amount: float) -> Selection:
+    return _accumulate(sorted(utxos, key=lambda u: u.amount), amount)
+
+
+def _bnb_search(values: List[int], target: int, max_excess: int) -> Optional[List[int]]:
+    # Búsqueda en profundidad (estilo Bitcoin Core) de un subconjunto cuya suma
+    # caiga en [target, target + max_excess], evitando así el output de cambio.
+    suffix = [0] * (len(values) + 1)
+    for i in range(len(values) - 1, -1, -1):
+        suffix[i] = suffix[i + 1] + values[i]
+
+    tries = 0
+    stack: List[Tuple[int, int, Tuple[int, ...]]] = [(0, 0, ())]
+    while stack:
+        idx, total, chosen = stack.pop()
+        tries += 1
+        if tries > BNB_MAX_TRIES:
+            return None
+        if total > target + max_excess or total + suffix[idx] < target:
+            continue
+        if total >= target:
+            return list(chosen)
+        if idx == len(values):
+            continue
+        # Se explora primero la rama que incluye el UTXO (queda en la cima de la pila)
+        stack.append((idx + 1, total, chosen))
+        stack.append((idx + 1, total + values[idx], chosen + (idx,)))
+    return None
+
+
+def branch_and_bound(utxos: Sequence[UTXO], amount: float, max_excess: float = COST_OF_CHANGE) -> Selection:
+    ordered = sorted(utxos, key=lambda u: u.amount, reverse=True)
+    picked = _bnb_search([amount_to_sat(u.amount) for u in ordered], amount_to_sat(amount), amount_to_sat(max_excess))
+    if picked is None:
+        return largest_first(utxos, amount)
+    selected = [ordered[i] for i in picked]
+    return selected, sum(u.amount for u in selected)
+
+
+STRATEGIES: Dict[str, Callable[[Sequence[UTXO], float], Selection]] = {
+    "oldest-first": oldest_first,
+    "largest-first": largest_first,
+    "smallest-first": smallest_first,
+    "branch-and-bound": branch_and_bound,
+}
+
+DEFAULT_STRATEGY = "oldest-first"
+
+
+def select_coins(utxos: Sequence[UTXO], amount: float, strategy: str = DEFAULT_STRATEGY) -> Selection:
+    try:
+        selector = STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"Estrategia de selección de monedas desconocida: {strategy}") from None
+    return selector(utxos, amount)
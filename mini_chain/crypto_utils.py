@@ -1,7 +1,16 @@
 import hashlib
 import json
 import random
-from typing import Tuple
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Derivar un par RSA desde seed busca dos primos de 256 bits: se cachean los más recientes
+KEYPAIR_CACHE_SIZE = 1024
+# Claves públicas ya interpretadas (JSON -> n, e) y su address
+PUBLIC_KEY_CACHE_SIZE = 4096
+# Criba previa a Miller-Rabin: primos pequeños y candidatos por ventana
+SIEVE_PRIMES_LIMIT = 2000
+SIEVE_WINDOW = 512
 
 ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
 
@@ -92,15 +101,38 @@ def is_probable_prime(n: int, k: int = 8) -> bool:
     return True
 
 
+def _small_primes(limit: int) -> Tuple[int, ...]:
+    flags = bytearray([1]) * limit
+    flags[:2] = b"\x00\x00"
+    for i in range(2, int(limit**0.5) + 1):
+        if flags[i]:
+            flags[i * i :: i] = bytes(len(range(i * i, limit, i)))
+    return tuple(i for i in range(3, limit) if flags[i])
+
+
+SMALL_PRIMES = _small_primes(SIEVE_PRIMES_LIMIT)
+
+
 def deterministic_prime(seed: bytes, salt: bytes) -> int:
+    # Primer primo probable >= x recorriendo los impares x, x + 2, ... Una criba incremental
+    # descarta por ventanas los candidatos con factores pequeños antes de Miller-Rabin:
+    # el resultado es el mismo que probando todos, pero con muchas menos exponenciaciones.
     x = int.from_bytes(sha256(seed + salt), "big") | 1
     x |= (1 << 255)
-    while not is_probable_prime(x):
-        x += 2
-    return x
-
-
-def private_key_from_seed(seed: str) -> Tuple[int, int, int]:
+    while True:
+        composite = bytearray(SIEVE_WINDOW)
+        for p in SMALL_PRIMES:
+            # Primer k con x + 2k ≡ 0 (mod p)
+            start = -(x % p) * ((p + 1) // 2) % p
+            composite[start::p] = b"\x01" * len(range(start, SIEVE_WINDOW, p))
+        for k in range(SIEVE_WINDOW):
+            if not composite[k] and is_probable_prime(x + 2 * k):
+                return x + 2 * k
+        x += 2 * SIEVE_WINDOW
+
+
+def private_key_from_seed(seed: str) -> Tuple[int, int, int, int, int, int, int, int]:
+    # (n, e, d, p, q, dp, dq, qinv): los tres últimos permiten firmar por CRT
     seed_b = seed.encode()
     p = deterministic_prime(seed_b, b"p")
     q = deterministic_prime(seed_b, b"q")
@@ -110,7 +142,7 @@ def private_key_from_seed(seed: str) -> Tuple[int, int, int]:
     phi = (p - 1) * (q - 1)
     e = 65537
     d = modinv(e, phi)
-    return n, e, d
+    return n, e, d, p, q, d % (p - 1), d % (q - 1), modinv(q, p)
 
 
 def address_from_public_key(n: int, e: int) -> str:
@@ -120,12 +152,36 @@ def address_from_public_key(n: int, e: int) -> str:
     return b58encode(payload + checksum)
 
 
+@lru_cache(maxsize=PUBLIC_KEY_CACHE_SIZE)
+def parse_public_key(public_key: str) -> Optional[Tuple[int, int]]:
+    try:
+        pub = json.loads(public_key)
+        return int(pub["n"]), int(pub["e"])
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=PUBLIC_KEY_CACHE_SIZE)
+def public_key_address(public_key: str) -> Optional[str]:
+    parsed = parse_public_key(public_key)
+    return None if parsed is None else address_from_public_key(*parsed)
+
+
 def sign_message(n: int, d: int, message: bytes) -> str:
     h = int.from_bytes(sha256(message), "big")
     sig = pow(h, d, n)
     return hex(sig)[2:]
 
 
+def sign_message_crt(p: int, q: int, dp: int, dq: int, qinv: int, message: bytes) -> str:
+    # Misma firma que sign_message (pow(h, d, n)), con dos exponenciaciones de la mitad de tamaño
+    h = int.from_bytes(sha256(message), "big")
+    m1 = pow(h, dp, p)
+    m2 = pow(h, dq, q)
+    sig = m2 + q * (qinv * (m1 - m2) % p)
+    return hex(sig)[2:]
+
+
 def verify_message(n: int, e: int, message: bytes, signature_hex: str) -> bool:
     try:
         sig = int(signature_hex, 16)
@@ -135,7 +191,9 @@ def verify_message(n: int, e: int, message: bytes, signature_hex: str) -> bool:
     return pow(sig, e, n) == h % n
 
 
-def keypair_from_seed(seed: str) -> Tuple[Tuple[int, int, int], str, str]:
-    n, e, d = private_key_from_seed(seed)
+@lru_cache(maxsize=KEYPAIR_CACHE_SIZE)
+def keypair_from_seed(seed: str) -> Tuple[Tuple[int, ...], str, str]:
+    priv = private_key_from_seed(seed)
+    n, e = priv[:2]
     pub = json.dumps({"n": str(n), "e": e})
-    return (n, e, d), pub, address_from_public_key(n, e)
+    return priv, pub, address_from_public_key(n, e)
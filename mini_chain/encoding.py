@@ -0,0 +1,197 @@
+import json
+import struct
+
+# Formato binario canónico (versión 2) de bloques y transacciones:
+# enteros big-endian de ancho fijo, longitudes como varint tipo CompactSize,
+# montos en satoshis (int64) y claves/firmas RSA como bytes crudos.
+
+SATOSHI = 10**8
+
+U8 = struct.Struct(">B")
+U16 = struct.Struct(">H")
+U32 = struct.Struct(">I")
+U64 = struct.Struct(">Q")
+I64 = struct.Struct(">q")
+F64 = struct.Struct(">d")
+
+# Etiquetas de campos que admiten una forma "opaca" para datos no canónicos
+# (p. ej. la transacción falsa del ataque didáctico).
+KEY_RSA = 0
+KEY_OPAQUE = 1
+SIG_INT = 0
+SIG_OPAQUE = 1
+
+
+class DecodeError(ValueError):
+    pass
+
+
+I64_MIN, I64_MAX = -(2**63), 2**63 - 1
+U32_MAX = 2**32 - 1
+
+
+def amount_to_sat(amount: float) -> int:
+    # ValueError si el monto no cabe en el int64 del formato (también NaN e infinito)
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        raise TypeError(f"Monto no numérico: {amount!r}")
+    try:
+        sat = int(round(amount * SATOSHI))
+    except (OverflowError, ValueError):
+        raise ValueError(f"Monto no representable: {amount}") from None
+    if not I64_MIN <= sat <= I64_MAX:
+        raise ValueError(f"Monto fuera de rango: {amount}")
+    return sat
+
+
+def sat_to_amount(sat: int) -> float:
+    return sat / SATOSHI
+
+
+def encode_varint(n: int) -> bytes:
+    if n < 0xFD:
+        return U8.pack(n)
+    if n <= 0xFFFF:
+        return b"\xfd" + U16.pack(n)
+    if n <= 0xFFFFFFFF:
+        return b"\xfe" + U32.pack(n)
+    return b"\xff" + U64.pack(n)
+
+
+def encode_bytes(data: bytes) -> bytes:
+    return encode_varint(len(data)) + data
+
+
+def encode_str(value: str) -> bytes:
+    return encode_bytes(value.encode("utf-8"))
+
+
+def encode_hash(hex_hash: str) -> bytes:
+    raw = bytes.fromhex(hex_hash)
+    if len(raw) != 32:
+        raise ValueError(f"Hash de 32 bytes esperado: {hex_hash}")
+    return raw
+
+
+def _int_to_bytes(n: int) -> bytes:
+    return n.to_bytes((n.bit_length() + 7) // 8, "big")
+
+
+def rsa_public_key_json(n: int, e: int) -> str:
+    # Mismo texto que json.dumps({"n": str(n), "e": e}), sin pasar por el encoder
+    return '{"n": "%d", "e": %d}' % (n, e)
+
+
+def _parse_rsa_key(public_key: str):
+    try:
+        pub = json.loads(public_key)
+        n, e = int(pub["n"]), int(pub["e"])
+    except Exception:
+        return None
+    # Solo es canónica si re-serializarla reproduce exactamente el mismo texto
+    if n <= 0 or e < 0 or e > 0xFFFFFFFF or rsa_public_key_json(n, e) != public_key:
+        return None
+    return n, e
+
+
+def encode_public_key(public_key: str) -> bytes:
+    parsed = _parse_rsa_key(public_key)
+    if parsed is None:
+        return U8.pack(KEY_OPAQUE) + encode_str(public_key)
+    n, e = parsed
+    return U8.pack(KEY_RSA) + encode_bytes(_int_to_bytes(n)) + U32.pack(e)
+
+
+def encode_signature(signature: str) -> bytes:
+    try:
+        value = int(signature, 16)
+    except ValueError:
+        value = None
+    if value is None or value < 0 or format(value, "x") != signature:
+        return U8.pack(SIG_OPAQUE) + encode_str(signature)
+    return U8.pack(SIG_INT) + encode_bytes(_int_to_bytes(value))
+
+
+class Reader:
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def take(self, size: int) -> bytes:
+        end = self.pos + size
+        if end > len(self.data):
+            raise DecodeError("Datos truncados")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def unpack(self, fmt: struct.Struct):
+        try:
+            value = fmt.unpack_from(self.data, self.pos)[0]
+        except struct.error as exc:
+            raise DecodeError("Datos truncados") from exc
+        self.pos += fmt.size
+        return value
+
+    def varint(self) -> int:
+        try:
+            first = self.data[self.pos]
+        except IndexError as exc:
+            raise DecodeError("Datos truncados") from exc
+        self.pos += 1
+        if first < 0xFD:
+            return first
+        fmt, minimum = {0xFD: (U16, 0xFD), 0xFE: (U32, 0x10000), 0xFF: (U64, 0x100000000)}[first]
+        value = self.unpack(fmt)
+        if value < minimum:
+            raise DecodeError("Varint no canónico")
+        return value
+
+    def bytes(self) -> bytes:
+        return self.take(self.varint())
+
+    def str(self) -> str:
+        try:
+            return self.bytes().decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise DecodeError("Texto UTF-8 inválido") from exc
+
+    def hash(self) -> str:
+        return self.take(32).hex()
+
+    def _canonical_int(self) -> int:
+        raw = self.bytes()
+        if raw[:1] == b"\x00":
+            raise DecodeError("Entero no canónico")
+        return int.from_bytes(raw, "big")
+
+    def public_key(self) -> str:
+        tag = self.unpack(U8)
+        if tag == KEY_OPAQUE:
+            value = self.str()
+            if _parse_rsa_key(value) is not None:
+                raise DecodeError("Clave RSA codificada de forma no canónica")
+            return value
+        if tag != KEY_RSA:
+            raise DecodeError(f"Tipo de clave desconocido: {tag}")
+        n = self._canonical_int()
+        e = self.unpack(U32)
+        return rsa_public_key_json(n, e)
+
+    def signature(self) -> str:
+        tag = self.unpack(U8)
+        if tag == SIG_OPAQUE:
+            value = self.str()
+            if U8.pack(SIG_OPAQUE) != encode_signature(value)[:1]:
+                raise DecodeError("Firma codificada de forma no canónica")
+            return value
+        if tag != SIG_INT:
+            raise DecodeError(f"Tipo de firma desconocido: {tag}")
+        return format(self._canonical_int(), "x")
+
+    def done(self) -> bool:
+        return self.pos == len(self.data)
+
+    def expect_end(self) -> None:
+        if not self.done():
+            raise DecodeError("Bytes sobrantes tras el objeto")
+
@@ -0,0 +1,33 @@
+import threading
+from typing import Callable, List
+
+Listener = Callable[[str, dict], None]
+
+
+class EventBus:
+    # Publicación síncrona de eventos de la cadena ("block", "mempool", "tamper").
+    # Los listeners deben ser rápidos (p. ej. encolar) porque corren en el hilo que publica.
+    def __init__(self) -> None:
+        self._listeners: List[Listener] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Listener) -> Callable[[], None]:
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def publish(self, event: str, data: dict) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event, data)
+            except Exception:
+                # Un listener defectuoso no debe afectar a la cadena ni a los demás
+                continue
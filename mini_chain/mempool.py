@@ -0,0 +1,142 @@
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from itertools import count, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .encoding import SATOSHI
+from .transaction import Transaction
+from .utxo import Outpoint
+
+MEMPOOL_MAX_BYTES = 32 * 1024 * 1024
+# Espacio para transacciones en una plantilla de bloque (sin contar la coinbase)
+BLOCK_MAX_TX_BYTES = 1024 * 1024
+
+# Clave de orden: fee rate ascendente y, a igual fee rate, la más reciente primero
+RateKey = Tuple[float, int, str]
+
+
+@dataclass(frozen=True)
+class MempoolEntry:
+    tx: Transaction
+    fee: float
+    size: int
+    sequence: int
+
+    @property
+    def fee_rate(self) -> float:
+        # Satoshis por byte serializado
+        return self.fee * SATOSHI / self.size
+
+    @property
+    def key(self) -> RateKey:
+        return (self.fee_rate, -self.sequence, self.tx.txid())
+
+
+class Mempool:
+    # Transacciones pendientes indexadas por txid y por outpoint gastado (detección de
+    # doble gasto en O(1)), con una lista ordenada por fee rate para elegir las mejores
+    # al armar un bloque y expulsar las peores al superar el tope de memoria.
+    # Como el UTXOSet, no es thread-safe: Blockchain lo protege con su lock.
+    def __init__(self, max_bytes: int = MEMPOOL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: Dict[str, MempoolEntry] = {}
+        self._spenders: Dict[Outpoint, str] = {}
+        self._by_rate: List[RateKey] = []
+        self._sequence = count()
+        # Vista inmutable para los snapshots; se descarta en cada cambio y se rehace al pedirla
+        self._view: Optional[Tuple[Transaction, ...]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        # Orden de llegada
+        return (entry.tx for entry in self._entries.values())
+
+    def __contains__(self, txid: str) -> bool:
+        return txid in self._entries
+
+    def view(self) -> Tuple[Transaction, ...]:
+        # Orden de llegada, como __iter__; sin cambios desde la última llamada no copia nada
+        if self._view is None:
+            self._view = tuple(entry.tx for entry in self._entries.values())
+        return self._view
+
+    def get(self, txid: str) -> Optional[Transaction]:
+        entry = self._entries.get(txid)
+        return None if entry is None else entry.tx
+
+    def entry(self, txid: str) -> Optional[MempoolEntry]:
+        return self._entries.get(txid)
+
+    def spender(self, outpoint: Outpoint) -> Optional[str]:
+        return self._spenders.get(outpoint)
+
+    def conflicts(self, tx: Transaction) -> bool:
+        return any((txin.txid, txin.vout) in self._spenders for txin in tx.inputs)
+
+    def add(self, tx: Transaction, fee: float) -> Optional[List[str]]:
+        # Devuelve los txids expulsados para hacer sitio, o None si se rechaza
+        # (duplicada, en conflicto, o con menos fee rate que todo lo que habría que expulsar).
+        txid = tx.txid()
+        if txid in self._entries or self.conflicts(tx):
+            return None
+        entry = MempoolEntry(tx=tx, fee=fee, size=len(tx.serialize()), sequence=next(self._sequence))
+        if entry.size > self.max_bytes:
+            return None
+        evict, freed = [], 0
+        for key in self._by_rate:
+            if self.total_bytes - freed + entry.size <= self.max_bytes:
+                break
+            if key[0] >= entry.fee_rate:
+                return None
+            evict.append(key[2])
+            freed += self._entries[key[2]].size
+        evicted = self.remove(evict)
+        self._entries[txid] = entry
+        for txin in tx.inputs:
+            self._spenders[(txin.txid, txin.vout)] = txid
+        insort(self._by_rate, entry.key)
+        self.total_bytes += entry.size
+        self._view = None
+        return evicted
+
+    def remove(self, txids: Iterable[str]) -> List[str]:
+        removed = []
+        for txid in txids:
+            entry = self._entries.pop(txid, None)
+            if entry is None:
+                continue
+            for txin in entry.tx.inputs:
+                self._spenders.pop((txin.txid, txin.vout), None)
+            del self._by_rate[bisect_left(self._by_rate, entry.key)]
+            self.total_bytes -= entry.size
+            removed.append(txid)
+        if removed:
+            self._view = None
+        return removed
+
+    def remove_for_block(self, transactions: Iterable[Transaction]) -> List[str]:
+        # Las incluidas en el bloque y las que gastaban los mismos outpoints
+        doomed = []
+        for tx in transactions:
+            doomed.append(tx.txid())
+            for txin in tx.inputs:
+                spender = self._spenders.get((txin.txid, txin.vout))
+                if spender is not None:
+                    doomed.append(spender)
+        return self.remove(doomed)
+
+    def best(self, limit: int) -> List[MempoolEntry]:
+        return [self._entries[txid] for _, _, txid in islice(reversed(self._by_rate), limit)]
+
+    def select(self, max_bytes: int = BLOCK_MAX_TX_BYTES) -> List[Transaction]:
+        # Mayor fee rate primero; las que no caben se saltan para aprovechar el espacio restante
+        selected, used = [], 0
+        for _, _, txid in reversed(self._by_rate):
+            entry = self._entries[txid]
+            if used + entry.size <= max_bytes:
+                selected.append(entry.tx)
+                used += entry.size
+        return selected
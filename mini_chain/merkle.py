@@ -0,0 +1,84 @@
+from typing import Iterable, List, Tuple
+
+from .crypto_utils import double_sha256
+
+EMPTY_ROOT = bytes(32)
+
+# Paso de una prueba de inclusión: (hash del hermano, True si el hermano va a la izquierda)
+ProofStep = Tuple[str, bool]
+
+
+def _parent(left: bytes, right: bytes) -> bytes:
+    return double_sha256(left + right)
+
+
+class MerkleTree:
+    # Árbol de Merkle sobre los txids de un bloque con todos los niveles cacheados.
+    # Un nodo sin hermano (último de un nivel impar) sube tal cual, sin duplicarse, así
+    # que dos listas de hojas distintas nunca comparten raíz por repetir la última.
+    # append() y update() recalculan solo el camino hasta la raíz: O(log n).
+    def __init__(self, leaves: Iterable[bytes] = ()):
+        self._levels: List[List[bytes]] = [list(leaves)]
+        while len(self._levels[-1]) > 1:
+            level = self._levels[-1]
+            self._levels.append([_parent(*level[i : i + 2]) if i + 1 < len(level) else level[i] for i in range(0, len(level), 2)])
+
+    @classmethod
+    def from_txids(cls, txids: Iterable[str]) -> "MerkleTree":
+        return cls(bytes.fromhex(txid) for txid in txids)
+
+    def __len__(self) -> int:
+        return len(self._levels[0])
+
+    def root(self) -> bytes:
+        return self._levels[-1][0] if self._levels[0] else EMPTY_ROOT
+
+    def _refresh(self, index: int) -> None:
+        depth = 0
+        while len(self._levels[depth]) > 1:
+            level = self._levels[depth]
+            left, right = index & ~1, index | 1
+            node = _parent(level[left], level[right]) if right < len(level) else level[left]
+            index >>= 1
+            depth += 1
+            if depth == len(self._levels):
+                self._levels.append([])
+            parent_level = self._levels[depth]
+            if index < len(parent_level):
+                parent_level[index] = node
+            else:
+                parent_level.append(node)
+
+    def append(self, leaf: bytes) -> None:
+        self._levels[0].append(leaf)
+        self._refresh(len(self._levels[0]) - 1)
+
+    def update(self, index: int, leaf: bytes) -> None:
+        self._levels[0][index] = leaf
+        self._refresh(index)
+
+    def proof(self, index: int) -> List[ProofStep]:
+        if not 0 <= index < len(self):
+            raise IndexError("posición fuera del árbol")
+        steps = []
+        for level in self._levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                steps.append((level[sibling].hex(), sibling < index))
+            index >>= 1
+        return steps
+
+
+def merkle_root(txids: Iterable[str]) -> bytes:
+    return MerkleTree.from_txids(txids).root()
+
+
+def verify_proof(txid: str, proof: Iterable[ProofStep], root: str) -> bool:
+    # Lo que necesita un cliente ligero: el txid, la prueba y la raíz de la cabecera
+    try:
+        node = bytes.fromhex(txid)
+        for sibling, left in proof:
+            node = _parent(bytes.fromhex(sibling), node) if left else _parent(node, bytes.fromhex(sibling))
+    except (TypeError, ValueError):
+        return False
+    return node.hex() == root
@@ -0,0 +1,240 @@
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Cubos por defecto de los histogramas de latencia (segundos)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], le: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le:
+        pairs.append(f'le="{le}"')
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Registry:
+    # Contadores, gauges e histogramas en memoria con salida en el formato de texto de
+    # Prometheus. Deshabilitado, cada operación se reduce a comprobar `enabled` (y time()
+    # devuelve un contexto vacío sin leer el reloj).
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: "_Metric") -> "_Metric":
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> "Counter":
+        return self._register(Counter(self, name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> "Gauge":
+        return self._register(Gauge(self, name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> "Histogram":
+        return self._register(Histogram(self, name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+class _Value:
+    __slots__ = ("registry", "value", "lock")
+
+    def __init__(self, registry: Registry):
+        self.registry = registry
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not self.registry.enabled:
+            return
+        with self.lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        # En contadores, solo para totales que se llevan en otro sitio (p. ej. cachés LRU)
+        if not self.registry.enabled:
+            return
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("registry", "buckets", "counts", "sum", "count", "lock")
+
+    def __init__(self, registry: Registry, buckets: Tuple[float, ...]):
+        self.registry = registry
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        if not self.registry.enabled:
+            return
+        with self.lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self) if self.registry.enabled else _NOOP
+
+
+class _Timer:
+    __slots__ = ("target", "started")
+
+    def __init__(self, target: _HistogramValue):
+        self.target = target
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.target.observe(time.perf_counter() - self.started)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: Registry, name: str, help: str, labelnames: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        # Sin etiquetas, la serie existe desde el principio (con valor 0)
+        self._default = None if self.labelnames else self.labels()
+
+    def _new_child(self):
+        return _Value(self.registry)
+
+    def labels(self, *values: str):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._children.clear()
+        if not self.labelnames:
+            self._default = self.labels()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: Registry, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.registry, self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._items():
+            with child.lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, _format_value(bound))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, values, '+Inf')} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, values)} {count}"
+
+
+# Registro del proceso; api_server lo habilita (--no-metrics lo deja apagado)
+REGISTRY = Registry()
+
+MINING_HASHES = REGISTRY.counter("minichain_mining_hashes_total", "Hashes de cabecera calculados en Block.mine")
+MINING_SECONDS = REGISTRY.counter("minichain_mining_seconds_total", "Tiempo dedicado a la búsqueda de nonce")
+MINING_HASHRATE = REGISTRY.gauge("minichain_mining_hashrate", "Hashes por segundo del último bloque minado")
+UTXOS_SECONDS = REGISTRY.histogram("minichain_utxos_seconds", "Duración de Blockchain.utxos()")
+SIGNATURE_SECONDS = REGISTRY.histogram(
+    "minichain_signature_verify_seconds", "Verificación RSA de las firmas de una clave pública en verify_signatures (sin aciertos de caché)"
+)
+HTTP_SECONDS = REGISTRY.histogram("minichain_http_request_seconds", "Latencia de las peticiones HTTP por ruta", ("method", "route"))
+HTTP_REQUESTS = REGISTRY.counter("minichain_http_requests_total", "Peticiones HTTP por ruta y código de estado", ("method", "route", "status"))
+CHAIN_HEIGHT = REGISTRY.gauge("minichain_chain_height", "Altura de la cadena principal")
+MEMPOOL_TRANSACTIONS = REGISTRY.gauge("minichain_mempool_transactions", "Transacciones pendientes en el mempool")
+MEMPOOL_BYTES = REGISTRY.gauge("minichain_mempool_bytes", "Bytes serializados en el mempool")
+CACHE_HITS = REGISTRY.counter("minichain_cache_hits_total", "Aciertos de las cachés de claves, wallets y firmas", ("cache",))
+CACHE_MISSES = REGISTRY.counter("minichain_cache_misses_total", "Fallos de las cachés de claves, wallets y firmas", ("cache",))
+CACHE_ENTRIES = REGISTRY.gauge("minichain_cache_entries", "Entradas en las cachés de claves, wallets y firmas", ("cache",))
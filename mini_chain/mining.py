@@ -0,0 +1,119 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from typing import Optional, Tuple
+
+NONCE_FIELD = b'"nonce": '
+
+
+def split_header(header: bytes) -> Tuple[bytes, bytes]:
+    # El header serializado con nonce=0 se parte en prefijo/sufijo alrededor del
+    # valor del nonce, de modo que cada intento solo serializa el entero.
+    marker = NONCE_FIELD + b"0"
+    pos = header.index(marker)
+    return header[: pos + len(NONCE_FIELD)], header[pos + len(marker):]
+
+
+def meets_difficulty(digest: bytes, difficulty: int) -> bool:
+    # Equivale a digest.hex().startswith("0" * difficulty) sin pasar por hex
+    full, half = divmod(difficulty, 2)
+    if digest[:full] != bytes(full):
+        return False
+    return not half or digest[full] < 16
+
+
+def search_nonce(
+    prefix: bytes,
+    suffix: bytes,
+    difficulty: int,
+    start: int = 0,
+    step: int = 1,
+    count: Optional[int] = None,
+    nonce_width: int = 0,
+) -> Optional[int]:
+    # Reutiliza el estado SHA-256 ya alimentado con el prefijo (mid-state) vía .copy().
+    # nonce_width=0 escribe el nonce en decimal ASCII (header JSON); >0, como entero big-endian fijo.
+    midstate = hashlib.sha256(prefix)
+    sha256 = hashlib.sha256
+    full, half = divmod(difficulty, 2)
+    zeros = bytes(full)
+    nonce = start
+    stop = None if count is None else start + count * step
+    while nonce != stop:
+        h = midstate.copy()
+        h.update(nonce.to_bytes(nonce_width, "big") if nonce_width else b"%d" % nonce)
+        if suffix:
+            h.update(suffix)
+        digest = sha256(h.digest()).digest()
+        if digest[:full] == zeros and (not half or digest[full] < 16):
+            return nonce
+        nonce += step
+    return None
+
+
+SEARCH_CHUNK = 4096
+# Los workers nacen de un intérprete limpio: mine_block corre en hilos (auto-minado, API)
+# y un fork heredaría los locks que otro hilo tuviera tomados en ese momento
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+_cancel_event = None
+
+
+def _init_worker(event) -> None:
+    global _cancel_event
+    _cancel_event = event
+
+
+def _search_stride(args: Tuple[bytes, bytes, int, int, int, int]) -> Tuple[Optional[int], int]:
+    # Cada worker recorre start, start + step, ... por tramos, revisando entre
+    # tramos si otro worker ya encontró un nonce válido.
+    prefix, suffix, difficulty, start, step, nonce_width = args
+    nonce = start
+    tries = 0
+    while not _cancel_event.is_set():
+        found = search_nonce(prefix, suffix, difficulty, start=nonce, step=step, count=SEARCH_CHUNK, nonce_width=nonce_width)
+        if found is not None:
+            _cancel_event.set()
+            return found, tries + (found - nonce) // step + 1
+        nonce += SEARCH_CHUNK * step
+        tries += SEARCH_CHUNK
+    return None, tries
+
+
+class ParallelMiner:
+    # Reparte el espacio de nonces entre un pool de procesos (evita el GIL).
+    # workers <= 0 usa todos los núcleos disponibles.
+    def __init__(self, workers: int = 0):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.last_attempts = 0
+        self._pool = None
+        self._cancel = None
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            self._cancel = _MP_CONTEXT.Event()
+            self._pool = _MP_CONTEXT.Pool(self.workers, initializer=_init_worker, initargs=(self._cancel,))
+        return self._pool
+
+    def search(self, prefix: bytes, suffix: bytes, difficulty: int, start: int = 0, nonce_width: int = 0) -> int:
+        with self._lock:
+            if self.workers == 1:
+                nonce = search_nonce(prefix, suffix, difficulty, start=start, nonce_width=nonce_width)
+                self.last_attempts = nonce - start + 1
+                return nonce
+
+            pool = self._ensure_pool()
+            self._cancel.clear()
+            jobs = [(prefix, suffix, difficulty, start + i, self.workers, nonce_width) for i in range(self.workers)]
+            results = pool.map(_search_stride, jobs, chunksize=1)
+            self.last_attempts = sum(tries for _, tries in results)
+            return min(nonce for nonce, _ in results if nonce is not None)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
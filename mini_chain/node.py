@@ -1,18 +1,403 @@
+import asyncio
+import threading
+import time
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from .block import Block
 from .blockchain import Blockchain
+from .encoding import DecodeError
+from .p2p import (
+    HANDSHAKE_TIMEOUT,
+    MSG_BLOCK,
+    MSG_GETDATA,
+    MSG_GETHEADERS,
+    MSG_HEADERS,
+    MSG_HELLO,
+    MSG_INV,
+    MSG_TX,
+    InflightRequests,
+    Peer,
+    ProtocolError,
+    SeenCache,
+    decode_message,
+    encode_frame,
+    encode_message,
+    read_frame,
+)
+from .sync import (
+    BATCH_TIMEOUT,
+    MAX_BATCHES_PER_PEER,
+    MAX_HEADERS,
+    BlockDownload,
+    SyncProgress,
+    check_headers,
+    decode_headers,
+    encode_headers,
+)
+from .transaction import Transaction
+
+HEADERS_TIMEOUT = 10.0
 
 
 @dataclass
 class Node:
+    # Gossip de bloques y transacciones: un listener asyncio en `port` (en su propio
+    # hilo), anuncios de inventario (inv -> getdata -> block/tx) y caché de hashes vistos.
     node_id: str
     host: str
     port: int
     blockchain: Blockchain
     peers: List[Tuple[str, int]] = field(default_factory=list)
+    stats: Counter = field(default_factory=Counter, init=False, repr=False)
+    _loop: Optional[asyncio.AbstractEventLoop] = field(default=None, init=False, repr=False)
+    _thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+    _server: Optional[asyncio.AbstractServer] = field(default=None, init=False, repr=False)
+    _connections: Dict[str, Peer] = field(default_factory=dict, init=False, repr=False)
+    _seen: SeenCache = field(default_factory=SeenCache, init=False, repr=False)
+    _inflight: InflightRequests = field(default_factory=InflightRequests, init=False, repr=False)
+    _unsubscribe: object = field(default=None, init=False, repr=False)
+    sync_progress: Optional[SyncProgress] = field(default=None, init=False, repr=False)
+    _sync_task: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+    _download: Optional[BlockDownload] = field(default=None, init=False, repr=False)
+    _sync_wakeup: Optional[asyncio.Event] = field(default=None, init=False, repr=False)
+    _header_requests: Dict[str, asyncio.Future] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=loop.run_forever, name=f"p2p-{self.node_id}", daemon=True)
+        self._thread.start()
+        self._loop = loop
+        self._call(self._listen())
+        self._unsubscribe = self.blockchain.events.subscribe(self._on_chain_event)
+        for host, port in list(self.peers):
+            try:
+                self._call(self._dial(host, port))
+            except OSError:
+                self.stats["dial_failed"] += 1
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._unsubscribe()
+        self._call(self._shutdown())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def _call(self, coro, timeout: float = HANDSHAKE_TIMEOUT):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
 
     def connect_peer(self, host: str, port: int) -> None:
         p = (host, port)
         if p not in self.peers:
             self.peers.append(p)
+        if self.running:
+            self._call(self._dial(host, port))
+
+    def connected_peers(self) -> List[str]:
+        return sorted(self._connections)
+
+    def sync_status(self) -> Optional[dict]:
+        progress = self.sync_progress
+        return None if progress is None else progress.as_dict()
+
+    async def _listen(self) -> None:
+        self._server = await asyncio.start_server(self._accept, self.host, self.port)
+        # Con port=0 el sistema asigna un puerto libre
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _shutdown(self) -> None:
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+        self._server.close()
+        for peer in list(self._connections.values()):
+            peer.close()
+        self._connections.clear()
+        await self._server.wait_closed()
+
+    def _hello(self) -> bytes:
+        snap = self.blockchain.snapshot()
+        return encode_message(MSG_HELLO, {"node_id": self.node_id, "port": self.port, "height": snap.height, "tip": snap.tip})
+
+    async def _handshake(self, peer: Peer) -> bool:
+        peer.send(self._hello())
+        kind, payload = await asyncio.wait_for(read_frame(peer.reader), HANDSHAKE_TIMEOUT)
+        if kind != MSG_HELLO:
+            raise ProtocolError("Se esperaba hello")
+        hello = decode_message(payload)
+        peer.node_id = str(hello.get("node_id"))
+        peer.address = (peer.writer.get_extra_info("peername")[0], int(hello.get("port", 0)))
+        peer.height = int(hello.get("height", 0))
+        # Conexión consigo mismo o duplicada con un nodo ya conectado
+        if peer.node_id == self.node_id or peer.node_id in self._connections:
+            peer.close()
+            return False
+        self._connections[peer.node_id] = peer
+        if peer.address not in self.peers:
+            self.peers.append(peer.address)
+        self._maybe_sync()
+        return True
+
+    async def _dial(self, host: str, port: int) -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        peer = Peer(reader, writer)
+        try:
+            registered = await self._handshake(peer)
+        except (ProtocolError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            peer.close()
+            raise
+        if registered:
+            self._loop.create_task(self._serve(peer))
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = Peer(reader, writer)
+        try:
+            registered = await self._handshake(peer)
+        except (ProtocolError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            peer.close()
+            return
+        if registered:
+            await self._serve(peer)
+
+    async def _serve(self, peer: Peer) -> None:
+        try:
+            while not peer.closed:
+                kind, payload = await read_frame(peer.reader)
+                await self._handle(peer, kind, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ProtocolError, DecodeError, KeyError, TypeError, ValueError):
+            # Mensaje mal formado o con campos ausentes o de otro tipo: se corta con el peer
+            self.stats["peers_misbehaving"] += 1
+        finally:
+            peer.close()
+            if self._connections.get(peer.node_id) is peer:
+                del self._connections[peer.node_id]
+                request = self._header_requests.pop(peer.node_id, None)
+                if request is not None and not request.done():
+                    request.set_exception(ConnectionError("peer desconectado"))
+                if self._download is not None:
+                    self._download.release(peer.node_id)
+                    self._sync_wakeup.set()
+
+    async def _handle(self, peer: Peer, kind: int, payload: bytes) -> None:
+        if kind == MSG_INV:
+            self._on_inv(peer, decode_message(payload))
+        elif kind == MSG_GETDATA:
+            self._on_getdata(peer, decode_message(payload))
+        elif kind == MSG_BLOCK:
+            await self._on_block(peer, Block.from_bytes(payload), len(payload))
+        elif kind == MSG_TX:
+            await self._on_tx(peer, Transaction.from_bytes(payload))
+        elif kind == MSG_GETHEADERS:
+            await self._on_getheaders(peer, decode_message(payload))
+        elif kind == MSG_HEADERS:
+            request = self._header_requests.pop(peer.node_id, None)
+            if request is not None and not request.done():
+                request.set_result(decode_headers(payload))
+
+    def _on_inv(self, peer: Peer, inv: dict) -> None:
+        wanted = {"blocks": [], "txs": []}
+        now = time.monotonic()
+        for kind in wanted:
+            for item in inv.get(kind, []):
+                peer.known.add(item)
+                # Visto solo al recibirlo: si quien lo anunció primero no lo entrega, al vencer
+                # el plazo se pide a otro de los peers que lo anuncien
+                if item not in self._seen and self._inflight.request(item, now):
+                    wanted[kind].append(item)
+                else:
+                    self.stats["duplicate_inv"] += 1
+        if wanted["blocks"] or wanted["txs"]:
+            peer.send(encode_message(MSG_GETDATA, wanted))
+
+    def _on_getdata(self, peer: Peer, request: dict) -> None:
+        for block_hash in request.get("blocks", []):
+            block = self.blockchain.get_block(block_hash)
+            if block is not None:
+                peer.send(encode_frame(MSG_BLOCK, block.encode()))
+        for txid in request.get("txs", []):
+            tx = self.blockchain.get_transaction(txid)
+            if tx is not None:
+                peer.send(encode_frame(MSG_TX, tx.serialize()))
+
+    async def _on_block(self, peer: Peer, block: Block, size: int) -> None:
+        block_hash = block.hash()
+        peer.known.add(block_hash)
+        self._seen.add(block_hash)
+        self._inflight.received(block_hash)
+        peer.height = max(peer.height, block.index)
+        download = self._download
+        if download is not None and download.expects(block_hash):
+            # Cuerpo pedido por la sincronización: se aplica en orden de altura desde _download_blocks
+            if download.receive(block):
+                self.sync_progress.bytes += size
+                self.sync_progress.per_peer[peer.node_id] += 1
+                self._sync_wakeup.set()
+            return
+        # La validación (firmas RSA incluidas) corre fuera del event loop
+        accepted = await self._loop.run_in_executor(None, self.blockchain.add_block, block)
+        self.stats["blocks_accepted" if accepted else "blocks_rejected"] += 1
+        if not accepted:
+            # Posiblemente un bloque de más adelante: hay que ponerse al día
+            self._maybe_sync()
+
+    async def _on_tx(self, peer: Peer, tx: Transaction) -> None:
+        txid = tx.txid()
+        peer.known.add(txid)
+        self._seen.add(txid)
+        self._inflight.received(txid)
+        accepted = await self._loop.run_in_executor(None, self.blockchain.add_transaction, tx)
+        self.stats["txs_accepted" if accepted else "txs_rejected"] += 1
+
+    async def _on_getheaders(self, peer: Peer, request: dict) -> None:
+        # Cabeceras a partir del primer hash del locator que conozcamos
+        bc = self.blockchain
+        start = 0
+        for block_hash in request.get("locator", []):
+            height = bc.height_of(block_hash)
+            if height is not None:
+                start = height + 1
+                break
+        payload = await self._loop.run_in_executor(None, lambda: encode_headers(bc.snapshot().blocks(start, start + MAX_HEADERS)))
+        peer.send(encode_frame(MSG_HEADERS, payload))
+
+    def _height(self) -> int:
+        return self.blockchain.snapshot().height
+
+    def _maybe_sync(self) -> None:
+        if self._sync_task is not None and not self._sync_task.done():
+            return
+        if any(peer.height > self._height() for peer in self._connections.values()):
+            self._sync_task = self._loop.create_task(self._sync())
+
+    def _best_peer(self) -> Optional[Peer]:
+        height = self._height()
+        candidates = [peer for peer in self._connections.values() if peer.height > height]
+        return max(candidates, key=lambda peer: peer.height, default=None)
+
+    def _locator(self) -> List[str]:
+        # Hashes del tip hacia atrás: los 10 últimos y luego a saltos que se duplican, hasta génesis
+        snap = self.blockchain.snapshot()
+        heights, height, step = [], snap.height, 1
+        while height > 0:
+            heights.append(height)
+            if len(heights) >= 10:
+                step *= 2
+            height -= step
+        heights.append(0)
+        return [snap.chain[h].hash() for h in heights]
+
+    async def _sync(self) -> None:
+        # Headers-first: primero la cadena de cabeceras (rápida de validar) de un peer,
+        # después los cuerpos en lotes repartidos entre todos los peers conectados.
+        progress = self.sync_progress = SyncProgress()
+        try:
+            while True:
+                peer = self._best_peer()
+                if peer is None:
+                    break
+                progress.target_height = max(progress.target_height, peer.height)
+                headers = await self._fetch_headers(peer)
+                if not headers:
+                    break
+                progress.headers += len(headers)
+                if not await self._download_blocks(headers, progress):
+                    break
+        finally:
+            progress.finished = time.monotonic()
+            self._download = None
+
+    async def _fetch_headers(self, peer: Peer) -> List[Block]:
+        bc = self.blockchain
+        locator = self._locator()
+        headers: List[Block] = []
+        while True:
+            request = self._loop.create_future()
+            self._header_requests[peer.node_id] = request
+            peer.send(encode_message(MSG_GETHEADERS, {"locator": locator}))
+            try:
+                batch = await asyncio.wait_for(request, HEADERS_TIMEOUT)
+            except (asyncio.TimeoutError, ConnectionError):
+                self._header_requests.pop(peer.node_id, None)
+                break
+            if not batch:
+                break
+            if headers:
+                prev_hash, prev_height = headers[-1].hash(), headers[-1].index
+            else:
+                prev_hash = batch[0].previous_hash
+                prev_height = bc.height_of(prev_hash)
+            if prev_height is None or not check_headers(prev_hash, prev_height, batch, bc.valid_proof):
+                self.stats["headers_rejected"] += 1
+                peer.close()
+                break
+            headers.extend(batch)
+            if len(batch) < MAX_HEADERS:
+                break
+            locator = [batch[-1].hash()]
+        return headers
+
+    async def _download_blocks(self, headers: List[Block], progress: SyncProgress) -> bool:
+        download = self._download = BlockDownload(headers)
+        wakeup = self._sync_wakeup = asyncio.Event()
+        while not download.done:
+            now = time.monotonic()
+            download.expire(now)
+            for peer in list(self._connections.values()):
+                if peer.height < download.start_height:
+                    continue
+                while download.inflight_for(peer.node_id) < MAX_BATCHES_PER_PEER:
+                    hashes = download.assign(peer.node_id, now + BATCH_TIMEOUT)
+                    if not hashes:
+                        break
+                    peer.send(encode_message(MSG_GETDATA, {"blocks": hashes}))
+
+            ready = list(download.ready())
+            if ready:
+                applied = await self._loop.run_in_executor(None, self._apply_blocks, ready)
+                progress.blocks += applied
+                if applied < len(ready):
+                    self.stats["sync_failed"] += 1
+                    return False
+                continue
+            if not self._connections:
+                return False
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), 0.5)
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+    def _apply_blocks(self, blocks: List[Block]) -> int:
+        for applied, block in enumerate(blocks):
+            if not self.blockchain.add_block(block):
+                return applied
+        return len(blocks)
+
+    def _on_chain_event(self, event: str, data: dict) -> None:
+        # Llamado desde hilos de la cadena: el anuncio se programa en el event loop
+        if event == "block":
+            self._loop.call_soon_threadsafe(self._announce, "blocks", [data["hash"]])
+        elif event == "mempool" and data["added"]:
+            self._loop.call_soon_threadsafe(self._announce, "txs", list(data["added"]))
+
+    def _announce(self, kind: str, items: Iterable[str]) -> None:
+        items = list(items)
+        for item in items:
+            self._seen.add(item)
+            self._inflight.received(item)
+        for peer in list(self._connections.values()):
+            fresh = [item for item in items if peer.known.add(item)]
+            if fresh and not peer.send(encode_message(MSG_INV, {kind: fresh})):
+                self.stats["peers_dropped"] += 1
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import struct
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Trama del protocolo entre nodos: longitud del payload (uint32), tipo (uint8) y payload.
+# Los mensajes de control van en JSON; bloques y transacciones, en su codificación binaria.
+FRAME_HEADER = struct.Struct(">IB")
+MAX_FRAME_SIZE = 32 * 1024 * 1024
+
+MSG_HELLO = 0
+MSG_INV = 1
+MSG_GETDATA = 2
+MSG_BLOCK = 3
+MSG_TX = 4
+MSG_GETHEADERS = 5
+MSG_HEADERS = 6
+
+PEER_QUEUE_SIZE = 1024
+PEER_KNOWN_SIZE = 10_000
+SEEN_CACHE_SIZE = 100_000
+HANDSHAKE_TIMEOUT = 10.0
+# Plazo para que llegue lo pedido con getdata antes de pedírselo a otro peer que lo anuncie
+GETDATA_TIMEOUT = 5.0
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def encode_frame(kind: int, payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload), kind) + payload
+
+
+def encode_message(kind: int, data: dict) -> bytes:
+    return encode_frame(kind, json.dumps(data).encode())
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    length, kind = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Trama demasiado grande: {length} bytes")
+    return kind, await reader.readexactly(length)
+
+
+def decode_message(payload: bytes) -> dict:
+    try:
+        data = json.loads(payload)
+    except ValueError as exc:
+        raise ProtocolError("Mensaje de control inválido") from exc
+    if not isinstance(data, dict):
+        raise ProtocolError("Mensaje de control inválido")
+    return data
+
+
+class SeenCache:
+    # Conjunto acotado con expulsión LRU: hashes ya vistos para no pedir ni reenviar duplicados
+    def __init__(self, size: int = SEEN_CACHE_SIZE):
+        self.size = size
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def add(self, key: str) -> bool:
+        # True si la clave es nueva
+        if key in self._items:
+            self._items.move_to_end(key)
+            return False
+        self._items[key] = None
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+        return True
+
+
+class InflightRequests:
+    # Hashes pedidos con getdata y aún no recibidos, con su plazo. Mientras no vence, otros
+    # anuncios del mismo hash no generan un segundo getdata; vencido, se pide al siguiente
+    # peer que lo anuncie. Todos los plazos son iguales: vencen en orden de inserción.
+    def __init__(self, timeout: float = GETDATA_TIMEOUT):
+        self.timeout = timeout
+        self._deadlines: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def request(self, key: str, now: float) -> bool:
+        # True si hay que pedirlo: no está en vuelo o su plazo ya venció
+        while self._deadlines:
+            oldest, deadline = next(iter(self._deadlines.items()))
+            if deadline > now:
+                break
+            del self._deadlines[oldest]
+        if key in self._deadlines:
+            return False
+        self._deadlines[key] = now + self.timeout
+        return True
+
+    def received(self, key: str) -> None:
+        self._deadlines.pop(key, None)
+
+
+class Peer:
+    # Conexión con otro nodo. Los envíos pasan por una cola acotada que vacía una
+    # tarea propia: un peer lento llena su cola y se desconecta sin frenar a los demás.
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, queue_size: int = PEER_QUEUE_SIZE):
+        self.reader = reader
+        self.writer = writer
+        self.node_id: Optional[str] = None
+        self.address: Optional[Tuple[str, int]] = None
+        # Altura anunciada en el hello (o la del último bloque recibido de él)
+        self.height = 0
+        self.known = SeenCache(PEER_KNOWN_SIZE)
+        self.closed = False
+        self._queue: "asyncio.Queue[bytes]" = asyncio.Queue(queue_size)
+        self._sender = asyncio.get_running_loop().create_task(self._drain())
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def send(self, frame: bytes) -> bool:
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.close()
+            return False
+        return True
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                frame = await self._queue.get()
+                self.writer.write(frame)
+                await self.writer.drain()
+        except (ConnectionError, RuntimeError):
+            self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._sender.cancel()
+        self.writer.transport.abort()
@@ -0,0 +1,318 @@
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .block import Block
+from .utxo import UTXO
+from .wallet import Wallet
+
+SEGMENT_SIZE = 64 * 1024 * 1024
+BLOCK_CACHE_SIZE = 1024
+UTXO_SNAPSHOT_INTERVAL = 1000
+
+# Registro del índice: altura, hash (32 bytes), segmento, offset y longitud del bloque
+INDEX_RECORD = struct.Struct(">I32sIQI")
+LENGTH_PREFIX = struct.Struct(">I")
+# Registro de undo.dat: altura y longitud, seguidos de los datos de undo del bloque
+UNDO_HEADER = struct.Struct(">II")
+
+
+def decode_block_payload(payload: bytes, block_hash: Optional[str] = None) -> Block:
+    if payload[:1] == b"{":
+        # Registros escritos antes del formato binario
+        return Block.from_dict(json.loads(payload), block_hash=block_hash)
+    return Block.from_bytes(payload, block_hash=block_hash)
+
+
+class BlockStore:
+    # Almacén append-only: los bloques se escriben en segmentos blkNNNNN.dat
+    # (longitud + payload) y un índice binario altura/hash -> posición permite
+    # reabrir el nodo sin deserializar ni re-hashear la cadena completa.
+    def __init__(self, data_dir: str, segment_size: int = SEGMENT_SIZE):
+        self.path = Path(data_dir)
+        self.blocks_dir = self.path / "blocks"
+        self.blocks_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+
+        self._hashes: List[str] = []
+        self._locations: List[Tuple[int, int, int]] = []
+        self._heights: Dict[str, int] = {}
+        self._load_index()
+
+        self._index_file = open(self.blocks_dir / "index.dat", "ab")
+        self._segment, self._offset = self._locations[-1][0:2] if self._locations else (0, 0)
+        if self._locations:
+            self._offset += LENGTH_PREFIX.size + self._locations[-1][2]
+        self._segment_file = self._open_segment(self._segment)
+        self._readers: Dict[int, int] = {}
+        self._readers_lock = threading.Lock()
+
+        # Datos de undo por altura (offset, longitud) en undo.dat. Los almacenes
+        # anteriores a este formato no tienen undo para sus bloques antiguos.
+        self._undo: Dict[int, Tuple[int, int]] = {}
+        self._undo_end = self._load_undo()
+        self._undo_file = open(self.blocks_dir / "undo.dat", "ab")
+        self._undo_reader = os.open(self.blocks_dir / "undo.dat", os.O_RDONLY)
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.blocks_dir / f"blk{segment:05d}.dat"
+
+    def _open_segment(self, segment: int):
+        f = open(self._segment_path(segment), "ab")
+        # Descarta cualquier escritura parcial posterior al último bloque indexado
+        f.truncate(self._offset)
+        return f
+
+    def _load_index(self) -> None:
+        index_path = self.blocks_dir / "index.dat"
+        if not index_path.exists():
+            return
+        raw = index_path.read_bytes()
+        usable = len(raw) - len(raw) % INDEX_RECORD.size
+        # Tamaño de cada segmento, consultado una sola vez (-1 si no existe)
+        sizes: Dict[int, int] = {}
+        for height, raw_hash, segment, offset, length in INDEX_RECORD.iter_unpack(raw[:usable]):
+            size = sizes.get(segment)
+            if size is None:
+                segment_path = self._segment_path(segment)
+                size = sizes[segment] = segment_path.stat().st_size if segment_path.exists() else -1
+            if height != len(self._hashes) or size < offset + LENGTH_PREFIX.size + length:
+                break
+            block_hash = raw_hash.hex()
+            self._heights[block_hash] = height
+            self._hashes.append(block_hash)
+            self._locations.append((segment, offset, length))
+        if len(self._hashes) * INDEX_RECORD.size != len(raw):
+            with open(index_path, "r+b") as f:
+                f.truncate(len(self._hashes) * INDEX_RECORD.size)
+
+    def _load_undo(self) -> int:
+        path = self.blocks_dir / "undo.dat"
+        if not path.exists():
+            return 0
+        raw = path.read_bytes()
+        end = 0
+        while end + UNDO_HEADER.size <= len(raw):
+            height, length = UNDO_HEADER.unpack_from(raw, end)
+            if height >= len(self._hashes) or end + UNDO_HEADER.size + length > len(raw):
+                break
+            self._undo[height] = (end + UNDO_HEADER.size, length)
+            end += UNDO_HEADER.size + length
+        if end != len(raw):
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        return end
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @property
+    def height(self) -> int:
+        return len(self._hashes) - 1
+
+    def hash_at(self, height: int) -> str:
+        return self._hashes[height]
+
+    def height_of(self, block_hash: str) -> Optional[int]:
+        return self._heights.get(block_hash)
+
+    def hash_index(self) -> Dict[str, int]:
+        return dict(self._heights)
+
+    def append(self, block: Block, undo: Optional[bytes] = None) -> None:
+        payload = block.encode()
+        if self._offset and self._offset + LENGTH_PREFIX.size + len(payload) > self.segment_size:
+            self._segment_file.close()
+            self._segment += 1
+            self._offset = 0
+            self._segment_file = self._open_segment(self._segment)
+
+        self._segment_file.write(LENGTH_PREFIX.pack(len(payload)) + payload)
+        self._segment_file.flush()
+
+        block_hash = block.hash()
+        height = len(self._hashes)
+        self._index_file.write(INDEX_RECORD.pack(height, bytes.fromhex(block_hash), self._segment, self._offset, len(payload)))
+        self._index_file.flush()
+
+        self._hashes.append(block_hash)
+        self._heights[block_hash] = height
+        self._locations.append((self._segment, self._offset, len(payload)))
+        self._offset += LENGTH_PREFIX.size + len(payload)
+
+        if undo is not None:
+            self._undo_file.write(UNDO_HEADER.pack(height, len(undo)) + undo)
+            self._undo_file.flush()
+            self._undo[height] = (self._undo_end + UNDO_HEADER.size, len(undo))
+            self._undo_end += UNDO_HEADER.size + len(undo)
+
+    def read_undo(self, height: int) -> Optional[bytes]:
+        location = self._undo.get(height)
+        if location is None:
+            return None
+        offset, length = location
+        return os.pread(self._undo_reader, length, offset)
+
+    def truncate(self, height: int) -> None:
+        # Reorganización: descarta los bloques por encima de `height` (génesis nunca se descarta)
+        for block_hash in self._hashes[height + 1:]:
+            del self._heights[block_hash]
+        del self._hashes[height + 1:]
+        del self._locations[height + 1:]
+        self._index_file.truncate(len(self._hashes) * INDEX_RECORD.size)
+
+        segment, offset, length = self._locations[-1]
+        self._segment_file.close()
+        self._segment, self._offset = segment, offset + LENGTH_PREFIX.size + length
+        self._segment_file = self._open_segment(segment)
+
+        dropped = [h for h in self._undo if h > height]
+        if dropped:
+            self._undo_end = min(self._undo[h][0] for h in dropped) - UNDO_HEADER.size
+            for h in dropped:
+                del self._undo[h]
+            self._undo_file.truncate(self._undo_end)
+
+    def read(self, height: int) -> Block:
+        return decode_block_payload(self.read_payload(height), block_hash=self._hashes[height])
+
+    def read_payload(self, height: int) -> bytes:
+        segment, offset, length = self._locations[height]
+        fd = self._readers.get(segment)
+        if fd is None:
+            with self._readers_lock:
+                fd = self._readers.get(segment)
+                if fd is None:
+                    fd = self._readers[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+        # pread no comparte posición de lectura: seguro entre hilos
+        return os.pread(fd, length, offset + LENGTH_PREFIX.size)
+
+    def load_utxo_snapshot(self) -> Optional[Tuple[int, str, List[UTXO], Optional[List[int]]]]:
+        path = self.path / "utxo.snapshot"
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text())
+        utxos = [UTXO(txid=t, vout=v, amount=a, address=addr) for t, v, a, addr in data["utxos"]]
+        # Trabajo acumulado por altura; los snapshots anteriores solo guardaban el del tip
+        # (o ninguno) y obligan a re-aplicar la cadena una vez
+        return data["height"], data["tip"], utxos, data.get("works")
+
+    def save_utxo_snapshot(self, height: int, tip: str, utxos: List[UTXO], works: List[int]) -> None:
+        path = self.path / "utxo.snapshot"
+        tmp = path.with_suffix(".tmp")
+        data = {"height": height, "tip": tip, "works": works, "utxos": [[u.txid, u.vout, u.amount, u.address] for u in utxos]}
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, path)
+
+    def load_wallets(self) -> List[Wallet]:
+        path = self.path / "wallets.jsonl"
+        if not path.exists():
+            return []
+        wallets = []
+        for line in path.read_text().splitlines():
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            data["_priv"] = tuple(data["_priv"])
+            wallets.append(Wallet(**data))
+        return wallets
+
+    def save_wallet(self, wallet: Wallet) -> None:
+        with open(self.path / "wallets.jsonl", "a") as f:
+            f.write(json.dumps(asdict(wallet)) + "\n")
+
+    def close(self) -> None:
+        self._segment_file.close()
+        self._index_file.close()
+        self._undo_file.close()
+        os.close(self._undo_reader)
+        for fd in self._readers.values():
+            os.close(fd)
+        self._readers.clear()
+
+
+class StoredChain:
+    # Secuencia tipo lista respaldada por el BlockStore: los bloques se leen de
+    # disco bajo demanda (con caché LRU) en lugar de cargarlos todos al arrancar.
+    def __init__(self, store: BlockStore, cache_size: int = BLOCK_CACHE_SIZE):
+        self.store = store
+        self._cache: "OrderedDict[int, Block]" = OrderedDict()
+        self._cache_size = cache_size
+        # Bloques alterados en memoria (tamper_block): no se escriben en disco
+        self._pinned: Dict[int, Block] = {}
+        # Altura a la que se truncó en cada reorganización: las vistas fijadas en un epoch
+        # anterior saben qué parte del disco ya no les corresponde
+        self._truncations: List[int] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def _get(self, height: int) -> Block:
+        block = self._pinned.get(height)
+        if block is not None:
+            return block
+        with self._lock:
+            block = self._cache.get(height)
+            if block is not None:
+                self._cache.move_to_end(height)
+                return block
+        block = self.store.read(height)
+        self._remember(height, block)
+        return block
+
+    def _remember(self, height: int, block: Block) -> None:
+        with self._lock:
+            self._cache[height] = block
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._get(i) for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("altura fuera de rango")
+        return self._get(item)
+
+    def __setitem__(self, height: int, block: Block) -> None:
+        self._pinned[height] = block
+
+    def __iter__(self) -> Iterator[Block]:
+        for i in range(len(self)):
+            yield self._get(i)
+
+    @property
+    def has_pinned(self) -> bool:
+        return bool(self._pinned)
+
+    @property
+    def epoch(self) -> int:
+        return len(self._truncations)
+
+    def common_height(self, epoch: int) -> Optional[int]:
+        # Altura más alta que no ha cambiado desde `epoch` (None si no se ha truncado)
+        with self._lock:
+            heights = self._truncations[epoch:]
+        return min(heights) if heights else None
+
+    def append(self, block: Block, undo: Optional[bytes] = None) -> None:
+        self.store.append(block, undo)
+        self._remember(len(self) - 1, block)
+
+    def truncate(self, height: int) -> None:
+        # Se anota antes de tocar el disco: un lector que vea la rama nueva ya ve el epoch nuevo
+        with self._lock:
+            self._truncations.append(height)
+        self.store.truncate(height)
+        with self._lock:
+            for h in [h for h in self._cache if h > height]:
+                del self._cache[h]
+        for h in [h for h in self._pinned if h > height]:
+            del self._pinned[h]
@@ -0,0 +1,137 @@
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .block import Block
+from .encoding import Reader, encode_bytes, encode_varint
+
+MAX_HEADERS = 2000
+SYNC_BATCH_SIZE = 16
+MAX_BATCHES_PER_PEER = 4
+# Cuánto puede adelantarse la descarga respecto al siguiente bloque por aplicar (acota el buffer)
+MAX_BLOCKS_AHEAD = 1024
+BATCH_TIMEOUT = 10.0
+
+Batch = Tuple[int, int]
+
+
+def encode_headers(blocks: Sequence[Block]) -> bytes:
+    return encode_varint(len(blocks)) + b"".join(encode_bytes(block.encode_header()) for block in blocks)
+
+
+def decode_headers(payload: bytes) -> List[Block]:
+    reader = Reader(payload)
+    headers = []
+    for _ in range(reader.varint()):
+        item = Reader(reader.bytes())
+        headers.append(Block.decode_header(item))
+        item.expect_end()
+    reader.expect_end()
+    return headers
+
+
+def check_headers(prev_hash: str, prev_height: int, headers: Sequence[Block], valid_proof: Callable[[Block], bool]) -> bool:
+    # Cadena de cabeceras enlazada (hash previo y altura consecutiva) y con PoW válida
+    for header in headers:
+        if header.previous_hash != prev_hash or header.index != prev_height + 1 or not valid_proof(header):
+            return False
+        prev_hash, prev_height = header.hash(), header.index
+    return True
+
+
+@dataclass
+class SyncProgress:
+    target_height: int = 0
+    headers: int = 0
+    blocks: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    per_peer: Counter = field(default_factory=Counter)
+
+    def as_dict(self) -> dict:
+        elapsed = max((self.finished or time.monotonic()) - self.started, 1e-9)
+        return {
+            "active": self.finished is None,
+            "target_height": self.target_height,
+            "headers": self.headers,
+            "blocks": self.blocks,
+            "bytes": self.bytes,
+            "elapsed": round(elapsed, 3),
+            "blocks_per_s": round(self.blocks / elapsed, 1),
+            "bytes_per_s": round(self.bytes / elapsed, 1),
+            "per_peer": dict(self.per_peer),
+        }
+
+
+class BlockDownload:
+    # Reparto de cuerpos de bloque por lotes de alturas entre varios peers. Los bloques
+    # llegan en cualquier orden, se guardan en `buffer` y salen por ready() en orden de altura.
+    def __init__(self, headers: Sequence[Block], batch_size: int = SYNC_BATCH_SIZE, max_ahead: int = MAX_BLOCKS_AHEAD):
+        self.max_ahead = max_ahead
+        self.start_height = headers[0].index if headers else 0
+        self.end_height = self.start_height + len(headers)
+        self._hashes = [h.hash() for h in headers]
+        self._heights = {block_hash: self.start_height + i for i, block_hash in enumerate(self._hashes)}
+        self._pending: Deque[Batch] = deque(
+            (start, min(start + batch_size, self.end_height)) for start in range(self.start_height, self.end_height, batch_size)
+        )
+        self._inflight: Dict[Batch, Tuple[str, float]] = {}
+        self.buffer: Dict[int, Block] = {}
+        self.next_height = self.start_height
+
+    @property
+    def done(self) -> bool:
+        return self.next_height >= self.end_height
+
+    def expects(self, block_hash: str) -> bool:
+        return block_hash in self._heights
+
+    def inflight_for(self, peer_id: str) -> int:
+        self._requeue(lambda owner, deadline: False)
+        return sum(1 for owner, _ in self._inflight.values() if owner == peer_id)
+
+    def _complete(self, batch: Batch) -> bool:
+        return all(h < self.next_height or h in self.buffer for h in range(*batch))
+
+    def assign(self, peer_id: str, deadline: float) -> Optional[List[str]]:
+        while self._pending:
+            batch = self._pending[0]
+            if batch[0] >= self.next_height + self.max_ahead:
+                return None
+            self._pending.popleft()
+            if self._complete(batch):
+                continue
+            self._inflight[batch] = (peer_id, deadline)
+            return [self._hashes[h - self.start_height] for h in range(*batch) if h >= self.next_height and h not in self.buffer]
+        return None
+
+    def receive(self, block: Block) -> bool:
+        height = self._heights.get(block.hash())
+        if height is None or height < self.next_height or height in self.buffer:
+            return False
+        self.buffer[height] = block
+        return True
+
+    def ready(self) -> Iterator[Block]:
+        while self.next_height in self.buffer:
+            block = self.buffer.pop(self.next_height)
+            self.next_height += 1
+            yield block
+
+    def _requeue(self, matches: Callable[[str, float], bool]) -> None:
+        for batch, (owner, deadline) in list(self._inflight.items()):
+            if self._complete(batch):
+                del self._inflight[batch]
+            elif matches(owner, deadline):
+                del self._inflight[batch]
+                self._pending.appendleft(batch)
+
+    def expire(self, now: float) -> None:
+        # Lotes vencidos vuelven a la cola para otro peer
+        self._requeue(lambda owner, deadline: deadline <= now)
+
+    def release(self, peer_id: str) -> None:
+        # Peer desconectado: sus lotes pendientes se reasignan
+        self._requeue(lambda owner, deadline: owner == peer_id)
@@ -1,12 +1,73 @@
 import json
+import struct
+import threading
 import time
-from dataclasses import dataclass, field
-from typing import List
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
 
-from .crypto_utils import double_sha256, verify_message
+from .crypto_utils import double_sha256, parse_public_key, verify_message
+from .encoding import (
+    F64,
+    I64,
+    U8,
+    U32,
+    U32_MAX,
+    DecodeError,
+    Reader,
+    amount_to_sat,
+    encode_hash,
+    encode_public_key,
+    encode_signature,
+    encode_str,
+    encode_varint,
+    sat_to_amount,
+)
+from .metrics import SIGNATURE_SECONDS
 
+# Versión 1: txid = double_sha256(JSON ordenado), formato heredado que se sigue verificando.
+# Versión 2: txid = double_sha256(codificación binaria canónica).
+LEGACY_TX_VERSION = 1
+TX_VERSION = 2
 
-@dataclass
+VERIFIED_CACHE_SIZE = 100_000
+
+
+class VerifiedSignatures:
+    # Pares (txid, clave pública) cuyas firmas ya se verificaron. El txid cubre las firmas,
+    # así que una tx re-difundida o re-validada (p. ej. al llegar en un bloque tras pasar
+    # por el mempool) no repite la exponenciación modular.
+    def __init__(self, size: int = VERIFIED_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._items[key] = None
+            self._items.move_to_end(key)
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+VERIFIED_SIGNATURES = VerifiedSignatures()
+
+
+@dataclass(frozen=True)
 class TxInput:
     txid: str
     vout: int
@@ -14,48 +75,187 @@ class TxInput:
     public_key: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class TxOutput:
     amount: float
     address: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class Transaction:
-    inputs: List[TxInput]
-    outputs: List[TxOutput]
+    # Inmutable: serialize(), txid() y signable_payload() se calculan una sola vez.
+    # Para "modificar" una transacción se usan with_signature / with_output_amount,
+    # que devuelven una copia nueva con su propia caché.
+    inputs: Tuple[TxInput, ...]
+    outputs: Tuple[TxOutput, ...]
     timestamp: float = field(default_factory=time.time)
     is_coinbase: bool = False
+    version: int = TX_VERSION
+    _serialized: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    _txid: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _signable: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
 
-    def to_dict(self) -> dict:
+    def __post_init__(self) -> None:
+        outputs = tuple(self.outputs)
+        if self.version >= TX_VERSION:
+            # Los montos se fijan a la precisión en satoshis que codifica el formato binario;
+            # uno que no cabe en su int64 da ValueError ya al construir la transacción
+            outputs = tuple(
+                o if sat_to_amount(amount_to_sat(o.amount)) == o.amount else replace(o, amount=sat_to_amount(amount_to_sat(o.amount)))
+                for o in outputs
+            )
+        object.__setattr__(self, "inputs", tuple(self.inputs))
+        object.__setattr__(self, "outputs", outputs)
+
+    def _legacy_dict(self) -> dict:
         return {
-            "inputs": [vars(i) for i in self.inputs],
-            "outputs": [vars(o) for o in self.outputs],
+            "inputs": [dict(vars(i)) for i in self.inputs],
+            "outputs": [dict(vars(o)) for o in self.outputs],
             "timestamp": self.timestamp,
             "is_coinbase": self.is_coinbase,
         }
 
+    def to_dict(self) -> dict:
+        data = self._legacy_dict()
+        data["version"] = self.version
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Transaction":
+        return cls(
+            inputs=[TxInput(**i) for i in data["inputs"]],
+            outputs=[TxOutput(**o) for o in data["outputs"]],
+            timestamp=data["timestamp"],
+            is_coinbase=data["is_coinbase"],
+            version=data.get("version", LEGACY_TX_VERSION),
+        )
+
+    def encode(self, for_signing: bool = False) -> bytes:
+        parts = [
+            U8.pack(self.version),
+            U8.pack(1 if self.is_coinbase else 0),
+            F64.pack(self.timestamp),
+            encode_varint(len(self.inputs)),
+        ]
+        for txin in self.inputs:
+            if isinstance(txin.vout, bool) or not isinstance(txin.vout, int) or not 0 <= txin.vout <= U32_MAX:
+                raise ValueError(f"vout fuera de rango: {txin.vout!r}")
+            parts.append(encode_hash(txin.txid))
+            parts.append(U32.pack(txin.vout))
+            if not for_signing:
+                parts.append(encode_public_key(txin.public_key))
+                parts.append(encode_signature(txin.signature))
+        parts.append(encode_varint(len(self.outputs)))
+        for out in self.outputs:
+            parts.append(I64.pack(amount_to_sat(out.amount)))
+            parts.append(encode_str(out.address))
+        return b"".join(parts)
+
+    @classmethod
+    def decode(cls, reader: Reader) -> "Transaction":
+        start = reader.pos
+        version = reader.unpack(U8)
+        if version != TX_VERSION:
+            raise DecodeError(f"Versión de transacción no soportada: {version}")
+        flags = reader.unpack(U8)
+        if flags not in (0, 1):
+            raise DecodeError("Flags de transacción inválidos")
+        timestamp = reader.unpack(F64)
+        inputs = [
+            TxInput(txid=reader.hash(), vout=reader.unpack(U32), public_key=reader.public_key(), signature=reader.signature())
+            for _ in range(reader.varint())
+        ]
+        outputs = [TxOutput(amount=sat_to_amount(reader.unpack(I64)), address=reader.str()) for _ in range(reader.varint())]
+        tx = cls(inputs=inputs, outputs=outputs, timestamp=timestamp, is_coinbase=bool(flags), version=version)
+        object.__setattr__(tx, "_serialized", reader.data[start:reader.pos])
+        return tx
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Transaction":
+        # Acepta tanto el formato binario como el JSON heredado (empieza por "{")
+        if data[:1] == b"{":
+            try:
+                tx = cls.from_dict(json.loads(data))
+                tx.serialize()
+            except (KeyError, TypeError, ValueError, struct.error) as exc:
+                # Campos ausentes o de otro tipo en una transacción heredada recibida de un peer
+                raise DecodeError(f"Transacción JSON mal formada: {exc!r}") from exc
+            return tx
+        reader = Reader(data)
+        tx = cls.decode(reader)
+        reader.expect_end()
+        return tx
+
     def serialize(self) -> bytes:
-        return json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")
+        if self._serialized is None:
+            if self.version == LEGACY_TX_VERSION:
+                data = json.dumps(self._legacy_dict(), sort_keys=True).encode("utf-8")
+            else:
+                data = self.encode()
+            object.__setattr__(self, "_serialized", data)
+        return self._serialized
 
     def txid(self) -> str:
-        return double_sha256(self.serialize()).hex()
+        if self._txid is None:
+            object.__setattr__(self, "_txid", double_sha256(self.serialize()).hex())
+        return self._txid
 
     def signable_payload(self) -> bytes:
-        data = self.to_dict().copy()
-        data["inputs"] = [{"txid": i.txid, "vout": i.vout} for i in self.inputs]
-        return json.dumps(data, sort_keys=True).encode("utf-8")
+        if self._signable is None:
+            if self.version == LEGACY_TX_VERSION:
+                data = self._legacy_dict()
+                data["inputs"] = [{"txid": i.txid, "vout": i.vout} for i in self.inputs]
+                payload = json.dumps(data, sort_keys=True).encode("utf-8")
+            else:
+                payload = self.encode(for_signing=True)
+            object.__setattr__(self, "_signable", payload)
+        return self._signable
+
+    def with_signature(self, signature: str) -> "Transaction":
+        return replace(self, inputs=tuple(replace(i, signature=signature) for i in self.inputs))
+
+    def with_output_amount(self, vout: int, amount: float) -> "Transaction":
+        outputs = list(self.outputs)
+        outputs[vout] = replace(outputs[vout], amount=amount)
+        return replace(self, outputs=tuple(outputs))
+
+    def _signatures_by_key(self) -> Dict[str, List[str]]:
+        # Las entradas de una misma wallet repiten clave y firma: cada par distinto se verifica una vez
+        groups: Dict[str, List[str]] = {}
+        for txin in self.inputs:
+            signatures = groups.setdefault(txin.public_key, [])
+            if txin.signature not in signatures:
+                signatures.append(txin.signature)
+        return groups
 
     def verify_signatures(self) -> bool:
         if self.is_coinbase:
             return True
-        msg = self.signable_payload()
-        for txin in self.inputs:
-            try:
-                pub = json.loads(txin.public_key)
-                n, e = int(pub["n"]), int(pub["e"])
-            except Exception:
+        try:
+            msg = self.signable_payload()
+            txid = self.txid()
+        except (ValueError, struct.error):
+            # Campos que no se pueden codificar: hash mal formado, vout o monto fuera de rango
+            return False
+        for public_key, signatures in self._signatures_by_key().items():
+            if (txid, public_key) in VERIFIED_SIGNATURES:
+                continue
+            parsed = parse_public_key(public_key)
+            if parsed is None:
                 return False
-            if not verify_message(n, e, msg, txin.signature):
+            with SIGNATURE_SECONDS.time():
+                valid = all(verify_message(*parsed, msg, signature) for signature in signatures)
+            if not valid:
                 return False
+            VERIFIED_SIGNATURES.add((txid, public_key))
         return True
+
+    def signatures_cached(self) -> bool:
+        txid = self.txid()
+        return self.is_coinbase or all((txid, public_key) in VERIFIED_SIGNATURES for public_key in self._signatures_by_key())
+
+    def mark_signatures_verified(self) -> None:
+        # Para resultados obtenidos en otro proceso (ParallelVerifier)
+        txid = self.txid()
+        for public_key in self._signatures_by_key():
+            VERIFIED_SIGNATURES.add((txid, public_key))
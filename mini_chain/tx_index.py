@@ -0,0 +1,201 @@
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .block import Block
+from .crypto_utils import public_key_address
+from .encoding import DecodeError, Reader, encode_str, encode_varint
+
+# Registro de txindex.dat: altura, hash del bloque y longitud, seguidos de los txids del
+# bloque y los addresses que toca cada uno
+RECORD_HEADER = struct.Struct(">I32sI")
+
+# (altura, posición dentro del bloque)
+TxLocation = Tuple[int, int]
+BlockEntries = List[Tuple[str, List[str]]]
+
+
+def block_entries(block: Block) -> BlockEntries:
+    # Por transacción, su txid y los addresses que aparecen en entradas (derivado de la
+    # clave pública) o salidas, sin repetir
+    entries = []
+    for tx in block.transactions:
+        addresses = [public_key_address(txin.public_key) for txin in tx.inputs] + [o.address for o in tx.outputs]
+        entries.append((tx.txid(), [a for a in dict.fromkeys(addresses) if a is not None]))
+    return entries
+
+
+def _encode_entries(entries: BlockEntries) -> bytes:
+    parts = [encode_varint(len(entries))]
+    for txid, addresses in entries:
+        parts.append(bytes.fromhex(txid))
+        parts.append(encode_varint(len(addresses)))
+        parts.extend(encode_str(address) for address in addresses)
+    return b"".join(parts)
+
+
+def _decode_entries(data: bytes) -> BlockEntries:
+    reader = Reader(data)
+    entries = [(reader.hash(), [reader.str() for _ in range(reader.varint())]) for _ in range(reader.varint())]
+    reader.expect_end()
+    return entries
+
+
+class TxIndex:
+    # Índices de la cadena principal: txid -> (altura, posición) y address -> txids en orden
+    # de confirmación. Se actualizan al conectar y desconectar bloques; con `path` se
+    # guardan en un fichero append-only (un registro por bloque) que se trunca al revertir,
+    # igual que undo.dat. Al reabrir se parte del último snapshot de los diccionarios
+    # (txindex.snapshot, como utxo.snapshot) y solo se decodifican los registros posteriores.
+    def __init__(self, path: Optional[Path] = None):
+        self._locations: Dict[str, TxLocation] = {}
+        self._history: Dict[str, List[str]] = {}
+        # Hash del bloque de cada altura indexada y, en disco, offset de su registro
+        self._hashes: List[str] = []
+        self._offsets: List[int] = []
+        # Sin `path`, las entradas de cada bloque quedan en memoria para poder revertirlas
+        self._entries: List[BlockEntries] = []
+        self._file = None
+        self._snapshot_path: Optional[Path] = None
+        self._end = 0
+        if path is not None:
+            self._file = open(path, "a+b")
+            self._snapshot_path = path.with_suffix(".snapshot")
+            self._end = self._load()
+
+    def _load(self) -> int:
+        self._file.seek(0)
+        raw = self._file.read()
+        end = self._load_snapshot(len(raw))
+        while end + RECORD_HEADER.size <= len(raw):
+            height, raw_hash, length = RECORD_HEADER.unpack_from(raw, end)
+            start = end + RECORD_HEADER.size
+            if height != len(self._offsets) or start + length > len(raw):
+                break
+            try:
+                entries = _decode_entries(raw[start : start + length])
+            except DecodeError:
+                break
+            self._apply(height, entries)
+            self._offsets.append(end)
+            self._hashes.append(raw_hash.hex())
+            end = start + length
+        if end != len(raw):
+            # Registro incompleto de un cierre abrupto
+            self._file.truncate(end)
+        return end
+
+    def _load_snapshot(self, size: int) -> int:
+        # Offset desde el que seguir leyendo registros: 0 si no hay snapshot o no corresponde
+        # al fichero (truncado por debajo de su altura o con otro bloque en esa altura)
+        if not self._snapshot_path.exists():
+            return 0
+        try:
+            data = json.loads(self._snapshot_path.read_text())
+            hashes = data["hashes"]
+            offsets, end = data["offsets"], data["end"]
+        except (ValueError, KeyError, TypeError):
+            return 0
+        if not hashes or end > size:
+            return 0
+        self._file.seek(offsets[-1])
+        header = self._file.read(RECORD_HEADER.size)
+        if len(header) != RECORD_HEADER.size:
+            return 0
+        height, raw_hash, length = RECORD_HEADER.unpack(header)
+        if height != len(hashes) - 1 or raw_hash.hex() != hashes[-1] or offsets[-1] + RECORD_HEADER.size + length != end:
+            return 0
+        self._hashes, self._offsets = hashes, offsets
+        self._locations = {txid: tuple(location) for txid, location in data["locations"].items()}
+        self._history = data["history"]
+        return end
+
+    def save_snapshot(self) -> None:
+        if self._snapshot_path is None:
+            return
+        data = {
+            "end": self._end,
+            "hashes": self._hashes,
+            "offsets": self._offsets,
+            "locations": self._locations,
+            "history": self._history,
+        }
+        tmp = self._snapshot_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, self._snapshot_path)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def hash_at(self, height: int) -> str:
+        return self._hashes[height]
+
+    def _apply(self, height: int, entries: BlockEntries) -> None:
+        for position, (txid, addresses) in enumerate(entries):
+            self._locations[txid] = (height, position)
+            for address in addresses:
+                self._history.setdefault(address, []).append(txid)
+
+    def _revert(self, height: int, entries: BlockEntries) -> None:
+        for position, (txid, addresses) in reversed(list(enumerate(entries))):
+            if self._locations.get(txid) == (height, position):
+                del self._locations[txid]
+            for address in addresses:
+                txids = self._history.get(address)
+                if txids and txids[-1] == txid:
+                    txids.pop()
+                    if not txids:
+                        del self._history[address]
+
+    def add_block(self, block: Block) -> None:
+        if block.index != len(self._hashes):
+            raise ValueError(f"El índice espera la altura {len(self._hashes)}, no {block.index}")
+        entries = block_entries(block)
+        if self._file is None:
+            self._entries.append(entries)
+        else:
+            payload = _encode_entries(entries)
+            self._file.seek(self._end)
+            self._file.write(RECORD_HEADER.pack(block.index, bytes.fromhex(block.hash()), len(payload)) + payload)
+            self._file.flush()
+            self._offsets.append(self._end)
+            self._end += RECORD_HEADER.size + len(payload)
+        self._apply(block.index, entries)
+        self._hashes.append(block.hash())
+
+    def _entries_at(self, height: int) -> BlockEntries:
+        if self._file is None:
+            return self._entries[height]
+        self._file.seek(self._offsets[height])
+        _, _, length = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+        return _decode_entries(self._file.read(length))
+
+    def truncate(self, height: int) -> None:
+        # Retira del índice los bloques por encima de `height`, del más alto al más bajo
+        if height + 1 >= len(self._hashes):
+            return
+        for h in range(len(self._hashes) - 1, height, -1):
+            self._revert(h, self._entries_at(h))
+        del self._hashes[height + 1 :]
+        if self._file is None:
+            del self._entries[height + 1 :]
+            return
+        self._end = self._offsets[height + 1]
+        del self._offsets[height + 1 :]
+        self._file.truncate(self._end)
+
+    def location(self, txid: str) -> Optional[TxLocation]:
+        return self._locations.get(txid)
+
+    def history(self, address: str, offset: int = 0, limit: int = 50) -> Tuple[List[Tuple[str, TxLocation]], int]:
+        # Página de la historia de un address, de la más reciente a la más antigua
+        txids = self._history.get(address, [])
+        end = max(0, len(txids) - offset)
+        page = txids[max(0, end - limit) : end]
+        return [(txid, self._locations[txid]) for txid in reversed(page)], len(txids)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
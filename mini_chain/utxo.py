@@ -0,0 +1,138 @@
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .block import Block
+from .encoding import F64, U32, Reader, encode_str, encode_varint
+
+Outpoint = Tuple[str, int]
+
+
+@dataclass
+class UTXO:
+    txid: str
+    vout: int
+    amount: float
+    address: str
+
+
+@dataclass
+class BlockUndo:
+    # Datos para revertir un bloque sin re-escanear la cadena: los UTXOs que consumió
+    # y los outpoints que creó (en orden de aplicación).
+    spent: List[UTXO] = field(default_factory=list)
+    created: List[Outpoint] = field(default_factory=list)
+
+    def encode(self) -> bytes:
+        parts = [encode_varint(len(self.spent))]
+        for u in self.spent:
+            parts.extend([bytes.fromhex(u.txid), U32.pack(u.vout), F64.pack(u.amount), encode_str(u.address)])
+        parts.append(encode_varint(len(self.created)))
+        for txid, vout in self.created:
+            parts.extend([bytes.fromhex(txid), U32.pack(vout)])
+        return b"".join(parts)
+
+    @classmethod
+    def decode(cls, data: bytes) -> "BlockUndo":
+        reader = Reader(data)
+        spent = [
+            UTXO(txid=reader.hash(), vout=reader.unpack(U32), amount=reader.unpack(F64), address=reader.str())
+            for _ in range(reader.varint())
+        ]
+        created = [(reader.hash(), reader.unpack(U32)) for _ in range(reader.varint())]
+        reader.expect_end()
+        return cls(spent=spent, created=created)
+
+
+class UTXOSet:
+    # Índice persistente (txid, vout) -> UTXO que se actualiza bloque a bloque,
+    # evitando recorrer toda la cadena en cada consulta. Mantiene además un
+    # índice secundario por address con su saldo acumulado.
+    def __init__(self) -> None:
+        self._entries: Dict[Outpoint, UTXO] = {}
+        self._by_address: Dict[str, Dict[Outpoint, UTXO]] = {}
+        self._balances: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Outpoint) -> bool:
+        return key in self._entries
+
+    def get(self, key: Outpoint) -> Optional[UTXO]:
+        return self._entries.get(key)
+
+    def values(self) -> List[UTXO]:
+        return list(self._entries.values())
+
+    def for_address(self, address: str) -> List[UTXO]:
+        return list(self._by_address.get(address, {}).values())
+
+    def count_for_address(self, address: str) -> int:
+        return len(self._by_address.get(address, ()))
+
+    def page_for_address(self, address: str, offset: int, limit: int) -> List[UTXO]:
+        entries = self._by_address.get(address, {})
+        return list(islice(entries.values(), offset, offset + limit))
+
+    def balance(self, address: str) -> float:
+        return round(self._balances.get(address, 0.0), 8)
+
+    def _add(self, utxo: UTXO) -> None:
+        key = (utxo.txid, utxo.vout)
+        self._entries[key] = utxo
+        self._by_address.setdefault(utxo.address, {})[key] = utxo
+        self._balances[utxo.address] = self._balances.get(utxo.address, 0.0) + utxo.amount
+
+    def _remove(self, key: Outpoint) -> Optional[UTXO]:
+        utxo = self._entries.pop(key, None)
+        if utxo is None:
+            return None
+        owned = self._by_address[utxo.address]
+        del owned[key]
+        if owned:
+            self._balances[utxo.address] -= utxo.amount
+        else:
+            # Sin UTXOs el saldo es exactamente 0: se descarta el error de redondeo acumulado
+            del self._by_address[utxo.address]
+            del self._balances[utxo.address]
+        return utxo
+
+    def apply_block(self, block: Block) -> BlockUndo:
+        spent: List[UTXO] = []
+        created: Dict[Outpoint, None] = {}
+        for tx in block.transactions:
+            tid = tx.txid()
+            for txin in tx.inputs:
+                key = (txin.txid, txin.vout)
+                utxo = self._remove(key)
+                if key in created:
+                    # Creado y gastado dentro del mismo bloque: no existía antes del bloque
+                    del created[key]
+                elif utxo is not None:
+                    spent.append(utxo)
+            for idx, out in enumerate(tx.outputs):
+                self._add(UTXO(txid=tid, vout=idx, amount=out.amount, address=out.address))
+                created[(tid, idx)] = None
+        return BlockUndo(spent=spent, created=list(created))
+
+    def undo_block(self, undo: BlockUndo) -> None:
+        for key in reversed(undo.created):
+            self._remove(key)
+        for utxo in reversed(undo.spent):
+            self._add(utxo)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_address.clear()
+        self._balances.clear()
+
+    def restore(self, utxos: Iterable[UTXO]) -> None:
+        self.clear()
+        for utxo in utxos:
+            self._add(utxo)
+
+    def rebuild(self, chain: Iterable[Block]) -> None:
+        self.clear()
+        for block in chain:
+            self.apply_block(block)
@@ -0,0 +1,220 @@
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .block import Block
+from .crypto_utils import public_key_address
+from .storage import decode_block_payload
+from .transaction import Transaction
+from .utxo import Outpoint, UTXOSet
+
+COINBASE_REWARD = 50.0
+# Bloques por tarea del pool y tareas en vuelo por worker durante la validación completa
+VALIDATION_CHUNK = 64
+CHUNKS_IN_FLIGHT = 2
+# validate_full puede correr en un hilo del executor de la API: los workers no se crean
+# con fork para no heredar locks tomados por otros hilos
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def valid_proof(block: Block, min_difficulty: int) -> bool:
+    # Válido también para bloques "solo cabecera" (sincronización headers-first)
+    return block.difficulty >= min_difficulty and block.hash().startswith("0" * block.difficulty)
+
+
+def valid_amount(amount: float, positive: bool = False) -> bool:
+    # Monto finito y no negativo (estrictamente positivo si `positive`). Un monto negativo
+    # o NaN compensaría otra salida y pasaría cualquier cota sobre la suma.
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount):
+        return False
+    return amount > 0 if positive else amount >= 0
+
+
+def valid_output_amounts(block: Block) -> bool:
+    # Coinbase con montos no negativos (la de génesis paga 0); el resto, positivos
+    return all(valid_amount(o.amount, positive=not tx.is_coinbase) for tx in block.transactions for o in tx.outputs)
+
+
+def valid_block_shape(block: Block, min_difficulty: int) -> bool:
+    # Reglas que no dependen del estado: PoW y coinbase única al inicio con montos válidos.
+    # Su tope (recompensa + comisiones) necesita el UTXO set: ver valid_coinbase_total.
+    if not valid_proof(block, min_difficulty):
+        return False
+    if not block.transactions:
+        return False
+    coinbase, rest = block.transactions[0], block.transactions[1:]
+    if not coinbase.is_coinbase or coinbase.inputs or not all(valid_amount(o.amount) for o in coinbase.outputs):
+        return False
+    return not any(tx.is_coinbase for tx in rest)
+
+
+def valid_coinbase_total(block: Block, fees: float) -> bool:
+    # La coinbase cobra como mucho la recompensa más las comisiones de las transacciones del bloque
+    return sum(o.amount for o in block.transactions[0].outputs) <= COINBASE_REWARD + fees + 1e-9
+
+
+def tx_fee(utxo_set: UTXOSet, tx: Transaction, spent: Set[Outpoint]) -> Optional[float]:
+    # Comisión (entradas - salidas) o None si la tx no gasta UTXOs válidos o alguna salida
+    # no es positiva. `spent` acumula los outpoints ya consumidos (p. ej. dentro de un mismo bloque)
+    if not all(valid_amount(o.amount, positive=True) for o in tx.outputs):
+        return None
+    in_total = 0.0
+    seen_inputs = set()
+
+    for txin in tx.inputs:
+        key = (txin.txid, txin.vout)
+        if key in seen_inputs or key in spent:
+            return None
+        seen_inputs.add(key)
+
+        utxo = utxo_set.get(key)
+        if utxo is None:
+            return None
+
+        # Clave ya interpretada y address ya derivado si la clave se vio antes
+        if public_key_address(txin.public_key) != utxo.address:
+            return None
+        in_total += utxo.amount
+
+    out_total = sum(o.amount for o in tx.outputs)
+    if in_total + 1e-9 < out_total:
+        return None
+
+    spent.update(seen_inputs)
+    return round(max(in_total - out_total, 0.0), 8)
+
+
+def block_fees(utxo_set: UTXOSet, block: Block) -> Optional[float]:
+    # Comisiones del bloque contra el UTXO set previo, o None si alguna tx no gasta UTXOs válidos
+    spent: Set[Outpoint] = set()
+    total = 0.0
+    for tx in block.transactions[1:]:
+        fee = tx_fee(utxo_set, tx, spent)
+        if fee is None:
+            return None
+        total += fee
+    return round(total, 8)
+
+
+@dataclass
+class ValidationReport:
+    valid: bool = True
+    blocks: int = 0
+    transactions: int = 0
+    error: Optional[str] = None
+    failed_height: Optional[int] = None
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    def as_dict(self) -> dict:
+        elapsed = max((self.finished or time.monotonic()) - self.started, 1e-9)
+        return {
+            "valid": self.valid,
+            "blocks": self.blocks,
+            "transactions": self.transactions,
+            "error": self.error,
+            "failed_height": self.failed_height,
+            "elapsed": round(elapsed, 3),
+            "blocks_per_s": round(self.blocks / elapsed, 1),
+        }
+
+
+def _check_chunk(payloads: List[bytes]) -> List[Tuple[str, bool]]:
+    # Parte paralela: hash recalculado desde el contenido y firmas de todas las transacciones
+    results = []
+    for payload in payloads:
+        block = decode_block_payload(payload)
+        results.append((block.hash(), all(tx.verify_signatures() for tx in block.transactions[1:])))
+    return results
+
+
+def _chunks(payloads: Iterable[bytes], size: int) -> Iterator[List[bytes]]:
+    chunk: List[bytes] = []
+    for payload in payloads:
+        chunk.append(payload)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_blocks(
+    payloads: Iterable[bytes],
+    min_difficulty: int,
+    utxo_set: UTXOSet,
+    workers: int = 0,
+    on_block: Optional[Callable[[Block], None]] = None,
+) -> ValidationReport:
+    # Validación completa desde génesis sobre los bloques serializados: los hashes y las firmas
+    # se comprueban por tramos en un pool de procesos y, detrás, en orden, se revisan enlaces,
+    # forma y gastos contra `utxo_set` (que debe empezar vacío) y se aplica cada bloque.
+    # Se detiene en el primer bloque inválido; `utxo_set` queda en el estado del anterior.
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    report = ValidationReport()
+    pool = _MP_CONTEXT.Pool(workers) if workers > 1 else None
+    prev_hash = "0" * 64
+
+    def replay(chunk: List[bytes], results: List[Tuple[str, bool]]) -> bool:
+        nonlocal prev_hash
+        for payload, (block_hash, signed) in zip(chunk, results):
+            height = report.blocks
+            block = decode_block_payload(payload, block_hash=block_hash)
+            if block.index != height or block.previous_hash != prev_hash:
+                error = "no enlaza con el bloque anterior"
+            elif not valid_output_amounts(block):
+                error = "montos de salida negativos o no finitos"
+            elif not (valid_block_shape(block, min_difficulty) if height else valid_proof(block, 0)):
+                error = "PoW o coinbase inválidos"
+            elif not signed:
+                error = "firma inválida"
+            else:
+                fees = block_fees(utxo_set, block)
+                if fees is None:
+                    error = "gasta UTXOs inexistentes o ajenos"
+                elif not valid_coinbase_total(block, fees):
+                    error = "la coinbase supera la recompensa más las comisiones"
+                else:
+                    error = None
+            if error is not None:
+                report.valid, report.error, report.failed_height = False, error, height
+                return False
+            utxo_set.apply_block(block)
+            if on_block is not None:
+                on_block(block)
+            prev_hash = block_hash
+            report.blocks += 1
+            report.transactions += len(block.transactions)
+        return True
+
+    try:
+        if pool is None:
+            for chunk in _chunks(payloads, VALIDATION_CHUNK):
+                if not replay(chunk, _check_chunk(chunk)):
+                    break
+        else:
+            # Ventana acotada de tramos en vuelo: los workers adelantan hashes y firmas
+            # mientras el proceso principal repite los gastos en orden
+            in_flight: deque = deque()
+            for chunk in _chunks(payloads, VALIDATION_CHUNK):
+                in_flight.append((chunk, pool.apply_async(_check_chunk, (chunk,))))
+                if len(in_flight) >= workers * CHUNKS_IN_FLIGHT and not replay(*_collect(in_flight.popleft())):
+                    break
+            else:
+                while in_flight and replay(*_collect(in_flight.popleft())):
+                    pass
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        report.finished = time.monotonic()
+    return report
+
+
+def _collect(item) -> Tuple[List[bytes], List[Tuple[str, bool]]]:
+    chunk, pending = item
+    return chunk, pending.get()
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import threading
+from typing import List, Sequence
+
+from .transaction import Transaction
+
+# Por debajo de este tamaño de lote no compensa serializar las transacciones hacia el pool
+PARALLEL_MIN_BATCH = 64
+# Tramos por worker: más de uno reparte mejor lotes con transacciones de distinto tamaño
+CHUNKS_PER_WORKER = 4
+# El pool se crea desde hilos del executor mientras otros pueden tener tomados locks del
+# proceso (caché de firmas, métricas); con fork el hijo los heredaría cerrados para siempre
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _verify_chunk(payloads: List[bytes]) -> List[bool]:
+    return [Transaction.from_bytes(payload).verify_signatures() for payload in payloads]
+
+
+class ParallelVerifier:
+    # Verifica las firmas de un lote de transacciones repartiéndolo por tramos entre un
+    # pool de procesos (la exponenciación modular no suelta el GIL).
+    # workers <= 0 usa todos los núcleos disponibles.
+    def __init__(self, workers: int = 0, min_batch: int = PARALLEL_MIN_BATCH):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.min_batch = min_batch
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = _MP_CONTEXT.Pool(self.workers)
+            return self._pool
+
+    def verify(self, txs: Sequence[Transaction]) -> List[bool]:
+        if self.workers == 1 or len(txs) < self.min_batch:
+            return [tx.verify_signatures() for tx in txs]
+        # Las ya verificadas (caché de firmas del proceso principal) no viajan al pool
+        pending = [i for i, tx in enumerate(txs) if not tx.signatures_cached()]
+        if len(pending) < self.min_batch:
+            return [tx.verify_signatures() for tx in txs]
+        results = [True] * len(txs)
+        payloads = [txs[i].serialize() for i in pending]
+        size = -(-len(payloads) // (self.workers * CHUNKS_PER_WORKER))
+        chunks = [payloads[i : i + size] for i in range(0, len(payloads), size)]
+        verified = (ok for chunk in self._ensure_pool().map(_verify_chunk, chunks) for ok in chunk)
+        for i, ok in zip(pending, verified):
+            results[i] = ok
+            if ok:
+                txs[i].mark_signatures_verified()
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
@@ -5,6 +5,7 @@ from .crypto_utils import (
     compressed_pubkey_from_seed,
     keypair_from_seed,
     sign_message,
+    sign_message_crt,
     wif_from_seed,
 )
 
@@ -18,7 +19,8 @@ class Wallet:
     address: str
     btc_public_key_hex: str
     btc_address: str
-    _priv: tuple[int, int, int]
+    # (n, e, d, p, q, dp, dq, qinv); las wallets guardadas antes de firmar por CRT solo tienen (n, e, d)
+    _priv: tuple[int, ...]
 
     @classmethod
     def from_seed(cls, name: str, seed: str) -> "Wallet":
@@ -37,5 +39,7 @@ class Wallet:
         )
 
     def sign(self, payload: bytes) -> str:
-        n, _, d = self._priv
-        return sign_message(n, d, payload)
+        if len(self._priv) == 3:
+            n, _, d = self._priv
+            return sign_message(n, d, payload)
+        return sign_message_crt(*self._priv[3:], payload)
@@ -12,25 +12,39 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--port", type=int, default=5001)
     p.add_argument("--difficulty", type=int, default=3)
     p.add_argument("--block-interval", type=int, default=240)
+    p.add_argument("--mining-workers", type=int, default=1, help="procesos de minado (0 = todos los núcleos)")
+    p.add_argument("--data-dir", default=None, help="directorio del almacén de bloques en disco (por defecto, solo memoria)")
+    p.add_argument("--verify-workers", type=int, default=0, help="procesos para verificar firmas y validar la cadena (0 = todos los núcleos)")
+    p.add_argument("--reindex", action="store_true", help="al arrancar, valida la cadena completa (hashes, firmas y gastos) en lugar de usar el snapshot UTXO")
     return p
 
 
 def print_help() -> None:
     print(
-        "Comandos: create-wallet <entropia>, balance <address>, tx <from_address_btc> <to_address_btc> <amount> <private_key_wif|seed>, "
-        "attack-fake-tx <from_address> <to_address> <amount>, tamper <index>, mine-now, chain, mempool, peers, connect <host> <port>, help, exit"
+        "Comandos: create-wallet <entropia>, balance <address>, tx <from_address_btc> <to_address_btc> <amount> <private_key_wif|seed> [fee], "
+        "attack-fake-tx <from_address> <to_address> <amount>, tamper <index>, mine-now, chain, validate, mempool, peers, connect <host> <port>, sync, help, exit"
     )
 
 
 def main() -> None:
     args = build_parser().parse_args()
-    bc = Blockchain(difficulty=args.difficulty, block_interval=args.block_interval)
+    bc = Blockchain(
+        difficulty=args.difficulty,
+        block_interval=args.block_interval,
+        mining_workers=args.mining_workers,
+        data_dir=args.data_dir,
+        verify_workers=args.verify_workers,
+        reindex=args.reindex,
+    )
+    if bc.reindex_report is not None:
+        print(f"reindex: {bc.reindex_report.as_dict()}")
     node = Node(args.node_id, args.host, args.port, bc)
+    node.start()
 
     miner = bc.register_wallet("miner", f"{args.node_id}-miner-seed").address
     bc.start_auto_mining(miner)
 
-    print(f"Nodo {args.node_id} iniciado en {args.host}:{args.port}")
+    print(f"Nodo {args.node_id} iniciado en {args.host}:{node.port}")
     print(f"Miner address: {miner}")
     print_help()
 
@@ -58,27 +72,36 @@ def main() -> None:
                 })
             elif cmd == "balance" and len(parts) == 2:
                 print(bc.balance_of(parts[1]))
-            elif cmd == "tx" and len(parts) == 5:
-                tx = bc.create_transaction(parts[1], parts[2], float(parts[3]), parts[4])
+            elif cmd == "tx" and len(parts) in (5, 6):
+                fee = float(parts[5]) if len(parts) == 6 else 0.0
+                tx = bc.create_transaction(parts[1], parts[2], float(parts[3]), parts[4], fee=fee)
                 print("accepted" if bc.add_transaction(tx) else "rejected")
             elif cmd == "attack-fake-tx" and len(parts) == 4:
                 tx = bc.build_fake_transaction(parts[1], parts[2], float(parts[3]))
                 print("accepted" if bc.add_transaction(tx) else "rejected (immutability/validation)")
             elif cmd == "tamper" and len(parts) == 2:
                 tampered = bc.tamper_block(int(parts[1]))
-                print({"tampered": tampered, "chain_valid": bc.validate_chain()})
+                print({"tampered": tampered, "chain_valid": bc.chain_valid()})
             elif cmd == "mine-now":
                 block = bc.mine_block(miner)
                 print({"index": block.index, "hash": block.hash()})
             elif cmd == "chain":
-                print({"height": len(bc.chain) - 1, "tip": bc.chain[-1].hash(), "chain_valid": bc.validate_chain()})
+                snap = bc.snapshot()
+                print({"height": snap.height, "tip": snap.tip, "chain_valid": bc.chain_valid()})
+            elif cmd == "validate":
+                print(bc.validate_full().as_dict())
             elif cmd == "mempool":
-                print(f"txs={len(bc.mempool)}")
+                info = bc.mempool_info(limit=5)
+                print(f"txs={info['size']} bytes={info['bytes']}/{info['max_bytes']}")
+                for entry in info["transactions"]:
+                    print(f"  {entry['txid'][:16]} fee={entry['fee']} fee_rate={entry['fee_rate']} sat/B")
             elif cmd == "connect" and len(parts) == 3:
                 node.connect_peer(parts[1], int(parts[2]))
-                print("peer añadido")
+                print("peer conectado")
             elif cmd == "peers":
-                print(node.peers)
+                print({"known": node.peers, "connected": node.connected_peers(), "stats": dict(node.stats)})
+            elif cmd == "sync":
+                print(node.sync_status() or "sin sincronización")
             elif cmd == "help":
                 print_help()
             elif cmd == "exit":
@@ -88,7 +111,8 @@ def main() -> None:
         except Exception as exc:
             print(f"Error: {exc}")
 
-    bc.stop_auto_mining()
+    node.stop()
+    bc.close()
 
 
 if __name__ == "__main__":
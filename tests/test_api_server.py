@@ -0,0 +1,278 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+
+from api_server import APIServer, MAX_BODY_BYTES
+from mini_chain.blockchain import Blockchain
+from mini_chain.merkle import verify_proof
+from mini_chain.metrics import REGISTRY
+from mini_chain.transaction import Transaction, TxInput, TxOutput
+
+
+class APIServerTests(unittest.TestCase):
+    def setUp(self):
+        self.bc = Blockchain(difficulty=1, block_interval=999)
+        self.bc.register_wallet("miner", "miner-seed")
+        self.api = APIServer(self.bc, workers=1, max_queue=0, sse_max_pending=4096)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        server = self._call(self.api.start("127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+
+    def tearDown(self):
+        self._call(self.api.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.bc.close()
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout=5)
+
+    def _connection(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        self.addCleanup(conn.close)
+        return conn
+
+    def _sse_client(self):
+        sock = socket.create_connection(("127.0.0.1", self.port), timeout=5)
+        self.addCleanup(sock.close)
+        sock.sendall(b"GET /api/events HTTP/1.1\r\nHost: test\r\n\r\n")
+        data = b""
+        while b"retry: 3000\n\n" not in data:
+            data += sock.recv(4096)
+        return sock
+
+    def _wait_for(self, predicate):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_keep_alive_reuses_connection_and_honours_etag(self):
+        conn = self._connection()
+        conn.request("GET", "/api/summary")
+        first = conn.getresponse()
+        body = json.loads(first.read())
+        self.assertEqual(body["height"], 0)
+        sock = conn.sock
+
+        conn.request("GET", "/api/summary", headers={"If-None-Match": first.getheader("ETag")})
+        second = conn.getresponse()
+        second.read()
+        self.assertEqual(second.status, 304)
+        self.assertIs(conn.sock, sock)
+
+    def test_oversized_body_is_rejected(self):
+        conn = self._connection()
+        conn.putrequest("POST", "/api/tx")
+        conn.putheader("Content-Length", str(MAX_BODY_BYTES + 1))
+        conn.endheaders()
+        response = conn.getresponse()
+        self.assertEqual(response.status, 413)
+        self.assertEqual(response.getheader("Connection"), "close")
+
+    def test_idle_timeout_does_not_cover_a_slow_body(self):
+        body = json.dumps({"index": 5}).encode()
+        with mock.patch("api_server.KEEPALIVE_TIMEOUT", 0.2):
+            conn = self._connection()
+            conn.putrequest("POST", "/api/attack/tamper")
+            conn.putheader("Content-Length", str(len(body)))
+            conn.endheaders()
+            for i in range(len(body)):
+                conn.send(body[i : i + 1])
+                time.sleep(0.05)
+            response = conn.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertFalse(json.loads(response.read())["tampered"])
+
+            # Una conexión inactiva sí se cierra tras el timeout
+            time.sleep(0.4)
+            conn.request("GET", "/api/summary")
+            with self.assertRaises((http.client.RemoteDisconnected, ConnectionError)):
+                conn.getresponse()
+
+    def test_tamper_rejects_non_integer_index(self):
+        conn = self._connection()
+        for index in ('"abc"', "null", "[1]", "1e999"):
+            conn.request("POST", "/api/attack/tamper", body='{"index": %s}' % index)
+            response = conn.getresponse()
+            response.read()
+            self.assertEqual(response.status, 400)
+
+    def test_cpu_routes_return_503_when_executor_is_full(self):
+        release = threading.Event()
+        self.bc.mine_block = lambda address: release.wait(5)
+        busy = self._connection()
+        busy.request("POST", "/api/mine")
+        self.assertTrue(self._wait_for(lambda: self.api.executor.inflight == 1))
+
+        conn = self._connection()
+        conn.request("POST", "/api/mine")
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 503)
+        self.assertEqual(response.getheader("Retry-After"), "1")
+
+        # Las rutas ligeras no pasan por el executor
+        conn.request("GET", "/api/summary")
+        self.assertEqual(conn.getresponse().status, 200)
+        release.set()
+
+    def test_summary_validates_chain_off_the_event_loop(self):
+        release = threading.Event()
+        validate_chain = self.bc.validate_chain
+        self.bc.validate_chain = lambda: release.wait(5) and validate_chain()
+        self.bc._chain_valid = None  # como tras reabrir un almacén
+        slow = self._connection()
+        slow.request("GET", "/api/summary")
+        self.assertTrue(self._wait_for(lambda: self.api.executor.inflight == 1))
+
+        # El event loop sigue atendiendo otras conexiones mientras se valida
+        conn = self._connection()
+        conn.request("GET", "/api/mempool")
+        self.assertEqual(conn.getresponse().status, 200)
+        release.set()
+        self.assertTrue(json.loads(slow.getresponse().read())["chain_valid"])
+
+    def test_fake_transaction_with_unencodable_amount_is_rejected(self):
+        conn = self._connection()
+        conn.request("POST", "/api/attack/fake-tx", body=json.dumps({"amount": 1e20}))
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        self.assertEqual(response.status, 200)
+        self.assertFalse(data["accepted"])
+
+    def test_batch_submission_reports_each_transaction(self):
+        other = self.bc.register_wallet("other", "other-seed")
+        miner = self.bc.wallets["miner"]
+        self.bc.mine_block(miner.address)
+        self.bc.mine_block(other.address)
+        first = self.bc.create_transaction(miner.address, other.address, 5, miner.seed)
+        double_spend = self.bc.create_transaction(miner.address, other.address, 7, miner.seed)
+        second = self.bc.create_transaction(other.address, miner.address, 3, other.seed)
+        body = {"transactions": [first.serialize().hex(), double_spend.serialize().hex(), "zz", second.to_dict()]}
+
+        conn = self._connection()
+        conn.request("POST", "/api/tx/batch", body=json.dumps(body))
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        self.assertEqual(response.status, 200)
+        self.assertEqual((data["accepted"], data["rejected"]), (2, 2))
+        self.assertEqual([r["accepted"] for r in data["results"]], [True, False, False, True])
+        self.assertEqual(data["results"][1]["txid"], double_spend.txid())
+        self.assertIn("outpoint", data["results"][1]["error"])
+        self.assertEqual(data["results"][2], {"txid": None, "accepted": False, "error": "transacción mal formada"})
+        self.assertEqual(len(self.bc.snapshot().mempool), 2)
+
+    def test_batch_reports_unencodable_items_as_malformed(self):
+        miner = self.bc.wallets["miner"]
+        self.bc.mine_block(miner.address)
+        valid = self.bc.create_transaction(miner.address, "destino", 5, miner.seed)
+        bad_vout, bad_txid = valid.to_dict(), valid.to_dict()
+        bad_vout["inputs"][0]["vout"] = -1
+        bad_txid["inputs"][0]["txid"] = "zz"
+        self.assertFalse(Transaction.from_dict(bad_vout).verify_signatures())
+        self.assertFalse(Transaction.from_dict(bad_txid).verify_signatures())
+
+        conn = self._connection()
+        conn.request("POST", "/api/tx/batch", body=json.dumps({"transactions": [bad_vout, bad_txid, valid.to_dict()]}))
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        self.assertEqual(response.status, 200)
+        self.assertEqual([r["accepted"] for r in data["results"]], [False, False, True])
+        self.assertEqual({r.get("error") for r in data["results"][:2]}, {"transacción mal formada"})
+
+    def test_batch_rejects_signed_transaction_with_negative_output(self):
+        miner = self.bc.wallets["miner"]
+        self.bc.mine_block(miner.address)
+        utxo = self.bc.address_utxos(miner.address)[0][0]
+        # Las salidas suman lo mismo que la entrada, pero la primera crea 1000 monedas
+        tx = Transaction(
+            inputs=[TxInput(txid=utxo.txid, vout=utxo.vout, signature="", public_key=miner.public_key_hex)],
+            outputs=[TxOutput(1000, miner.address), TxOutput(-950, "sumidero")],
+        )
+        tx = tx.with_signature(miner.sign(tx.signable_payload()))
+
+        conn = self._connection()
+        conn.request("POST", "/api/tx/batch", body=json.dumps({"transactions": [tx.serialize().hex()]}))
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        self.assertEqual(response.status, 200)
+        self.assertEqual(data["results"], [{"txid": tx.txid(), "accepted": False, "error": "las salidas deben tener montos positivos"}])
+        self.assertEqual(len(self.bc.snapshot().mempool), 0)
+
+    def test_transaction_proof_matches_block_merkle_root(self):
+        other = self.bc.register_wallet("other", "other-seed")
+        miner = self.bc.wallets["miner"]
+        self.bc.mine_block(miner.address)
+        tx = self.bc.create_transaction(miner.address, other.address, 5, miner.seed)
+        self.assertTrue(self.bc.add_transaction(tx))
+        block = self.bc.mine_block(miner.address)
+
+        conn = self._connection()
+        conn.request("GET", f"/api/tx/{tx.txid()}/proof")
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        self.assertEqual(response.status, 200)
+        self.assertEqual((data["block_hash"], data["position"], data["merkle_root"]), (block.hash(), 1, block.merkle_root()))
+        self.assertTrue(verify_proof(tx.txid(), [(step["hash"], step["left"]) for step in data["proof"]], data["merkle_root"]))
+
+        conn.request("GET", f"/api/tx/{'0' * 64}/proof")
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 404)
+
+    def test_metrics_use_prometheus_text_format(self):
+        REGISTRY.enabled = True
+        self.addCleanup(REGISTRY.reset)
+        self.addCleanup(setattr, REGISTRY, "enabled", False)
+        self.bc.mine_block(self.bc.wallets["miner"].address)
+
+        conn = self._connection()
+        conn.request("GET", f"/api/blocks/{'0' * 64}")
+        conn.getresponse().read()
+        conn.request("GET", "/api/metrics")
+        response = conn.getresponse()
+        lines = response.read().decode().splitlines()
+        self.assertTrue(response.getheader("Content-Type").startswith("text/plain; version=0.0.4"))
+        self.assertIn('minichain_http_requests_total{method="GET",route="/api/blocks/{hash}",status="404"} 1', lines)
+        self.assertIn("minichain_chain_height 1", lines)
+        self.assertIn("minichain_mempool_transactions 0", lines)
+        hashes = next(line for line in lines if line.startswith("minichain_mining_hashes_total "))
+        self.assertGreater(int(hashes.split()[1]), 0)
+
+        conn.request("GET", "/api/metrics?format=json")
+        self.assertIn("signature_cache", json.loads(conn.getresponse().read()))
+
+    def test_events_reach_subscribers_and_slow_clients_are_dropped(self):
+        listeners = [self._sse_client() for _ in range(3)]
+        self.assertTrue(self._wait_for(lambda: len(self.api.events) == 3))
+        block = self.bc.mine_block(self.bc.wallets["miner"].address)
+        for sock in listeners:
+            data = b""
+            while b"tx_count" not in data:
+                data += sock.recv(4096)
+            self.assertIn(b"event: block\ndata: ", data)
+            self.assertIn(block.hash().encode(), data)
+
+        # Ninguno lee: al superar sse_max_pending pendientes se les desconecta
+        for sock in listeners:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+        for _ in range(5000):
+            self.bc.events.publish("mempool", {"pad": "x" * 1000})
+            if not len(self.api.events):
+                break
+        self.assertTrue(self._wait_for(lambda: len(self.api.events) == 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
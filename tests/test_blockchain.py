@@ -1,6 +1,7 @@
 import unittest
 
 from mini_chain.blockchain import Blockchain
+from mini_chain.utxo import UTXOSet
 
 
 class BlockchainTests(unittest.TestCase):
@@ -63,6 +64,120 @@ class BlockchainTests(unittest.TestCase):
         tx = bc.build_fake_transaction(from_address="fake", to_address="attacker", amount=999)
         self.assertFalse(bc.add_transaction(tx))
 
+    def test_utxo_index_matches_full_rescan(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        sender = bc.register_wallet("sender", "owner-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        bc.mine_block(sender.address)
+        tx = bc.create_transaction(sender.btc_address, receiver.btc_address, 3, "owner-seed")
+        self.assertTrue(bc.add_transaction(tx))
+        bc.mine_block(sender.address)
+
+        rescan = UTXOSet()
+        rescan.rebuild(bc.chain)
+        self.assertEqual(bc.utxos(), rescan.values())
+        self.assertEqual(bc.balance_of(receiver.btc_address), 3)
+        self.assertEqual(bc.balance_of(sender.btc_address), 97)
+
+        self.assertTrue(bc.tamper_block(1))
+        rescan.rebuild(bc.chain)
+        self.assertEqual(bc.utxos(), rescan.values())
+
+    def test_address_index_tracks_balance_and_coin_selection(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        sender = bc.register_wallet("sender", "owner-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        bc.mine_block(sender.address)
+        bc.mine_block(sender.address)
+
+        page, total = bc.address_utxos(sender.btc_address, offset=1, limit=10)
+        self.assertEqual(total, 2)
+        self.assertEqual(len(page), 1)
+
+        tx = bc.create_transaction(sender.btc_address, receiver.btc_address, 60, "owner-seed", coin_selection="largest-first")
+        self.assertEqual(len(tx.inputs), 2)
+        self.assertTrue(bc.add_transaction(tx))
+        bc.mine_block(receiver.address)
+        self.assertEqual(bc.balance_of(sender.btc_address), 40)
+        self.assertEqual(bc.balance_of(receiver.btc_address), 110)
+        self.assertEqual(bc.address_utxos(sender.btc_address)[1], 1)
+
+    def test_stale_template_is_discarded_when_tip_moves(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        miner = bc.register_wallet("miner", "miner-seed")
+        with bc._lock:
+            template = bc._block_template(miner.address)
+        bc.mine_block(miner.address)
+
+        template.mine()
+        with bc._lock:
+            self.assertFalse(bc._commit_block(template))
+        self.assertEqual(bc.snapshot().height, 1)
+
+    def test_transactions_arriving_during_pow_stay_in_mempool(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        sender = bc.register_wallet("sender", "owner-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        bc.mine_block(sender.address)
+        bc.mine_block(sender.address)
+
+        first = bc.create_transaction(sender.btc_address, receiver.btc_address, 50, "owner-seed")
+        self.assertTrue(bc.add_transaction(first))
+        with bc._lock:
+            template = bc._block_template(sender.address)
+        late = bc.create_transaction(sender.btc_address, receiver.btc_address, 50, "owner-seed")
+        self.assertTrue(bc.add_transaction(late))
+
+        template.mine()
+        with bc._lock:
+            self.assertTrue(bc._commit_block(template))
+        snap = bc.snapshot()
+        self.assertEqual(snap.mempool, (late,))
+        self.assertEqual(snap.tip, template.hash())
+
+    def test_tamper_invalidates_cached_block_hash(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        miner = bc.register_wallet("miner", "miner-seed")
+        bc.mine_block(miner.address)
+        bc.mine_block(miner.address)
+        self.assertTrue(bc.validate_chain())
+
+        block = bc.chain[1]
+        old_hash, old_txid = block.hash(), block.transactions[0].txid()
+        self.assertTrue(bc.tamper_block(1))
+        self.assertNotEqual(block.hash(), old_hash)
+        self.assertNotEqual(block.transactions[0].txid(), old_txid)
+        self.assertFalse(bc.validate_chain())
+
+    def test_cached_validity_and_block_lookup_follow_tamper(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        miner = bc.register_wallet("miner", "miner-seed")
+        block = bc.mine_block(miner.address)
+        bc.mine_block(miner.address)
+        self.assertTrue(bc.chain_valid())
+        self.assertIs(bc.get_block(block.hash()), block)
+
+        old_hash = block.hash()
+        bc.tamper_block(1)
+        self.assertFalse(bc.chain_valid())
+        self.assertIsNone(bc.get_block(old_hash))
+        self.assertIs(bc.get_block(block.hash()), block)
+        bc.mine_block(miner.address)
+        self.assertFalse(bc.chain_valid())
+
+    def test_registered_seed_signs_without_rederiving_keys(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        sender = bc.register_wallet("sender", "owner-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        bc.mine_block(sender.address)
+
+        before = bc.wallet_cache_stats()
+        for _ in range(3):
+            bc.create_transaction(sender.btc_address, receiver.btc_address, 1, "owner-seed")
+        after = bc.wallet_cache_stats()
+        self.assertEqual(after["seed_index"]["hits"] - before["seed_index"]["hits"], 3)
+        self.assertEqual(after["keypair_cache"]["misses"], before["keypair_cache"]["misses"])
+
 
 if __name__ == "__main__":
     unittest.main()
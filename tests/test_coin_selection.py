@@ -0,0 +1,52 @@
+import unittest
+
+from mini_chain.blockchain import Blockchain
+from mini_chain.coin_selection import COST_OF_CHANGE, select_coins
+from mini_chain.utxo import UTXO
+
+
+def _utxos(*amounts):
+    return [UTXO(txid="aa" * 32, vout=i, amount=a, address="addr") for i, a in enumerate(amounts)]
+
+
+class CoinSelectionTests(unittest.TestCase):
+    def test_largest_and_smallest_first(self):
+        utxos = _utxos(1, 5, 3)
+        selected, total = select_coins(utxos, 4, "largest-first")
+        self.assertEqual([u.amount for u in selected], [5])
+        selected, total = select_coins(utxos, 4, "smallest-first")
+        self.assertEqual([u.amount for u in selected], [1, 3])
+        self.assertEqual(total, 4)
+
+    def test_branch_and_bound_finds_changeless_match(self):
+        selected, total = select_coins(_utxos(5, 3, 2.5, 1, 0.5), 3.5, "branch-and-bound")
+        self.assertEqual(total, 3.5)
+        self.assertEqual(sorted(u.amount for u in selected), [0.5, 3])
+
+    def test_branch_and_bound_falls_back_when_no_exact_match(self):
+        selected, total = select_coins(_utxos(5, 3), 4, "branch-and-bound")
+        self.assertEqual([u.amount for u in selected], [5])
+
+    def test_branch_and_bound_accepts_excess_below_cost_of_change(self):
+        selected, total = select_coins(_utxos(5, 3, 1.000001), 4, "branch-and-bound")
+        self.assertEqual(sorted(u.amount for u in selected), [1.000001, 3])
+        # Un exceso mayor que el coste del cambio no sirve: se vuelve a largest-first
+        selected, total = select_coins(_utxos(5, 3, 1.1), 4, "branch-and-bound")
+        self.assertEqual([u.amount for u in selected], [5])
+
+    def test_change_below_its_cost_is_left_as_fee(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        self.addCleanup(bc.close)
+        miner = bc.register_wallet("miner", "miner-seed")
+        bob = bc.register_wallet("bob", "bob-seed")
+        bc.mine_block(miner.address)
+        tx = bc.create_transaction(miner.address, bob.address, 50 - COST_OF_CHANGE, miner.seed, "branch-and-bound")
+        self.assertEqual([out.address for out in tx.outputs], [bob.address])
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            select_coins(_utxos(1), 1, "random")
+
+
+if __name__ == "__main__":
+    unittest.main()
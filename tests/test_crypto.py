@@ -0,0 +1,32 @@
+import unittest
+
+from mini_chain.crypto_utils import (
+    deterministic_prime,
+    is_probable_prime,
+    private_key_from_seed,
+    sha256,
+    sign_message,
+    sign_message_crt,
+    verify_message,
+)
+
+
+class CryptoTests(unittest.TestCase):
+    def test_crt_signature_matches_plain_signature(self):
+        n, e, d, p, q, dp, dq, qinv = private_key_from_seed("crt-seed")
+        for message in (b"", b"hola", b"x" * 1000):
+            signature = sign_message_crt(p, q, dp, dq, qinv, message)
+            self.assertEqual(signature, sign_message(n, d, message))
+            self.assertTrue(verify_message(n, e, message, signature))
+
+    def test_sieved_prime_matches_plain_search(self):
+        for i in range(5):
+            seed = b"seed-%d" % i
+            x = int.from_bytes(sha256(seed + b"p"), "big") | 1 | (1 << 255)
+            while not is_probable_prime(x):
+                x += 2
+            self.assertEqual(deterministic_prime(seed, b"p"), x)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import unittest
+
+from mini_chain.block import LEGACY_BLOCK_VERSION, Block
+from mini_chain.blockchain import Blockchain
+from mini_chain.crypto_utils import double_sha256
+from mini_chain.encoding import DecodeError
+from mini_chain.transaction import LEGACY_TX_VERSION, Transaction, TxInput, TxOutput
+
+
+class EncodingTests(unittest.TestCase):
+    def _signed_chain(self, **kwargs):
+        bc = Blockchain(difficulty=1, block_interval=999, **kwargs)
+        sender = bc.register_wallet("sender", "owner-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        bc.mine_block(sender.address)
+        tx = bc.create_transaction(sender.btc_address, receiver.btc_address, 1.5, "owner-seed")
+        self.assertTrue(bc.add_transaction(tx))
+        bc.mine_block(sender.address)
+        return bc, tx
+
+    def test_transaction_roundtrip_is_canonical(self):
+        _, tx = self._signed_chain()
+        data = tx.serialize()
+        decoded = Transaction.from_bytes(data)
+        self.assertEqual(decoded, tx)
+        self.assertEqual(decoded.txid(), tx.txid())
+        self.assertEqual(decoded.encode(), data)
+        self.assertTrue(decoded.verify_signatures())
+        self.assertLess(len(data), len(json.dumps(tx.to_dict()).encode()))
+
+    def test_block_roundtrip_preserves_hash(self):
+        bc, _ = self._signed_chain()
+        block = bc.chain[-1]
+        decoded = Block.from_bytes(block.encode())
+        self.assertEqual(decoded, block)
+        self.assertEqual(decoded.hash(), block.hash())
+
+    def test_legacy_json_hashes_stay_verifiable(self):
+        bc, tx = self._signed_chain(legacy_json=True)
+        self.assertEqual(tx.version, LEGACY_TX_VERSION)
+        legacy_body = {k: v for k, v in tx.to_dict().items() if k != "version"}
+        self.assertEqual(tx.txid(), double_sha256(json.dumps(legacy_body, sort_keys=True).encode()).hex())
+
+        block = bc.chain[-1]
+        self.assertEqual(block.version, LEGACY_BLOCK_VERSION)
+        self.assertEqual(Block.from_bytes(block.encode()).hash(), block.hash())
+        self.assertTrue(bc.validate_chain())
+
+    def test_non_canonical_encodings_are_rejected(self):
+        tx = Transaction(
+            inputs=[TxInput(txid="ab" * 32, vout=0, signature="00", public_key="not-a-key")],
+            outputs=[TxOutput(amount=1, address="addr")],
+        )
+        data = tx.serialize()
+        self.assertEqual(Transaction.from_bytes(data).inputs[0].signature, "00")
+        with self.assertRaises(DecodeError):
+            Transaction.from_bytes(data + b"\x00")
+        with self.assertRaises(DecodeError):
+            Transaction.from_bytes(data[:-1])
+
+    def test_out_of_range_fields_raise_value_error(self):
+        output = TxOutput(amount=1, address="addr")
+        for amount in (1e20, float("inf"), float("nan")):
+            with self.assertRaises(ValueError):
+                Transaction(inputs=[], outputs=[TxOutput(amount=amount, address="addr")])
+        for vout in (-1, 2**32):
+            tx = Transaction(inputs=[TxInput(txid="ab" * 32, vout=vout, signature="00", public_key="k")], outputs=[output])
+            with self.assertRaises(ValueError):
+                tx.serialize()
+            self.assertFalse(tx.verify_signatures())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from mini_chain.blockchain import Blockchain
+
+
+class BlockchainEventTests(unittest.TestCase):
+    def test_mine_and_add_transaction_publish_events(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        events = []
+        bc.events.subscribe(lambda event, data: events.append((event, data)))
+        sender = bc.register_wallet("sender", "owner-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+
+        bc.mine_block(sender.address)
+        tx = bc.create_transaction(sender.address, receiver.address, 5, sender.private_key_wif)
+        self.assertTrue(bc.add_transaction(tx))
+        block = bc.mine_block(sender.address)
+
+        names = [event for event, _ in events]
+        self.assertEqual(names, ["block", "mempool", "block", "mempool"])
+        self.assertEqual(events[1][1], {"added": [tx.txid()], "removed": [], "size": 1})
+        self.assertEqual(events[2][1]["hash"], block.hash())
+        self.assertEqual(events[2][1]["tx_count"], 2)
+        self.assertEqual(events[3][1], {"added": [], "removed": [tx.txid()], "size": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
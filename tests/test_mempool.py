@@ -0,0 +1,115 @@
+import unittest
+
+from mini_chain.block import Block
+from mini_chain.blockchain import Blockchain
+from mini_chain.mempool import Mempool
+from mini_chain.transaction import Transaction, TxOutput
+
+
+class MempoolTests(unittest.TestCase):
+    def _chain(self, blocks=3, **kwargs):
+        bc = Blockchain(difficulty=1, block_interval=999, **kwargs)
+        self.addCleanup(bc.close)
+        self.sender = bc.register_wallet("sender", "sender-seed")
+        self.receiver = bc.register_wallet("receiver", "receiver-seed")
+        for _ in range(blocks):
+            bc.mine_block(self.sender.address)
+        return bc
+
+    def _send(self, bc, fee):
+        return bc.create_transaction(self.sender.address, self.receiver.address, 10, self.sender.seed, fee=fee)
+
+    def test_double_spend_of_pending_outpoint_is_rejected(self):
+        bc = self._chain(blocks=1)
+        first, second = self._send(bc, 0), self._send(bc, 1)
+        self.assertEqual([(i.txid, i.vout) for i in first.inputs], [(i.txid, i.vout) for i in second.inputs])
+        self.assertTrue(bc.add_transaction(first))
+        self.assertFalse(bc.add_transaction(second))
+        # La wallet ya no elige el outpoint pendiente
+        with self.assertRaises(ValueError):
+            self._send(bc, 0)
+
+    def test_template_orders_by_fee_rate(self):
+        bc = self._chain()
+        for fee in (0, 0.5, 0.1):
+            self.assertTrue(bc.add_transaction(self._send(bc, fee)))
+        with bc._lock:
+            template = bc._block_template(self.sender.address)
+        fees = [round(sum(o.amount for o in tx.outputs), 8) for tx in template.transactions[1:]]
+        self.assertEqual(fees, [49.5, 49.9, 50.0])
+        self.assertEqual([e["fee"] for e in bc.mempool_info()["transactions"]], [0.5, 0.1, 0.0])
+
+    def test_full_mempool_evicts_lowest_fee_rate(self):
+        probe = self._chain()
+        size = len(self._send(probe, 0).serialize())
+        bc = self._chain(mempool_max_bytes=2 * size + size // 2)
+        low = self._send(bc, 0.01)
+        self.assertTrue(bc.add_transaction(low))
+        mid = self._send(bc, 0.02)
+        self.assertTrue(bc.add_transaction(mid))
+        events = []
+        bc.events.subscribe(lambda event, data: events.append(data))
+
+        # Sin sitio y con menos fee rate que todo lo pendiente: rechazada
+        self.assertFalse(bc.add_transaction(self._send(bc, 0.001)))
+        high = self._send(bc, 0.05)
+        self.assertTrue(bc.add_transaction(high))
+        self.assertEqual(events, [{"added": [high.txid()], "removed": [low.txid()], "size": 2}])
+        self.assertLessEqual(bc.mempool.total_bytes, bc.mempool.max_bytes)
+        self.assertIsNone(bc.get_transaction(low.txid()))
+
+    def test_block_selection_respects_size_limit(self):
+        bc = self._chain()
+        txs = []
+        for fee in (0.3, 0.2, 0.1):
+            txs.append(self._send(bc, fee))
+            self.assertTrue(bc.add_transaction(txs[-1]))
+        size = len(txs[0].serialize())
+        self.assertEqual(bc.mempool.select(2 * size + 1), txs[:2])
+
+    def test_miner_collects_fees_and_peers_bound_the_coinbase(self):
+        bc = self._chain()
+        for fee in (0.5, 0.25):
+            self.assertTrue(bc.add_transaction(self._send(bc, fee)))
+        miner = bc.register_wallet("miner", "miner-seed")
+        block = bc.mine_block(miner.address)
+        self.assertEqual(block.transactions[0].outputs[0].amount, 50.75)
+        self.assertEqual(bc.balance_of(miner.address), 50.75)
+
+        # Otro nodo con la misma historia acepta el bloque, pero no uno que cobre de más
+        peer = Blockchain(difficulty=1, block_interval=999)
+        self.addCleanup(peer.close)
+        for previous in bc.chain[1:-1]:
+            self.assertTrue(peer.add_block(previous))
+        coinbase = Transaction(inputs=[], outputs=[TxOutput(50.76, miner.address)], is_coinbase=True)
+        greedy = Block(index=block.index, previous_hash=block.previous_hash, transactions=[coinbase, *block.transactions[1:]], difficulty=1)
+        greedy.mine()
+        self.assertFalse(peer.add_block(greedy))
+        self.assertTrue(peer.add_block(block))
+        self.assertTrue(peer.validate_full().valid)
+
+    def test_snapshots_share_the_mempool_view_until_it_changes(self):
+        bc = self._chain(blocks=2)
+        first = self._send(bc, 0)
+        self.assertTrue(bc.add_transaction(first))
+        view = bc.snapshot().mempool
+        self.assertIs(bc.snapshot().mempool, view)
+        second = self._send(bc, 0.1)
+        self.assertTrue(bc.add_transaction(second))
+        self.assertEqual(bc.snapshot().mempool, (first, second))
+        bc.mine_block(self.sender.address)
+        self.assertEqual(bc.snapshot().mempool, ())
+
+    def test_mined_block_clears_included_and_conflicting(self):
+        pool = Mempool()
+        bc = self._chain(blocks=1)
+        tx = self._send(bc, 0)
+        conflicting = self._send(bc, 0.1)
+        self.assertIsNotNone(pool.add(conflicting, 0.1))
+        self.assertIsNone(pool.add(tx, 0))
+        self.assertEqual(pool.remove_for_block([tx]), [conflicting.txid()])
+        self.assertEqual((len(pool), pool.total_bytes), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
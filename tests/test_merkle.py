@@ -0,0 +1,51 @@
+import unittest
+
+from mini_chain.block import BLOCK_VERSION, Block
+from mini_chain.crypto_utils import double_sha256
+from mini_chain.merkle import EMPTY_ROOT, MerkleTree, verify_proof
+from mini_chain.transaction import Transaction, TxOutput
+
+
+def _leaves(count):
+    return [double_sha256(b"tx-%d" % i) for i in range(count)]
+
+
+def _coinbase(i):
+    return Transaction(inputs=[], outputs=[TxOutput(amount=50.0, address=f"addr-{i}")], timestamp=1700000000.0 + i, is_coinbase=True)
+
+
+class MerkleTests(unittest.TestCase):
+    def test_incremental_append_matches_full_build(self):
+        tree = MerkleTree()
+        self.assertEqual(tree.root(), EMPTY_ROOT)
+        for count in range(1, 18):
+            tree.append(_leaves(count)[-1])
+            self.assertEqual(tree.root(), MerkleTree(_leaves(count)).root())
+        # Un nodo impar sube sin duplicarse: repetir la última hoja cambia la raíz
+        self.assertNotEqual(MerkleTree(_leaves(3)).root(), MerkleTree(_leaves(3) + _leaves(3)[-1:]).root())
+
+    def test_proofs_verify_for_every_position(self):
+        for count in (1, 2, 5, 8, 13):
+            leaves = _leaves(count)
+            tree = MerkleTree(leaves)
+            root = tree.root().hex()
+            for i, leaf in enumerate(leaves):
+                proof = tree.proof(i)
+                self.assertTrue(verify_proof(leaf.hex(), proof, root))
+                if count > 1:
+                    self.assertFalse(verify_proof(leaves[(i + 1) % count].hex(), proof, root))
+
+    def test_header_size_does_not_depend_on_transaction_count(self):
+        small = Block(index=1, previous_hash="ab" * 32, transactions=[_coinbase(0)], difficulty=1, timestamp=1.0)
+        large = Block(index=1, previous_hash="ab" * 32, transactions=[_coinbase(i) for i in range(100)], difficulty=1, timestamp=1.0)
+        self.assertEqual(large.version, BLOCK_VERSION)
+        self.assertEqual(len(small.header()), len(large.header()))
+
+        # Sustituir una transacción actualiza la raíz ya cacheada
+        large.hash()
+        large.replace_transaction(7, _coinbase(200))
+        self.assertEqual(large.merkle_root(), MerkleTree.from_txids(tx.txid() for tx in large.transactions).root().hex())
+
+
+if __name__ == "__main__":
+    unittest.main()
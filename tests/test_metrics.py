@@ -0,0 +1,40 @@
+import unittest
+
+from mini_chain.metrics import Registry
+
+
+class MetricsTests(unittest.TestCase):
+    def test_disabled_registry_records_nothing(self):
+        registry = Registry()
+        counter = registry.counter("demo_total", "demo")
+        histogram = registry.histogram("demo_seconds", "demo", buckets=(0.1, 1.0))
+        counter.inc(5)
+        with histogram.time():
+            pass
+        self.assertIn("demo_total 0\n", registry.render())
+        self.assertIn("demo_seconds_count 0\n", registry.render())
+
+    def test_text_exposition_format(self):
+        registry = Registry(enabled=True)
+        requests = registry.counter("http_total", "Peticiones", ("route",))
+        latency = registry.histogram("latency_seconds", "Latencia", buckets=(0.1, 1.0))
+        requests.labels('/a"b').inc()
+        requests.labels('/a"b').inc()
+        for value in (0.05, 0.5, 3.0):
+            latency.observe(value)
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:3], ["# HELP http_total Peticiones", "# TYPE http_total counter", 'http_total{route="/a\\"b"} 2'])
+        self.assertEqual(
+            lines[5:],
+            [
+                'latency_seconds_bucket{le="0.1"} 1',
+                'latency_seconds_bucket{le="1"} 2',
+                'latency_seconds_bucket{le="+Inf"} 3',
+                "latency_seconds_sum 3.55",
+                "latency_seconds_count 3",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from dataclasses import replace
+
+from mini_chain.block import BLOCK_VERSION, LEGACY_BLOCK_VERSION, TXIDS_BLOCK_VERSION, Block
+from mini_chain.mining import ParallelMiner, meets_difficulty, search_nonce
+from mini_chain.transaction import Transaction, TxOutput
+
+
+def _block(difficulty, version=BLOCK_VERSION):
+    txs = [Transaction(inputs=[], outputs=[TxOutput(amount=50.0, address=f"addr-{i}")], timestamp=1700000000.0 + i, is_coinbase=True) for i in range(3)]
+    return Block(index=1, previous_hash="ab" * 32, transactions=txs, difficulty=difficulty, timestamp=1700000000.25, version=version)
+
+
+class MiningTests(unittest.TestCase):
+    def test_midstate_search_matches_naive_loop(self):
+        for version, difficulty in ((v, d) for v in (LEGACY_BLOCK_VERSION, TXIDS_BLOCK_VERSION, BLOCK_VERSION) for d in (1, 2, 3)):
+            mined = _block(difficulty, version)
+            mined.mine()
+
+            naive = _block(difficulty, version)
+            while not naive.hash().startswith("0" * difficulty):
+                naive = replace(naive, nonce=naive.nonce + 1)
+
+            self.assertEqual(mined.nonce, naive.nonce)
+            self.assertEqual(mined.hash(), naive.hash())
+
+    def test_template_reproduces_header_bytes(self):
+        legacy = replace(_block(2, LEGACY_BLOCK_VERSION), nonce=12345)
+        prefix, suffix = legacy.header_template()
+        self.assertEqual(prefix + b"12345" + suffix, legacy.header())
+
+        binary = replace(_block(2), nonce=12345)
+        prefix, suffix = binary.header_template()
+        self.assertEqual(prefix + (12345).to_bytes(8, "big") + suffix, binary.header())
+
+    def test_search_respects_count(self):
+        prefix, suffix = _block(64).header_template()
+        self.assertIsNone(search_nonce(prefix, suffix, 64, count=100))
+
+    def test_meets_difficulty_odd_prefix(self):
+        self.assertTrue(meets_difficulty(bytes.fromhex("000f") + bytes(30), 3))
+        self.assertFalse(meets_difficulty(bytes.fromhex("0010") + bytes(30), 3))
+
+    def test_parallel_miner_finds_valid_nonce(self):
+        miner = ParallelMiner(workers=2)
+        try:
+            for version, difficulty in ((LEGACY_BLOCK_VERSION, 2), (BLOCK_VERSION, 3)):
+                block = _block(difficulty, version)
+                block.mine(miner)
+                self.assertTrue(block.hash().startswith("0" * difficulty))
+                self.assertGreater(miner.last_attempts, 0)
+        finally:
+            miner.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
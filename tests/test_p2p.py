@@ -0,0 +1,165 @@
+import asyncio
+import socket
+import time
+import unittest
+
+from mini_chain.blockchain import Blockchain
+from mini_chain.node import Node
+from mini_chain.p2p import (
+    FRAME_HEADER,
+    MSG_GETDATA,
+    MSG_HELLO,
+    MSG_INV,
+    MSG_TX,
+    InflightRequests,
+    Peer,
+    SeenCache,
+    decode_message,
+    encode_frame,
+    encode_message,
+)
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class GossipTests(unittest.TestCase):
+    def _node(self, name):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        node = Node(name, "127.0.0.1", 0, bc)
+        node.start()
+        self.addCleanup(bc.close)
+        self.addCleanup(node.stop)
+        return node
+
+    def test_blocks_and_transactions_propagate_along_a_line(self):
+        # a <-> b <-> c: c solo recibe lo de a a través de b
+        a, b, c = self._node("a"), self._node("b"), self._node("c")
+        b.connect_peer("127.0.0.1", a.port)
+        c.connect_peer("127.0.0.1", b.port)
+        self.assertTrue(wait_for(lambda: b.connected_peers() == ["a", "c"]))
+
+        sender = a.blockchain.register_wallet("sender", "owner-seed")
+        block = a.blockchain.mine_block(sender.address)
+        for node in (b, c):
+            self.assertTrue(wait_for(lambda: node.blockchain.snapshot().tip == block.hash()))
+
+        receiver = c.blockchain.register_wallet("receiver", "receiver-seed")
+        tx = a.blockchain.create_transaction(sender.address, receiver.address, 5, sender.private_key_wif)
+        self.assertTrue(a.blockchain.add_transaction(tx))
+        self.assertTrue(wait_for(lambda: c.blockchain.get_transaction(tx.txid()) is not None))
+
+        # c mina la tx y el bloque vuelve hasta a, que la retira de su mempool
+        mined = c.blockchain.mine_block(receiver.address)
+        self.assertTrue(wait_for(lambda: a.blockchain.snapshot().tip == mined.hash()))
+        self.assertEqual(a.blockchain.snapshot().mempool, ())
+        self.assertEqual(a.blockchain.balance_of(receiver.address), 55.0)
+
+    def test_announcements_are_deduplicated_in_a_triangle(self):
+        a, b, c = self._node("a"), self._node("b"), self._node("c")
+        b.connect_peer("127.0.0.1", a.port)
+        c.connect_peer("127.0.0.1", a.port)
+        c.connect_peer("127.0.0.1", b.port)
+
+        miner = a.blockchain.register_wallet("miner", "miner-seed")
+        for _ in range(3):
+            a.blockchain.mine_block(miner.address)
+        tip = a.blockchain.snapshot().tip
+        self.assertTrue(wait_for(lambda: b.blockchain.snapshot().tip == tip and c.blockchain.snapshot().tip == tip))
+        time.sleep(0.2)
+        # Cada nodo acepta cada bloque una sola vez aunque lo anuncien dos peers
+        for node in (b, c):
+            self.assertEqual(node.stats["blocks_accepted"], 3)
+            self.assertEqual(node.stats["blocks_rejected"], 0)
+
+    def test_invalid_transaction_is_not_relayed(self):
+        a, b = self._node("a"), self._node("b")
+        b.connect_peer("127.0.0.1", a.port)
+        fake = a.blockchain.build_fake_transaction("", "attacker", 10)
+        self.assertFalse(a.blockchain.add_transaction(fake))
+        time.sleep(0.2)
+        self.assertEqual(b.stats["txs_accepted"] + b.stats["txs_rejected"], 0)
+
+    def _raw_peer(self, node, node_id):
+        # Peer mínimo sobre un socket: hace el hello y luego envía y lee tramas a mano
+        sock = socket.create_connection(("127.0.0.1", node.port), timeout=5)
+        self.addCleanup(sock.close)
+        sock.sendall(encode_message(MSG_HELLO, {"node_id": node_id, "port": 0, "height": 0}))
+        self._read_frame(sock)
+        self.assertTrue(wait_for(lambda: node_id in node.connected_peers()))
+        return sock
+
+    def _read_frame(self, sock):
+        length, kind = FRAME_HEADER.unpack(sock.recv(FRAME_HEADER.size, socket.MSG_WAITALL))
+        return kind, sock.recv(length, socket.MSG_WAITALL)
+
+    def test_peer_sending_malformed_legacy_json_is_dropped(self):
+        a = self._node("a")
+        sock = self._raw_peer(a, "raw")
+
+        # Transacción heredada en JSON sin la mayoría de sus campos
+        sock.sendall(encode_frame(MSG_TX, b'{"inputs": []}'))
+        self.assertTrue(wait_for(lambda: a.stats["peers_misbehaving"] == 1))
+        self.assertTrue(wait_for(lambda: a.connected_peers() == []))
+
+    def test_undelivered_announcement_is_requested_from_another_peer(self):
+        a = self._node("a")
+        a._inflight.timeout = 0.3
+        first, second = self._raw_peer(a, "first"), self._raw_peer(a, "second")
+        txid = "ab" * 32
+        first.sendall(encode_message(MSG_INV, {"txs": [txid]}))
+        kind, payload = self._read_frame(first)
+        self.assertEqual((kind, decode_message(payload)["txs"]), (MSG_GETDATA, [txid]))
+
+        # En vuelo con "first": el anuncio de "second" no genera otro getdata...
+        second.sendall(encode_message(MSG_INV, {"txs": [txid]}))
+        self.assertTrue(wait_for(lambda: a.stats["duplicate_inv"] == 1))
+        # ...pero "first" nunca lo entrega y, vencido el plazo, se le pide a "second"
+        time.sleep(0.35)
+        second.sendall(encode_message(MSG_INV, {"txs": [txid]}))
+        kind, payload = self._read_frame(second)
+        self.assertEqual((kind, decode_message(payload)["txs"]), (MSG_GETDATA, [txid]))
+
+
+class PeerQueueTests(unittest.TestCase):
+    def test_slow_peer_is_dropped_when_its_queue_fills(self):
+        async def scenario():
+            server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+            peer = Peer(reader, writer, queue_size=4)
+            results = [peer.send(b"x" * 1024) for _ in range(10)]
+            server.close()
+            return results, peer.closed
+
+        results, closed = asyncio.run(scenario())
+        self.assertTrue(all(results[:4]))
+        self.assertFalse(results[4])
+        self.assertTrue(closed)
+
+    def test_seen_cache_is_bounded(self):
+        seen = SeenCache(size=2)
+        self.assertTrue(seen.add("a"))
+        self.assertFalse(seen.add("a"))
+        seen.add("b")
+        seen.add("c")
+        self.assertNotIn("a", seen)
+        self.assertEqual(len(seen), 2)
+
+    def test_inflight_requests_expire(self):
+        inflight = InflightRequests(timeout=1.0)
+        self.assertTrue(inflight.request("a", now=0.0))
+        self.assertFalse(inflight.request("a", now=0.5))
+        self.assertTrue(inflight.request("a", now=1.0))
+        inflight.received("a")
+        self.assertEqual(len(inflight), 0)
+        self.assertTrue(inflight.request("a", now=1.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from mini_chain import blockchain
+from mini_chain.block import Block
+from mini_chain.blockchain import Blockchain
+
+
+def relay(block):
+    # Copia como la recibiría otro nodo
+    return Block.from_bytes(block.encode())
+
+
+def utxo_set(bc):
+    return sorted((u.txid, u.vout, u.amount, u.address) for u in bc.utxos())
+
+
+class ReorgTests(unittest.TestCase):
+    def setUp(self):
+        self.a = Blockchain(difficulty=1, block_interval=999)
+        self.b = Blockchain(difficulty=1, block_interval=999)
+        for bc in (self.a, self.b):
+            self.addCleanup(bc.close)
+            self.miner = bc.register_wallet("miner", "miner-seed")
+            self.bob = bc.register_wallet("bob", "bob-seed")
+        # Bloque 1 común a ambos nodos
+        self.assertTrue(self.b.add_block(relay(self.a.mine_block(self.miner.address))))
+
+    def _fork(self, local, remote, local_blocks, remote_blocks):
+        tx = local.create_transaction(self.miner.address, self.bob.address, 10, self.miner.seed)
+        self.assertTrue(local.add_transaction(tx))
+        for _ in range(local_blocks):
+            local.mine_block(self.miner.address)
+        return tx, [relay(remote.mine_block(self.bob.address)) for _ in range(remote_blocks)]
+
+    def test_heavier_branch_wins_and_orphaned_txs_return_to_mempool(self):
+        tx, branch = self._fork(self.a, self.b, 2, 3)
+        old_tip = self.a.chain[-1].hash()
+        events = []
+        self.a.events.subscribe(lambda event, data: events.append((event, data)))
+
+        # Mismo trabajo que la cadena actual: queda como rama lateral
+        self.assertTrue(self.a.add_block(branch[0]))
+        self.assertTrue(self.a.add_block(branch[1]))
+        self.assertEqual(self.a.chain[-1].hash(), old_tip)
+        self.assertEqual(events, [])
+
+        self.assertTrue(self.a.add_block(branch[2]))
+        self.assertEqual(self.a.chain[-1].hash(), self.b.chain[-1].hash())
+        self.assertEqual(utxo_set(self.a), utxo_set(self.b))
+        self.assertEqual([t.txid() for t in self.a.mempool], [tx.txid()])
+        self.assertEqual(self.a.height_of(old_tip), None)
+        self.assertIsNotNone(self.a.get_block(old_tip))
+        # Sin recorrer la cadena de nuevo: la validez sobrevive a la reorganización
+        self.assertTrue(self.a.cached_chain_valid())
+        self.assertTrue(self.a.chain_valid())
+
+        kind, data = events[0]
+        self.assertEqual(kind, "reorg")
+        self.assertEqual(data["fork_height"], 1)
+        self.assertEqual(len(data["disconnected"]), 2)
+        self.assertEqual(data["connected"], [block.hash() for block in branch])
+        self.assertEqual(events[-1], ("mempool", {"added": [tx.txid()], "removed": [], "size": 1}))
+
+    def test_undo_matches_full_rebuild(self):
+        _, branch = self._fork(self.b, self.a, 1, 3)
+        for block in branch:
+            self.assertTrue(self.b.add_block(block))
+        expected = utxo_set(self.b)
+        self.b._rebuild_utxos()
+        self.assertEqual(utxo_set(self.b), expected)
+        self.assertEqual(self.b.chain[-1].hash(), self.a.chain[-1].hash())
+
+    def test_branch_from_a_tampered_fork_point_is_rejected(self):
+        _, branch = self._fork(self.a, self.b, 1, 2)
+        self.assertTrue(self.a.add_block(branch[0]))
+        # El bloque 1 cambia de hash: la rama lateral ya no enlaza con la cadena principal
+        self.assertTrue(self.a.tamper_block(1))
+        tip = self.a.chain[-1].hash()
+        self.assertFalse(self.a.add_block(branch[1]))
+        self.assertEqual(self.a.chain[-1].hash(), tip)
+        self.assertFalse(self.a.add_block(relay(self.b.mine_block(self.bob.address))))
+
+    def test_side_branches_are_bounded(self):
+        _, branch = self._fork(self.a, self.b, 3, 2)
+        with mock.patch.object(blockchain, "MAX_SIDE_BLOCKS", 1):
+            self.assertTrue(self.a.add_block(branch[0]))
+            self.assertTrue(self.a.add_block(branch[1]))
+            self.assertEqual(list(self.a._side), [branch[1].hash()])
+            tip = self.a.chain[-1].hash()
+            self.assertTrue(self.a.add_block(relay(self.b.mine_block(self.bob.address))))
+            # Al superar el trabajo se descubre que sus antecesores se descartaron: no hay reorganización
+            self.assertFalse(self.a.add_block(relay(self.b.mine_block(self.bob.address))))
+            self.assertEqual(self.a.chain[-1].hash(), tip)
+
+    def test_cumulative_work_follows_the_main_chain(self):
+        _, branch = self._fork(self.a, self.b, 1, 2)
+        for block in branch:
+            self.assertTrue(self.a.add_block(block))
+        self.assertEqual(self.a._work, self.b._work)
+        self.assertEqual(len(self.a._work), len(self.a.chain))
+
+
+class StoredReorgTests(unittest.TestCase):
+    def test_reorg_is_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            b = Blockchain(difficulty=1, block_interval=999)
+            self.addCleanup(b.close)
+            miner = a.register_wallet("miner", "miner-seed")
+            b.register_wallet("miner", "miner-seed")
+            self.assertTrue(b.add_block(relay(a.mine_block(miner.address))))
+            a.mine_block(miner.address)
+            for block in [relay(b.mine_block(miner.address)) for _ in range(3)]:
+                self.assertTrue(a.add_block(block))
+            tip, utxos = a.chain[-1].hash(), utxo_set(a)
+            self.assertEqual(tip, b.chain[-1].hash())
+            a.close()
+
+            reopened = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            try:
+                self.assertEqual(len(reopened.chain), 5)
+                self.assertEqual(reopened.chain[-1].hash(), tip)
+                self.assertEqual(utxo_set(reopened), utxos)
+                self.assertTrue(reopened.chain_valid())
+            finally:
+                reopened.close()
+
+    def test_snapshot_taken_before_a_reorg_keeps_its_branch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            b = Blockchain(difficulty=1, block_interval=999)
+            self.addCleanup(b.close)
+            try:
+                miner = a.register_wallet("miner", "miner-seed")
+                b.register_wallet("miner", "miner-seed")
+                self.assertTrue(b.add_block(relay(a.mine_block(miner.address))))
+                a.mine_block(miner.address)
+                snap = a.snapshot()
+                old = [block.hash() for block in snap.blocks()]
+                for block in [relay(b.mine_block(miner.address)) for _ in range(3)]:
+                    self.assertTrue(a.add_block(block))
+                self.assertEqual(a.chain[-1].hash(), b.chain[-1].hash())
+
+                # La vista no mezcla ramas: solo conserva lo común con la cadena anterior
+                self.assertEqual(snap.height, 2)
+                self.assertEqual([block.hash() for block in snap.blocks()], old[:2])
+                self.assertEqual(snap.blocks(2), [])
+                self.assertEqual(len(a.snapshot().blocks()), 5)
+            finally:
+                a.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
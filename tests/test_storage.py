@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from mini_chain.blockchain import Blockchain
+from mini_chain.storage import INDEX_RECORD
+
+
+class BlockStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _populated_chain(self):
+        bc = Blockchain(difficulty=1, block_interval=999, data_dir=self.data_dir)
+        sender = bc.register_wallet("sender", "owner-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        bc.mine_block(sender.address)
+        tx = bc.create_transaction(sender.btc_address, receiver.btc_address, 7, "owner-seed")
+        self.assertTrue(bc.add_transaction(tx))
+        bc.mine_block(sender.address)
+        return bc, sender, receiver
+
+    def test_restart_restores_chain_wallets_and_utxos(self):
+        bc, sender, receiver = self._populated_chain()
+        tip, height = bc.snapshot().tip, bc.snapshot().height
+        bc.close()
+
+        reopened = Blockchain(difficulty=1, block_interval=999, data_dir=self.data_dir)
+        try:
+            self.assertEqual(reopened.snapshot().tip, tip)
+            self.assertEqual(reopened.snapshot().height, height)
+            self.assertEqual(reopened.balance_of(receiver.btc_address), 7)
+            self.assertEqual(reopened.balance_of(sender.btc_address), 93)
+            self.assertEqual(reopened.wallets["sender"], sender)
+            self.assertTrue(reopened.validate_chain())
+        finally:
+            reopened.close()
+
+    def test_blocks_after_snapshot_are_replayed(self):
+        bc, sender, receiver = self._populated_chain()
+        (Path(self.data_dir) / "utxo.snapshot").unlink(missing_ok=True)
+        # Sin close(): simula una caída sin snapshot final
+        bc.store.close()
+
+        reopened = Blockchain(difficulty=1, block_interval=999, data_dir=self.data_dir)
+        try:
+            self.assertEqual(reopened.balance_of(receiver.btc_address), 7)
+            reopened.mine_block(receiver.address)
+            self.assertEqual(reopened.balance_of(receiver.btc_address), 57)
+        finally:
+            reopened.close()
+
+    def test_partial_index_record_is_discarded(self):
+        bc, _, _ = self._populated_chain()
+        height = bc.snapshot().height
+        bc.close()
+        with open(Path(self.data_dir) / "blocks" / "index.dat", "ab") as f:
+            f.write(b"\x00" * (INDEX_RECORD.size // 2))
+
+        reopened = Blockchain(difficulty=1, block_interval=999, data_dir=self.data_dir)
+        try:
+            self.assertEqual(reopened.snapshot().height, height)
+            reopened.mine_block(reopened.wallets["sender"].address)
+            self.assertTrue(reopened.validate_chain())
+        finally:
+            reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
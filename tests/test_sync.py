@@ -0,0 +1,89 @@
+import time
+import unittest
+from dataclasses import replace
+
+from mini_chain.blockchain import Blockchain
+from mini_chain.node import Node
+from mini_chain.sync import BlockDownload, check_headers, decode_headers, encode_headers
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def mined_chain(blocks):
+    bc = Blockchain(difficulty=1, block_interval=999)
+    miner = bc.register_wallet("miner", "miner-seed")
+    for _ in range(blocks):
+        bc.mine_block(miner.address)
+    return bc
+
+
+class HeaderTests(unittest.TestCase):
+    def test_headers_round_trip_and_link(self):
+        bc = mined_chain(5)
+        blocks = bc.snapshot().blocks()
+        headers = decode_headers(encode_headers(blocks[1:]))
+        self.assertEqual([h.hash() for h in headers], [b.hash() for b in blocks[1:]])
+        self.assertTrue(check_headers(blocks[0].hash(), 0, headers, bc.valid_proof))
+
+        # Un header con otro timestamp cambia de hash: rompe el enlace con el siguiente
+        forged = list(headers)
+        forged[1] = replace(forged[1], timestamp=forged[1].timestamp + 1)
+        object.__setattr__(forged[1], "_merkle_root", bytes.fromhex(headers[1].merkle_root()))
+        self.assertFalse(check_headers(blocks[0].hash(), 0, forged, lambda h: True))
+
+    def test_download_buffers_out_of_order_blocks(self):
+        blocks = mined_chain(6).snapshot().blocks()[1:]
+        download = BlockDownload(blocks, batch_size=2)
+        first = download.assign("a", deadline=10)
+        second = download.assign("b", deadline=10)
+        self.assertEqual(first, [b.hash() for b in blocks[0:2]])
+        self.assertEqual(second, [b.hash() for b in blocks[2:4]])
+
+        for block in blocks[2:4]:
+            self.assertTrue(download.receive(block))
+        self.assertEqual(list(download.ready()), [])
+        download.receive(blocks[1])
+        download.receive(blocks[0])
+        self.assertEqual([b.index for b in download.ready()], [1, 2, 3, 4])
+
+        # El lote del peer que no responde vuelve a la cola al vencer
+        self.assertEqual(download.assign("a", deadline=5), [blocks[4].hash(), blocks[5].hash()])
+        download.expire(now=6)
+        self.assertEqual(download.assign("b", deadline=20), [blocks[4].hash(), blocks[5].hash()])
+
+
+class InitialBlockDownloadTests(unittest.TestCase):
+    def _node(self, name, bc, peers=()):
+        node = Node(name, "127.0.0.1", 0, bc, peers=list(peers))
+        node.start()
+        self.addCleanup(bc.close)
+        self.addCleanup(node.stop)
+        return node
+
+    def test_new_node_downloads_from_several_peers(self):
+        source = mined_chain(300)
+        a = self._node("a", source)
+        b = self._node("b", Blockchain(difficulty=1, block_interval=999), peers=[("127.0.0.1", a.port)])
+        tip = source.snapshot().tip
+        self.assertTrue(wait_for(lambda: b.blockchain.snapshot().tip == tip))
+
+        c = self._node("c", Blockchain(difficulty=1, block_interval=999), peers=[("127.0.0.1", a.port), ("127.0.0.1", b.port)])
+        self.assertTrue(wait_for(lambda: c.blockchain.snapshot().tip == tip))
+        self.assertTrue(c.blockchain.chain_valid())
+        self.assertTrue(wait_for(lambda: not c.sync_status()["active"]))
+        status = c.sync_status()
+        self.assertEqual(status["blocks"], 300)
+        self.assertGreater(status["bytes"], 0)
+        self.assertGreater(status["blocks_per_s"], 0)
+        self.assertEqual(set(status["per_peer"]), {"a", "b"})
+
+
+if __name__ == "__main__":
+    unittest.main()
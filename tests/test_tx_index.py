@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from mini_chain import tx_index
+from mini_chain.block import Block
+from mini_chain.blockchain import Blockchain
+
+
+def relay(block):
+    return Block.from_bytes(block.encode())
+
+
+class TxIndexTests(unittest.TestCase):
+    def _populate(self, bc):
+        self.miner = bc.register_wallet("miner", "miner-seed")
+        self.bob = bc.register_wallet("bob", "bob-seed")
+        bc.mine_block(self.miner.address)
+        tx = bc.create_transaction(self.miner.address, self.bob.address, 10, self.miner.seed)
+        self.assertTrue(bc.add_transaction(tx))
+        return tx, bc.mine_block(self.miner.address)
+
+    def test_lookups_by_txid_and_address(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        self.addCleanup(bc.close)
+        tx, block = self._populate(bc)
+        info = bc.transaction_info(tx.txid())
+        self.assertEqual((info["confirmed"], info["height"], info["position"], info["confirmations"]), (True, 2, 1, 1))
+        self.assertEqual(info["transaction"], tx.to_dict())
+
+        history, total = bc.address_history(self.bob.btc_address)
+        self.assertEqual((total, [h["txid"] for h in history]), (1, [tx.txid()]))
+        history, total = bc.address_history(self.miner.address, limit=2)
+        self.assertEqual(total, 3)
+        self.assertEqual([h["txid"] for h in history], [tx.txid(), block.transactions[0].txid()])
+
+        pending = bc.create_transaction(self.bob.address, self.miner.address, 1, self.bob.seed)
+        self.assertTrue(bc.add_transaction(pending))
+        self.assertFalse(bc.transaction_info(pending.txid())["confirmed"])
+        self.assertIsNone(bc.transaction_info("0" * 64))
+
+    def test_reorg_rolls_back_index(self):
+        a = Blockchain(difficulty=1, block_interval=999)
+        b = Blockchain(difficulty=1, block_interval=999)
+        for bc in (a, b):
+            self.addCleanup(bc.close)
+        tx, _ = self._populate(a)
+        b.register_wallet("bob", "bob-seed")
+        for _ in range(3):
+            self.assertTrue(a.add_block(relay(b.mine_block(self.bob.address))))
+        self.assertEqual(a.chain[-1].hash(), b.chain[-1].hash())
+        # La tx gastaba una coinbase de la rama abandonada: ni confirmada ni en el mempool
+        self.assertIsNone(a.transaction_proof(tx.txid()))
+        self.assertIsNone(a.transaction_info(tx.txid()))
+        self.assertEqual(a.address_history(self.bob.address)[1], 3)
+        self.assertEqual(a.address_history(self.miner.address)[1], 0)
+
+    def test_index_persists_and_is_rebuilt_when_missing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bc = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            tx, _ = self._populate(bc)
+            bc.close()
+
+            reopened = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            self.assertEqual(reopened.transaction_info(tx.txid())["height"], 2)
+            reopened.close()
+
+            os.remove(os.path.join(tmp, "blocks", "txindex.dat"))
+            rebuilt = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            try:
+                self.assertEqual(rebuilt.transaction_proof(tx.txid())["position"], 1)
+                self.assertEqual(rebuilt.address_history(self.bob.address)[1], 1)
+            finally:
+                rebuilt.close()
+
+    def test_reopen_decodes_only_records_after_the_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bc = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            tx, _ = self._populate(bc)
+            bc.close()
+
+            decode = mock.patch.object(tx_index, "_decode_entries", wraps=tx_index._decode_entries)
+            with decode as decoded:
+                reopened = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            self.assertEqual(decoded.call_count, 0)
+            # Un bloque más sin cerrar (sin snapshot nuevo): solo se decodifica su registro
+            block = reopened.mine_block(self.bob.address)
+            with decode as decoded:
+                crashed = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            self.assertEqual(decoded.call_count, 1)
+            try:
+                self.assertEqual(crashed.transaction_info(tx.txid())["height"], 2)
+                self.assertEqual(crashed.transaction_info(block.transactions[0].txid())["height"], 3)
+                self.assertEqual(crashed.address_history(self.bob.address)[1], 2)
+            finally:
+                crashed.close()
+                reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
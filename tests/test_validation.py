@@ -0,0 +1,99 @@
+import tempfile
+import unittest
+from dataclasses import replace
+
+from mini_chain.block import Block
+from mini_chain.blockchain import COINBASE_REWARD, Blockchain
+from mini_chain.storage import BlockStore
+from mini_chain.transaction import Transaction, TxOutput
+
+
+class FullValidationTests(unittest.TestCase):
+    def _populate(self, bc):
+        sender = bc.register_wallet("sender", "sender-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        bc.mine_block(sender.address)
+        bc.mine_block(sender.address)
+        self.assertTrue(bc.add_transaction(bc.create_transaction(sender.address, receiver.address, 70, sender.seed)))
+        bc.mine_block(receiver.address)
+        return sender, receiver
+
+    def test_full_validation_replays_signatures_and_spends(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        self.addCleanup(bc.close)
+        self._populate(bc)
+        report = bc.validate_full().as_dict()
+        self.assertTrue(report["valid"])
+        self.assertEqual((report["blocks"], report["transactions"]), (4, 5))
+        self.assertGreater(report["blocks_per_s"], 0)
+
+        bc.tamper_block(1)
+        report = bc.validate_full()
+        self.assertFalse(report.valid)
+        self.assertEqual((report.failed_height, report.blocks), (1, 1))
+
+    def test_reindex_drops_blocks_from_the_first_invalid_one(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bc = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            sender, receiver = self._populate(bc)
+            # Bloque con PoW válida pero una firma falsificada, escrito directamente en disco
+            tx = bc.create_transaction(sender.address, receiver.address, 10, sender.seed)
+            forged = replace(tx, inputs=tuple(replace(i, signature="1234") for i in tx.inputs))
+            coinbase = Transaction(inputs=[], outputs=[TxOutput(COINBASE_REWARD, sender.address)], is_coinbase=True)
+            block = Block(index=4, previous_hash=bc.chain[-1].hash(), transactions=[coinbase, forged], difficulty=1)
+            block.mine()
+            bc.close()
+            store = BlockStore(tmp)
+            store.append(block)
+            store.close()
+
+            reopened = Blockchain(difficulty=1, block_interval=999, data_dir=tmp, verify_workers=2, reindex=True)
+            try:
+                report = reopened.reindex_report
+                self.assertFalse(report.valid)
+                self.assertEqual((report.failed_height, report.error), (4, "firma inválida"))
+                self.assertEqual(len(reopened.chain), 4)
+                self.assertEqual(reopened.balance_of(receiver.address), 120)
+                self.assertIsNone(reopened.height_of(block.hash()))
+            finally:
+                reopened.close()
+
+    def test_full_validation_rejects_negative_output_amounts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bc = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            sender, _ = self._populate(bc)
+            outputs = [TxOutput(1000, sender.address), TxOutput(-950, "sumidero")]
+            coinbase = Transaction(inputs=[], outputs=outputs, is_coinbase=True)
+            block = Block(index=4, previous_hash=bc.chain[-1].hash(), transactions=[coinbase], difficulty=1)
+            block.mine()
+            bc.close()
+            store = BlockStore(tmp)
+            store.append(block)
+            store.close()
+
+            reopened = Blockchain(difficulty=1, block_interval=999, data_dir=tmp)
+            try:
+                report = reopened.validate_full()
+                self.assertFalse(report.valid)
+                self.assertEqual((report.failed_height, report.error), (4, "montos de salida negativos o no finitos"))
+            finally:
+                reopened.close()
+
+
+class BlockShapeTests(unittest.TestCase):
+    def test_peer_block_with_negative_coinbase_output_is_rejected(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        self.addCleanup(bc.close)
+        miner = bc.register_wallet("miner", "miner-seed")
+        # La suma (50) respeta la recompensa, pero la salida positiva crea 1000 monedas
+        outputs = [TxOutput(1000, miner.address), TxOutput(-950, "sumidero")]
+        coinbase = Transaction(inputs=[], outputs=outputs, is_coinbase=True)
+        block = Block(index=1, previous_hash=bc.chain[-1].hash(), transactions=[coinbase], difficulty=1)
+        block.mine()
+        self.assertFalse(bc.add_block(block))
+        self.assertEqual(len(bc.chain), 1)
+        self.assertEqual(bc.balance_of(miner.address), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from dataclasses import replace
+from unittest import mock
+
+from mini_chain import transaction
+from mini_chain.blockchain import Blockchain
+from mini_chain.transaction import Transaction
+from mini_chain.verification import ParallelVerifier, _verify_chunk
+
+
+class ParallelVerifierTests(unittest.TestCase):
+    def test_pool_results_match_serial_order(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        self.addCleanup(bc.close)
+        sender = bc.register_wallet("sender", "sender-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        bc.mine_block(sender.address)
+        tx = bc.create_transaction(sender.address, receiver.address, 5, sender.seed)
+        forged = tx.with_output_amount(0, 50)
+        txs = [tx, forged] * 5
+
+        verifier = ParallelVerifier(workers=2, min_batch=1)
+        self.addCleanup(verifier.close)
+        self.assertEqual(verifier.verify(txs), [True, False] * 5)
+
+    def test_pool_workers_do_not_inherit_held_locks(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        self.addCleanup(bc.close)
+        sender = bc.register_wallet("sender", "lock-seed")
+        bc.mine_block(sender.address)
+        tx = bc.create_transaction(sender.address, "destino", 5, sender.seed)
+
+        verifier = ParallelVerifier(workers=2, min_batch=1)
+        self.addCleanup(verifier.close)
+        # Pool creado mientras el lock de la caché de firmas está tomado (otro hilo verificando)
+        with transaction.VERIFIED_SIGNATURES._lock:
+            pool = verifier._ensure_pool()
+        self.assertEqual(pool.apply_async(_verify_chunk, ([tx.serialize()],)).get(timeout=30), [True])
+
+
+class SignatureDedupTests(unittest.TestCase):
+    def setUp(self):
+        bc = Blockchain(difficulty=1, block_interval=999)
+        self.addCleanup(bc.close)
+        sender = bc.register_wallet("sender", "dedup-seed")
+        receiver = bc.register_wallet("receiver", "receiver-seed")
+        for _ in range(3):
+            bc.mine_block(sender.address)
+        # Tres entradas de la misma wallet: misma clave y misma firma
+        self.tx = bc.create_transaction(sender.address, receiver.address, 120, sender.seed)
+        self.assertEqual(len(self.tx.inputs), 3)
+
+    def _count_verifications(self, tx):
+        with mock.patch.object(transaction, "verify_message", wraps=transaction.verify_message) as verify:
+            ok = tx.verify_signatures()
+        return ok, verify.call_count
+
+    def test_each_distinct_signature_is_verified_once_and_cached(self):
+        self.assertEqual(self._count_verifications(self.tx), (True, 1))
+        # Misma tx recibida de nuevo (otro objeto): sin exponenciación modular
+        self.assertEqual(self._count_verifications(Transaction.from_bytes(self.tx.serialize())), (True, 0))
+
+    def test_forged_signature_on_shared_key_is_detected(self):
+        inputs = list(self.tx.inputs)
+        inputs[2] = replace(inputs[2], signature="1234")
+        forged = replace(self.tx, inputs=tuple(inputs))
+        self.assertEqual(self._count_verifications(forged), (False, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()